@@ -1,7 +1,8 @@
-from app.app import get_new_application_instance
-
 # Function that is only called by ../run.py and by Heroku for running a server instance.
 # This function ensures that dependencies stored in the inversion of control container
 # by the unit tests (the mock objects) are not affected.
+# The application module is imported when the function is called, rather than when the package is imported,
+# so that importing a module of the package (e.g. by the unit tests or benchmarks) does not build the application.
 def get_application():
+    from app.app import get_new_application_instance
     return get_new_application_instance()
@@ -1,19 +1,39 @@
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, timezone
 
-import requests
 from flask import Flask
 from flask_jsonpify import jsonify
 from flask_restful import Api
 from healthcheck import EnvironmentDump, HealthCheck
 
 from app.application_information import ApplicationInformation
-from app.football_results_parser import FootballResultsParser
-from app.football_results_resource import (FootballRoundResultsResource,
+from app.cached_json_renderer import CachedJsonRenderer
+from app.circuit_breaker import CircuitBreaker
+from app.conditional_request_store import ConditionalRequestStore
+from app.football_results_parser import FootballResultsParser, is_error_result
+from app.football_results_resource import (FootballLeagueTableResource,
+                                           FootballMultipleRoundResultsResource,
+                                           FootballRoundResultsResource,
                                            FootballSeasonResultsResource,
+                                           FootballTeamResultsResource,
+                                           FootballVenueResultsResource,
+                                           MetricsResource,
                                            RootEndpointResource)
-from app.inversion_of_control import features
+from app.inversion_of_control import Singleton, features
+from app.league_table import LeagueTable
+from app.match_record import to_serializable
+from app.metrics import Metrics
+from app.refresh_policy import KickoffAwareRefreshPolicy, MelbourneTimezone
+from app.refresh_scheduler import RefreshScheduler
+from app.results_cache import ResultsCache
+from app.results_store import ResultsStore
 from app.server import FootballResultsServer
+from app.single_flight import SingleFlight
 from app.system_status import SystemStatus
+from app.upstream_health_probe import UpstreamHealthProbe
+from app.upstream_http_client import UpstreamHttpClient
 
 # For health checking, the URL that gives all the results for the 2018 NPL Victoria season will be used
 url_to_check = 'http://websites.sportstg.com/comp_info.cgi?a=ROUND&round=-1&client=0-10178-0-478257-0&pool=1'
@@ -26,25 +46,124 @@ token_value = ''
 if token_name in os.environ:
     token_value = os.environ[token_name]
 
+# Commit that was deployed, as supplied by Heroku (HEROKU_SLUG_COMMIT requires the runtime-dyno-metadata feature,
+# with SOURCE_VERSION being available during builds). None is reported when neither is present.
+build_commit_names = ['HEROKU_SLUG_COMMIT', 'SOURCE_VERSION']
+build_commit = next((os.environ[name] for name in build_commit_names if os.environ.get(name)), None)
+
+# Path of the file that the details of the GitHub repository are cached to, shared by every worker on the machine
+application_information_path = os.path.join(tempfile.gettempdir(), 'football_results_application_information.json')
+
+# Number of seconds parsed results are served from memory before a background refresh is triggered.
+# Can be overridden through an environment variable, otherwise a default of 5 minutes is used.
+results_cache_ttl_name = 'RESULTS_CACHE_TTL_SECONDS'
+results_cache_ttl_seconds = 300
+
+if results_cache_ttl_name in os.environ:
+    results_cache_ttl_seconds = float(os.environ[results_cache_ttl_name])
+
+# Highest round number that results can be requested for, unless the season page lists later rounds.
+# Can be overridden through an environment variable, otherwise rounds 1 to 50 can be requested.
+max_round_number_name = 'MAX_ROUND_NUMBER'
+max_round_number = 50
+
+if max_round_number_name in os.environ:
+    max_round_number = int(os.environ[max_round_number_name])
+
+# Path of the SQLite database that parsed results are persisted to, so that new processes can serve results without waiting on sportstg.
+# Can be overridden through an environment variable, otherwise a database in the temporary directory is used.
+results_store_path_name = 'RESULTS_STORE_PATH'
+results_store_path = os.path.join(tempfile.gettempdir(), 'football_results.sqlite3')
+
+if results_store_path_name in os.environ:
+    results_store_path = os.environ[results_store_path_name]
+
+# Timezone of the match times displayed by sportstg, which are in Melbourne time (UTC+11 during daylight saving time, otherwise UTC+10).
+# Can be overridden with a fixed offset from UTC through an environment variable, otherwise Melbourne time is used.
+match_time_utc_offset_name = 'MATCH_TIME_UTC_OFFSET_HOURS'
+match_timezone = MelbourneTimezone()
+
+if match_time_utc_offset_name in os.environ:
+    match_timezone = timezone(timedelta(hours=float(os.environ[match_time_utc_offset_name])))
+
+# Directory that each worker writes its metrics to, so that the metrics of every gunicorn worker are reported by /metrics.
+# Can be overridden through an environment variable, otherwise a directory in the temporary directory is used.
+metrics_directory_name = 'METRICS_DIRECTORY'
+metrics_directory = os.path.join(tempfile.gettempdir(), 'football_results_metrics')
+
+if metrics_directory_name in os.environ:
+    metrics_directory = os.environ[metrics_directory_name]
+
 # Create Flask object for hosting the application.
 # Note that a lambda expression is used for returning the application instance,
 # otherwise classes such as FootballResultServer will not be able to use the object.
 application = Flask('FootballResultsApi')
 features.Provide('Application', lambda: application)
 
-# Dependencies for parsing football results from a HTML page
-features.Provide('HttpRequest', requests)
+# Request, upstream and parse timings are recorded in memory, with each worker writing its totals to disk at most every 5 seconds
+features.Provide('Metrics', Metrics(metrics_directory, flush_interval_seconds=5))
+
+# The broker itself is provided, so that the server can begin and end the scope of each request,
+# and the time taken to build each feature can be reported in the environment dump
+features.Provide('FeatureBroker', features)
+
+# Requests to sportstg stop being sent for 30 seconds once at least half of the last 20 requests (and at least 5) failed or took
+# 5 seconds or more, after which a single trial request decides whether requests resume. Cached results are served in the meantime.
+upstream_circuit_breaker = CircuitBreaker(failure_rate_threshold=0.5, slow_call_milliseconds=5000, window_size=20, minimum_calls=5,
+                                          open_seconds=30, half_open_max_calls=1)
+features.Provide('UpstreamCircuitBreaker', upstream_circuit_breaker)
+
+# Dependencies for parsing football results from a HTML page.
+# A single pooled HTTP client is shared by the parsers and the health check, so that connections to sportstg are reused.
+# Each fetch (including its retries) gives up after 15 seconds, so that threads are not held waiting on a slow sportstg.
+features.Provide('HttpRequest', UpstreamHttpClient(pool_size=10, connect_timeout_seconds=3.05, read_timeout_seconds=10, max_retries=2,
+                                                   circuit_breaker=upstream_circuit_breaker, deadline_seconds=15))
 features.Provide('HttpGetScoresForRoundUrlFormat', 'http://websites.sportstg.com/comp_info.cgi?a=ROUND&round={0}&client=0-10178-0-478257-0&pool=1')
 features.Provide('HttpGetScoresForSeasonUrlFormat', 'http://websites.sportstg.com/comp_info.cgi?a=ROUND&round=-1&client=0-10178-0-478257-0&pool=1')
 features.Provide('XpathGetTeams', '//a[@class="teamnames"]/text()')
 features.Provide('XpathGetScores', '//div[@class="big-score"]/text()')
 features.Provide('XpathGetMatchTimes', '//div[@class="match-time"]/text()')
 features.Provide('XpathGetVenues', '//a[@class="venuename"]/text()')
+features.Provide('XpathGetRoundNames', '//h3[@class="round-name"]/text()')
+
+# Pages are parsed into a full tree by default. Setting this to 'streaming' extracts the values from pages
+# in a single streaming pass instead, which avoids holding the full tree of large pages in memory.
+features.Provide('HtmlExtractorMode', os.environ.get('HTML_EXTRACTOR_MODE', 'tree'))
+
+# A single cache instance is shared by the season and round parsers, as well as the system status reporting.
+# It holds at most the season and every round that can be requested, and pages that could not be found or parsed
+# are fetched again after 30 seconds rather than being served for the full time to live.
+features.Provide('ResultsCache', ResultsCache(results_cache_ttl_seconds, max_entries=max_round_number + 1, error_ttl_seconds=30,
+                                              is_error=is_error_result))
+features.Provide('MaxRoundNumber', max_round_number)
+
+# Concurrent requests for the same page share one fetch, with other requests waiting up to 30 seconds for it
+features.Provide('SingleFlight', SingleFlight(wait_timeout_seconds=30))
+
+# Validators and content digests of fetched pages, so that unchanged pages are not parsed again
+features.Provide('ConditionalRequestStore', ConditionalRequestStore())
 
-# Dependencies required by the resources that expose RESTful endpoints for obtaining and parsing scores
-features.Provide('FootballSeasonResultsParser', FootballResultsParser)
-features.Provide('FootballRoundResultsParser', FootballResultsParser)
-features.Provide('PrettyJson', lambda: jsonify)
+# Parsed results are written through to disk, and served by a process that has not fetched them yet
+features.Provide('ResultsStore', ResultsStore(results_store_path))
+
+# Rounds requested together that are not on the season page are fetched concurrently, with at most 8 fetches across all requests
+features.Provide('RoundFetchExecutor', ThreadPoolExecutor(max_workers=8))
+
+# Dependencies required by the resources that expose RESTful endpoints for obtaining and parsing scores.
+# A single parser is built for each feature when first used, and shared by every resource and thread.
+features.ProvideScoped('FootballSeasonResultsParser', Singleton, FootballResultsParser)
+features.ProvideScoped('FootballRoundResultsParser', Singleton, FootballResultsParser)
+
+# Timezone of the match times, used to decide which matches without a score are postponed when filtering the season results
+features.Provide('MatchTimezone', match_timezone)
+
+# Standings are maintained incrementally from the season results, with 3 points for a win, 1 for a draw and form over 5 matches
+features.Provide('LeagueTable', LeagueTable(points_for_win=3, points_for_draw=1, form_length=5, match_timezone=match_timezone))
+
+# Results are rendered as JSON once per version, with repeated requests reusing the rendered body and its ETag.
+# Note that a lambda expression is used for returning the renderer instance, as the renderer is callable.
+pretty_json_renderer = CachedJsonRenderer(jsonify, to_serializable, max_versions=64, max_age_seconds=60)
+features.Provide('PrettyJson', lambda: pretty_json_renderer)
 
 # Dependencies required for running the RESTful server.
 # Note that lambda expressions are used for returning the required class type for a resource.
@@ -53,17 +172,49 @@ features.Provide('SeasonResultsResource', lambda: FootballSeasonResultsResource)
 features.Provide('SeasonResultsEndpoint', '/season')
 features.Provide('RoundResultsResource', lambda: FootballRoundResultsResource)
 features.Provide('RoundResultsEndpoint', '/round/<round_number>')
+features.Provide('MultipleRoundResultsResource', lambda: FootballMultipleRoundResultsResource)
+features.Provide('MultipleRoundResultsEndpoint', '/rounds')
+features.Provide('TeamResultsResource', lambda: FootballTeamResultsResource)
+features.Provide('TeamResultsEndpoint', '/team/<team_name>')
+features.Provide('VenueResultsResource', lambda: FootballVenueResultsResource)
+features.Provide('VenueResultsEndpoint', '/venue/<venue_name>')
+features.Provide('LeagueTableResource', lambda: FootballLeagueTableResource)
+features.Provide('LeagueTableEndpoint', '/table')
 features.Provide('RootResource', lambda: RootEndpointResource)
 features.Provide('RootEndpoint', '/')
+features.Provide('MetricsResource', lambda: MetricsResource)
+features.Provide('MetricsEndpoint', '/metrics')
 
 # Dependencies required for reporting on health status and providing a system dump
-features.Provide('SystemStatus', SystemStatus, url_to_check)
-features.Provide('ApplicationInformation', ApplicationInformation)
-features.Provide('HealthCheck', HealthCheck, app=application, path='/healthCheck')
+# The health of sportstg is observed in the background, with a HEAD request of the season page once the last observation
+# (including responses to fetches of results) is older than 30 seconds. The health check library's own caching of results is
+# disabled, as reporting the last observation does not wait on sportstg.
+features.ProvideScoped('UpstreamHealthProbe', Singleton, UpstreamHealthProbe, url_to_check, ttl_seconds=30)
+features.ProvideScoped('SystemStatus', Singleton, SystemStatus)
+# The details of the GitHub repository are looked up in the background when first requested, and cached for an hour
+features.ProvideScoped('ApplicationInformation', Singleton, ApplicationInformation, cache_path=application_information_path, ttl_seconds=3600,
+                       retry_interval_seconds=300, build_commit=build_commit)
+features.Provide('HealthCheck', HealthCheck, app=application, path='/healthCheck', success_ttl=None, failed_ttl=None)
 features.Provide('EnvironmentDump', EnvironmentDump, app=application, path='/environmentDump')
 features.Provide('ApplicationSectionName', 'FootballResultsApi')
+features.Provide('ResultsCacheSectionName', 'ResultsCache')
+features.Provide('UpstreamSectionName', 'UpstreamHttpClient')
+features.Provide('UpstreamHealthSectionName', 'UpstreamHealth')
+features.Provide('CircuitBreakerSectionName', 'CircuitBreaker')
+features.Provide('SingleFlightSectionName', 'SingleFlight')
+features.Provide('ResultsStoreSectionName', 'ResultsStore')
+features.Provide('RenderedResponsesSectionName', 'RenderedResponses')
+features.Provide('LeagueTableSectionName', 'LeagueTable')
+features.Provide('FeatureResolutionSectionName', 'FeatureResolution')
 features.Provide('GithubToken', token_value)
-features.Provide('RepoName', 'myob-webapi')
+features.Provide('RepoName', 'ktenedios/myob-webapi')
+
+# Dependencies for keeping results warm, with pages refreshed every minute while their matches are in play (or for 3 hours
+# after kick-off), hourly while a finished match has no score (e.g. when postponed), every 6 hours before their matches kick off,
+# and never again once every match has a final score
+features.Provide('RefreshPolicy', KickoffAwareRefreshPolicy(match_timezone, live_interval_seconds=60, postponed_interval_seconds=3600,
+                                                            future_interval_seconds=21600, live_window_seconds=3 * 3600))
+features.ProvideScoped('RefreshScheduler', Singleton, RefreshScheduler, retry_interval_seconds=60, jitter_ratio=0.1, max_workers=4, max_wait_seconds=60)
 
 # Function that will create a FootballResultsServer instance and return the underlying application object
 def get_new_application_instance():
@@ -1,36 +1,162 @@
-from github import Github, GithubException
+import json
+import logging
+import os
+import threading
+import time
 
 from app.inversion_of_control import IsInstanceOf, RequiredFeature
 
+_logger = logging.getLogger(__name__)
+
+def _start_daemon_thread(target):
+    threading.Thread(target=target, daemon=True).start()
 
 class ApplicationInformation():
+    """ Details of the application reported by the environment dump, including the most recent commit to its repository on GitHub.
+    Nothing is requested from GitHub when the application starts. The first call to get_information starts a lookup in the
+    background, which fetches the repository directly (rather than enumerating the repositories of the user) and caches its
+    details in a file, so that other workers and later processes reuse them until they are older than the time to live.
+    The commit that was deployed (e.g. from the HEROKU_SLUG_COMMIT or SOURCE_VERSION environment variables) is reported as
+    the build commit without contacting GitHub.
+    The github package is only imported by the first lookup, as importing it takes longer than importing the rest of the application.
+    """
+
     _github_token = RequiredFeature('GithubToken', IsInstanceOf(str))
     _repo_name = RequiredFeature('RepoName', IsInstanceOf(str))
 
-    def __init__(self):
-        if (self._github_token == ''):
-            self._git_revision = None
-            self._git_tag = None
-        else:
-            g = Github(self._github_token)
+    def __init__(self, cache_path=None, ttl_seconds=3600, retry_interval_seconds=300, build_commit=None, clock=time.time,
+                 start_thread=_start_daemon_thread, github_factory=None):
+        self._cache_path = cache_path
+        self._ttl_seconds = ttl_seconds
+        self._retry_interval_seconds = retry_interval_seconds
+        self._build_commit = build_commit
+        self._clock = clock
+        self._start_thread = start_thread
+        self._github_factory = github_factory
+        self._lock = threading.Lock()
+        self._repository_details = None
+        self._cache_loaded = False
+        self._lookup_running = False
+        self._retry_at = None
 
-            for repo in g.get_user().get_repos():
-                if repo.name == self._repo_name:
-                    most_recent_commit = repo.get_commits()[0]
-                    self._git_revision = most_recent_commit.sha
+    def get_information(self):
+        # Returns without waiting on GitHub, with the commit and tag being None until they have been looked up
+        with self._lock:
+            if not self._cache_loaded:
+                self._cache_loaded = True
+                self._repository_details = self._load_cached_details()
 
-                    try:
-                        self._git_tag = repo.get_git_tag(self._git_revision)
-                    except GithubException:
-                        self._git_tag = None
+            repository_details = self._repository_details or {}
+            start_lookup = self._github_token != '' and not self._lookup_running and not self._is_fresh(self._repository_details) and \
+                (self._retry_at is None or self._clock() >= self._retry_at)
 
-                    break
+            if start_lookup:
+                self._lookup_running = True
+
+        if start_lookup:
+            self._start_thread(self._look_up_repository)
 
-    def get_information(self):
         return {
             'app': {
                 'name': 'NPL Victoria 2018 Football Results API',
-                'mostRecentCommit': self._git_revision,
-                'tag': self._git_tag
+                'buildCommit': self._build_commit,
+                'mostRecentCommit': repository_details.get('mostRecentCommit'),
+                'tag': repository_details.get('tag')
             }
         }
+
+    def _is_fresh(self, repository_details):
+        return repository_details is not None and self._clock() - repository_details['fetchedAt'] < self._ttl_seconds
+
+    def _look_up_repository(self):
+        # Another worker may have looked up the repository since the cached details were loaded
+        cached_details = self._load_cached_details()
+
+        if self._is_fresh(cached_details):
+            with self._lock:
+                self._lookup_running = False
+                self._repository_details = cached_details
+
+            return
+
+        try:
+            repository_details = self._get_repository_details()
+        except Exception as error:
+            # Lookups are not attempted again until the retry interval has elapsed (e.g. while rate limited by GitHub)
+            _logger.warning('Unable to look up repository %s: %s', self._repo_name, error)
+            repository_details = None
+
+        with self._lock:
+            self._lookup_running = False
+
+            if repository_details is not None:
+                self._repository_details = repository_details
+                self._retry_at = None
+            else:
+                self._retry_at = self._clock() + self._retry_interval_seconds
+
+        if repository_details is not None:
+            self._save_cached_details(repository_details)
+
+    def _get_repository_details(self):
+        github_factory = self._github_factory
+
+        if github_factory is None:
+            from github import Github
+            github_factory = Github
+
+        g = github_factory(self._github_token)
+
+        # A repository name without an owner is taken to belong to the user the token was issued to
+        full_name = self._repo_name if '/' in self._repo_name else '{0}/{1}'.format(g.get_user().login, self._repo_name)
+        repo = g.get_repo(full_name)
+        most_recent_commit = repo.get_commits()[0].sha
+
+        return {
+            'fetchedAt': self._clock(),
+            'mostRecentCommit': most_recent_commit,
+            'tag': self._get_tag(repo, most_recent_commit)
+        }
+
+    def _get_tag(self, repo, commit_sha):
+        # Only the first page of tags (the most recent) is searched, so that the lookup does not walk every tag
+        for tag in repo.get_tags().get_page(0):
+            if tag.commit.sha == commit_sha:
+                return tag.name
+
+        return None
+
+    def _load_cached_details(self):
+        if self._cache_path is None:
+            return None
+
+        try:
+            with open(self._cache_path, mode='r') as cache_file:
+                repository_details = json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            _logger.warning('Unable to load application information from %s: %s', self._cache_path, error)
+            return None
+
+        # Details cached for a different repository (e.g. after RepoName was changed) are ignored
+        if not isinstance(repository_details, dict) or repository_details.get('repoName') != self._repo_name or \
+           not isinstance(repository_details.get('fetchedAt'), (int, float)):
+            return None
+
+        return repository_details
+
+    def _save_cached_details(self, repository_details):
+        if self._cache_path is None:
+            return
+
+        # The file is replaced rather than rewritten, so that other workers never read a partially written file
+        temporary_path = '{0}.{1}'.format(self._cache_path, os.getpid())
+
+        try:
+            with open(temporary_path, mode='w') as cache_file:
+                json.dump(dict(repository_details, repoName=self._repo_name), cache_file)
+
+            os.replace(temporary_path, self._cache_path)
+        except OSError as error:
+            _logger.warning('Unable to save application information to %s: %s', self._cache_path, error)
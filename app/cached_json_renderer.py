@@ -0,0 +1,209 @@
+import collections
+import gzip
+import hashlib
+import json
+import threading
+
+from flask import Response, request
+
+# Brotli is optional, with responses only compressed using gzip when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class _RenderedBody():
+    __slots__ = ('mimetype', 'etag', 'encoded_bodies')
+
+    def __init__(self, mimetype, etag, encoded_bodies):
+        self.mimetype = mimetype
+        self.etag = etag
+
+        # Body for each content encoding, including 'identity' for the uncompressed body
+        self.encoded_bodies = encoded_bodies
+
+class _RenderedVersion():
+    __slots__ = ('source', 'bodies')
+
+    def __init__(self, source):
+        # A reference to the rendered results is kept, so that their id cannot be reused by other results while the version
+        # is cached, and is compared by identity before a body is reused in case the version was replaced concurrently
+        self.source = source
+
+        # Rendered body for each output format, rendered the first time the format is requested
+        self.bodies = {}
+
+class CachedJsonRenderer():
+    """ Renders results as JSON, keeping the rendered body and a strong ETag for each version of the results.
+    Results are cached by identity, as the parser returns the same object for as long as the results are unchanged,
+    so repeated requests are answered without serialising the results again. Requests with an If-None-Match header
+    matching the ETag are answered with HTTP 304, and Cache-Control allows caches in front of the application to serve
+    repeated reads. JSONP requests (with a callback parameter) are rendered on every request, as the body depends on the callback.
+    The serializer converts results into dictionaries and lists that can be rendered (e.g. converting match records).
+    Compressed variants of the body (brotli when available, and gzip) are built once for each version, and chosen using
+    the Accept-Encoding header of each request.
+    Only results that live beyond the request (e.g. held by the season snapshot) are cached. Callers rendering results built
+    for a single request pass cache=False, so that they are rendered and compressed (quickly, in the encoding accepted only)
+    on every request, rather than being compressed thoroughly and evicting the versions the cache is there to keep.
+    Results are rendered by the renderer (pretty-printed JSON) by default. Clients requesting the compact format, using
+    format=compact or by accepting the compact media type, receive JSON without whitespace, which is produced by the
+    C accelerated encoder of the json module (it is not used when indenting) and cached separately for each version.
+    """
+
+    # Preferred content encodings, in order of preference
+    _encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    _pretty_format = 'pretty'
+    _compact_format = 'compact'
+    compact_media_type = 'application/vnd.football-results.compact+json'
+
+    def __init__(self, renderer, serializer, max_versions=64, max_age_seconds=60):
+        self._renderer = renderer
+        self._serializer = serializer
+        self._max_versions = max_versions
+        self._max_age_seconds = max_age_seconds
+        self._versions = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._renders = 0
+        self._reuses = 0
+        self._uncached_renders = 0
+        self._not_modified_responses = 0
+        self._jsonp_responses = 0
+        self._encoded_responses = collections.Counter()
+        self._format_responses = collections.Counter()
+
+    def __call__(self, data, cache=True):
+        if request.args.get('callback'):
+            with self._lock:
+                self._jsonp_responses += 1
+
+            return self._renderer(self._serializer(data))
+
+        output_format = self._get_format()
+
+        if cache:
+            body = self._get_body(data, output_format)
+        else:
+            body = self._get_uncached_body(data, output_format)
+
+        encoding = self._get_encoding(body)
+
+        # Each encoding is a different representation of the results, so each has its own strong ETag
+        # (the ETags of the formats already differ, as they are derived from different bodies)
+        etag = body.etag if encoding == 'identity' else '{0}-{1}'.format(body.etag, encoding)
+
+        # If-None-Match uses the weak comparison, as proxies that compress responses (e.g. nginx) send back a weakened ETag
+        if request.if_none_match.contains_weak(etag):
+            with self._lock:
+                self._not_modified_responses += 1
+
+            response = Response(status=304)
+        else:
+            with self._lock:
+                self._encoded_responses[encoding] += 1
+                self._format_responses[output_format] += 1
+
+            response = Response(body.encoded_bodies[encoding], mimetype=body.mimetype)
+
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, max-age={0}'.format(self._max_age_seconds)
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+
+        return response
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'versions': len(self._versions),
+                'renders': self._renders,
+                'reuses': self._reuses,
+                'uncachedRenders': self._uncached_renders,
+                'notModifiedResponses': self._not_modified_responses,
+                'jsonpResponses': self._jsonp_responses,
+                'encodedResponses': dict(self._encoded_responses),
+                'formatResponses': dict(self._format_responses)
+            }
+
+    def _get_format(self):
+        requested_format = request.args.get('format')
+
+        if requested_format in (self._pretty_format, self._compact_format):
+            return requested_format
+
+        # Only an explicit compact media type selects the compact format, as browsers accept */*
+        if any(media_type == self.compact_media_type and quality > 0 for media_type, quality in request.accept_mimetypes):
+            return self._compact_format
+
+        return self._pretty_format
+
+    def _get_body(self, data, output_format):
+        with self._lock:
+            version = self._versions.get(id(data))
+
+            # Versions are keyed by id, which is only unique among objects that are alive, so the source is checked as well
+            if version is not None and version.source is data:
+                self._versions.move_to_end(id(data))
+                body = version.bodies.get(output_format)
+
+                if body is not None:
+                    self._reuses += 1
+                    return body
+            else:
+                version = _RenderedVersion(data)
+                self._versions[id(data)] = version
+
+                while len(self._versions) > self._max_versions:
+                    self._versions.popitem(last=False)
+
+        # Rendering happens outside the lock, so a format may occasionally be rendered twice by concurrent requests
+        # Results are only converted into a form that can be rendered as JSON when a new version is rendered
+        mimetype, rendered_body = self._render(data, output_format)
+        encoded_bodies = {'identity': rendered_body, 'gzip': gzip.compress(rendered_body, compresslevel=9)}
+
+        if brotli is not None:
+            encoded_bodies['br'] = brotli.compress(rendered_body)
+
+        body = _RenderedBody(mimetype, hashlib.sha256(rendered_body).hexdigest()[:32], self._get_smaller_bodies(encoded_bodies))
+
+        with self._lock:
+            self._renders += 1
+            version.bodies[output_format] = body
+
+        return body
+
+    def _get_uncached_body(self, data, output_format):
+        mimetype, rendered_body = self._render(data, output_format)
+        encoded_bodies = {'identity': rendered_body}
+
+        # Only the encoding that will be served is built, at a level that favours speed over size
+        if 'br' in self._encodings and request.accept_encodings['br'] > 0:
+            encoded_bodies['br'] = brotli.compress(rendered_body, quality=4)
+        elif request.accept_encodings['gzip'] > 0:
+            encoded_bodies['gzip'] = gzip.compress(rendered_body, compresslevel=1)
+
+        with self._lock:
+            self._uncached_renders += 1
+
+        return _RenderedBody(mimetype, hashlib.sha256(rendered_body).hexdigest()[:32], self._get_smaller_bodies(encoded_bodies))
+
+    def _render(self, data, output_format):
+        if output_format == self._compact_format:
+            return 'application/json', json.dumps(self._serializer(data), separators=(',', ':')).encode('utf-8')
+
+        rendered_response = self._renderer(self._serializer(data))
+        return rendered_response.mimetype, rendered_response.get_data()
+
+    def _get_smaller_bodies(self, encoded_bodies):
+        # A compressed variant is only served when it is smaller than the uncompressed body (e.g. not for tiny documents)
+        return {encoding: encoded_body for encoding, encoded_body in encoded_bodies.items()
+                if encoding == 'identity' or len(encoded_body) < len(encoded_bodies['identity'])}
+
+    def _get_encoding(self, body):
+        for encoding in self._encodings:
+            if encoding in body.encoded_bodies and request.accept_encodings[encoding] > 0:
+                return encoding
+
+        return 'identity'
@@ -0,0 +1,135 @@
+import collections
+import threading
+import time
+
+import requests
+
+class CircuitOpenError(requests.ConnectionError):
+    """ Raised instead of sending a request to sportstg while the circuit breaker is open.
+    It is a ConnectionError, so callers treat it in the same way as sportstg being unreachable.
+    """
+    pass
+
+class CircuitBreaker():
+    """ Stops requests being sent to sportstg while it is failing or slow, so that threads do not pile up waiting on it.
+    The outcomes of the most recent calls are kept in a sliding window, with calls that failed or took longer than the
+    slow call threshold counted as failures. While closed, every call is allowed, and once the window holds the minimum
+    number of calls with a failure rate at or above the threshold the breaker opens. While open, calls are rejected
+    without being sent until the open interval has elapsed, when the breaker becomes half-open and allows a limited
+    number of trial calls. A successful trial closes the breaker, while a failed trial opens it again.
+    """
+
+    closed_state = 'closed'
+    open_state = 'open'
+    half_open_state = 'half-open'
+
+    def __init__(self, failure_rate_threshold=0.5, slow_call_milliseconds=5000, window_size=20, minimum_calls=5,
+                 open_seconds=30, half_open_max_calls=1, clock=time.monotonic):
+        self._failure_rate_threshold = failure_rate_threshold
+        self._slow_call_milliseconds = slow_call_milliseconds
+        self._minimum_calls = minimum_calls
+        self._open_seconds = open_seconds
+        self._half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.closed_state
+        self._opened_at = None
+        self._trial_calls = 0
+        self._outcomes = collections.deque(maxlen=window_size)
+        self._times_opened = 0
+        self._rejected_calls = 0
+        self._slow_calls = 0
+        self._failed_calls = 0
+
+    def allow_request(self):
+        # Every call that is allowed must have its outcome recorded, as trial calls are only released when recorded
+        with self._lock:
+            if self._state == self.open_state:
+                if self._clock() - self._opened_at < self._open_seconds:
+                    self._rejected_calls += 1
+                    return False
+
+                self._state = self.half_open_state
+                self._trial_calls = 0
+
+            if self._state == self.half_open_state:
+                if self._trial_calls >= self._half_open_max_calls:
+                    self._rejected_calls += 1
+                    return False
+
+                self._trial_calls += 1
+
+            return True
+
+    def record_success(self, elapsed_milliseconds):
+        # A call that succeeded too slowly counts as a failure, as it still ties up a thread for too long
+        if elapsed_milliseconds >= self._slow_call_milliseconds:
+            with self._lock:
+                self._slow_calls += 1
+
+            self._record_outcome(False)
+        else:
+            self._record_outcome(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._failed_calls += 1
+
+        self._record_outcome(False)
+
+    def get_state(self):
+        with self._lock:
+            # An open breaker is reported as half-open once it would allow a trial call
+            if self._state == self.open_state and self._clock() - self._opened_at >= self._open_seconds:
+                return self.half_open_state
+
+            return self._state
+
+    def get_statistics(self):
+        state = self.get_state()
+
+        with self._lock:
+            return {
+                'state': state,
+                'failureRate': self._get_failure_rate(),
+                'windowCalls': len(self._outcomes),
+                'timesOpened': self._times_opened,
+                'rejectedCalls': self._rejected_calls,
+                'failedCalls': self._failed_calls,
+                'slowCalls': self._slow_calls,
+                'secondsUntilHalfOpen': None if state != self.open_state else round(self._open_seconds - (self._clock() - self._opened_at), 3)
+            }
+
+    def _record_outcome(self, succeeded):
+        with self._lock:
+            if self._state == self.half_open_state:
+                self._trial_calls = max(0, self._trial_calls - 1)
+
+                if succeeded:
+                    self._state = self.closed_state
+                    self._outcomes.clear()
+                else:
+                    self._open()
+
+                return
+
+            # Calls allowed before the breaker opened may finish while it is open, and do not affect it
+            if self._state == self.open_state:
+                return
+
+            self._outcomes.append(succeeded)
+
+            if len(self._outcomes) >= self._minimum_calls and self._get_failure_rate() >= self._failure_rate_threshold:
+                self._open()
+
+    def _open(self):
+        self._state = self.open_state
+        self._opened_at = self._clock()
+        self._times_opened += 1
+        self._outcomes.clear()
+
+    def _get_failure_rate(self):
+        if len(self._outcomes) == 0:
+            return 0.0
+
+        return round(self._outcomes.count(False) / len(self._outcomes), 3)
@@ -0,0 +1,100 @@
+import collections
+import hashlib
+import threading
+
+class _PageVersion():
+    __slots__ = ('etag', 'last_modified', 'digest', 'result')
+
+    def __init__(self, etag, last_modified, digest, result):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.result = result
+
+class ConditionalRequestStore():
+    """ Remembers the validators (ETag and Last-Modified) and a digest of the content of each page fetched,
+    together with the result of parsing that page. This allows conditional requests to be sent, and a page
+    that is unchanged (HTTP 304 or identical content) to reuse the earlier result instead of being parsed again.
+    """
+
+    def __init__(self, max_pages=256):
+        self._max_pages = max_pages
+        self._pages = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._not_modified_responses = 0
+        self._identical_content_responses = 0
+        self._changed_content_responses = 0
+
+    def get_request_headers(self, url):
+        with self._lock:
+            page_version = self._pages.get(url)
+
+        request_headers = {}
+
+        if page_version is not None:
+            if page_version.etag is not None:
+                request_headers['If-None-Match'] = page_version.etag
+
+            if page_version.last_modified is not None:
+                request_headers['If-Modified-Since'] = page_version.last_modified
+
+        return request_headers
+
+    def get_digest(self, http_response):
+        content = http_response.content
+
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+
+        return hashlib.sha256(content).hexdigest()
+
+    def get_unchanged_result(self, url, http_response, digest=None):
+        # Returns the result previously parsed from the page when it has not changed, otherwise None
+        with self._lock:
+            page_version = self._pages.get(url)
+
+            if page_version is None:
+                return None
+
+            if http_response.status_code == 304:
+                self._not_modified_responses += 1
+            elif http_response.status_code == 200 and digest == page_version.digest:
+                self._identical_content_responses += 1
+            else:
+                return None
+
+            self._pages.move_to_end(url)
+            return page_version.result
+
+    def remember(self, url, http_response, digest, result):
+        page_version = _PageVersion(http_response.headers.get('ETag'), http_response.headers.get('Last-Modified'), digest, result)
+
+        with self._lock:
+            self._changed_content_responses += 1
+            self._pages[url] = page_version
+            self._pages.move_to_end(url)
+
+            while len(self._pages) > self._max_pages:
+                self._pages.popitem(last=False)
+
+    def restore(self, url, etag, last_modified, digest, result):
+        # Remembers a page that was fetched by an earlier process, without counting it as a response
+        with self._lock:
+            if url not in self._pages:
+                self._pages[url] = _PageVersion(etag, last_modified, digest, result)
+
+                while len(self._pages) > self._max_pages:
+                    self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'pages': len(self._pages),
+                'notModifiedResponses': self._not_modified_responses,
+                'identicalContentResponses': self._identical_content_responses,
+                'changedContentResponses': self._changed_content_responses
+            }
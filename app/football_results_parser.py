@@ -1,8 +1,14 @@
+import re
+import time
+
 import requests
 from lxml import html
 
 from app.inversion_of_control import (Component, HasMethods, IsInstanceOf,
                                       RequiredFeature)
+from app.match_record import MatchRecord, from_serializable, to_serializable
+from app.season_snapshot import SeasonSnapshot
+from app.streaming_html_extractor import ExtractedPage, StreamingHtmlExtractor
 
 def ignore_exception(IgnoreException=Exception, DefaultVal=None):
     """ Decorator for ignoring exception from a function
@@ -19,6 +25,13 @@ def ignore_exception(IgnoreException=Exception, DefaultVal=None):
         return _dec
     return dec
 
+def is_error_result(result):
+    """ Returns whether a result cached by the parser (the results for a round, or the snapshot of the season)
+    holds the details of an error (e.g. a page that could not be found or parsed) rather than results.
+    """
+    results_dict = result.get_season_results() if isinstance(result, SeasonSnapshot) else result
+    return 'results' not in results_dict
+
 class FootballResultsParser(Component):
     _http_request = RequiredFeature('HttpRequest', HasMethods('get'))
     _http_get_scores_for_round_url_format = RequiredFeature('HttpGetScoresForRoundUrlFormat', IsInstanceOf(str))
@@ -27,36 +40,316 @@ class FootballResultsParser(Component):
     _xpath_get_scores = RequiredFeature('XpathGetScores', IsInstanceOf(str))
     _xpath_get_match_times = RequiredFeature('XpathGetMatchTimes', IsInstanceOf(str))
     _xpath_get_venues = RequiredFeature('XpathGetVenues', IsInstanceOf(str))
+    _xpath_get_round_names = RequiredFeature('XpathGetRoundNames', IsInstanceOf(str))
+    _html_extractor_mode = RequiredFeature('HtmlExtractorMode', IsInstanceOf(str))
+    _results_cache = RequiredFeature('ResultsCache', HasMethods('get', 'get_age_seconds'))
+    _single_flight = RequiredFeature('SingleFlight', HasMethods('do'))
+    _conditional_request_store = RequiredFeature('ConditionalRequestStore', HasMethods('get_request_headers', 'get_unchanged_result', 'remember'))
+    _round_fetch_executor = RequiredFeature('RoundFetchExecutor', HasMethods('submit'))
+    _results_store = RequiredFeature('ResultsStore', HasMethods('load', 'save', 'touch', 'get_age_seconds'))
+    _metrics = RequiredFeature('Metrics', HasMethods('observe_parse'))
+    _max_round_number = RequiredFeature('MaxRoundNumber', IsInstanceOf(int))
+
+    # Cache key used for the season snapshot, as round keys are the round number supplied by the caller
+    _season_cache_key = 'season'
+
+    # Round names on the season page are expected to be in the form 'Round 1', 'Round 2', etc.
+    _round_name_pattern = re.compile(r'Round\s+(\d+)', re.IGNORECASE)
 
     def __init__(self):
-        pass
+        self._streaming_html_extractor = None
 
     def get_scores_for_round(self, round_number):
-        url = self._http_get_scores_for_round_url_format.format(round_number)
-        html_response = self._http_request.get(url)
+        # Rounds are answered from the season snapshot where possible, only fetching the page for a round
+        # when the season page did not identify it (e.g. a round that has not been played yet)
+        snapshot = self.get_season_snapshot()
+        valid_round_number = self._get_valid_round_number(round_number, snapshot)
 
-        if html_response.status_code == 200:
-            return self._get_scores_for_found_page(html_response, round_number)
-        else:
-            return self._get_error_details_for_not_found_page(html_response, round_number)
+        if valid_round_number is None:
+            return self._get_error_details_for_invalid_round(round_number, snapshot)
+
+        round_results = snapshot.get_results_for_round(valid_round_number)
+
+        if round_results is not None:
+            return round_results
+
+        return self._get_scores_for_round_not_in_snapshot(valid_round_number)
+
+    def get_scores_for_rounds(self, round_numbers):
+        # Rounds that are not in the season snapshot are fetched concurrently on a bounded pool of threads shared by all requests,
+        # so that the results for many rounds take roughly as long to obtain as the results for the slowest round
+        snapshot = self.get_season_snapshot()
+        valid_round_numbers = {round_number: self._get_valid_round_number(round_number, snapshot) for round_number in round_numbers}
+        pending_rounds = {}
+
+        for round_number, valid_round_number in valid_round_numbers.items():
+            if valid_round_number is not None and snapshot.get_results_for_round(valid_round_number) is None:
+                pending_rounds[round_number] = self._round_fetch_executor.submit(self._get_scores_for_round_not_in_snapshot, valid_round_number)
+
+        rounds_results = []
+
+        for round_number in round_numbers:
+            if round_number in pending_rounds:
+                rounds_results.append(self._get_fetched_round_results(round_number, pending_rounds[round_number]))
+            elif valid_round_numbers[round_number] is None:
+                rounds_results.append(self._get_error_details_for_invalid_round(round_number, snapshot))
+            else:
+                rounds_results.append(snapshot.get_results_for_round(valid_round_numbers[round_number]))
+
+        return rounds_results
 
     def get_scores_for_season(self):
+        return self.get_season_snapshot().get_season_results()
+
+    def query_season(self, season_query, current_time):
+        # Returns the matches satisfying the query, or the details of the season page when it could not be parsed
+        snapshot = self.get_season_snapshot()
+
+        if 'results' not in snapshot.get_season_results():
+            return snapshot.get_season_results()
+
+        return snapshot.query(season_query, current_time)
+
+    def get_scores_for_team(self, team_name):
+        # Returns None when no matches were found for the team, or the details of the season page when it could not be parsed
+        snapshot = self.get_season_snapshot()
+
+        if 'results' not in snapshot.get_season_results():
+            return snapshot.get_season_results()
+
+        return snapshot.get_results_for_team(team_name)
+
+    def get_scores_for_venue(self, venue_name):
+        snapshot = self.get_season_snapshot()
+
+        if 'results' not in snapshot.get_season_results():
+            return snapshot.get_season_results()
+
+        return snapshot.get_results_for_venue(venue_name)
+
+    def get_season_snapshot(self):
+        # A process that has not fetched the season page yet serves the snapshot persisted by an earlier process.
+        # When there is nothing to serve and the page cannot be fetched (e.g. while the circuit breaker is open),
+        # the details of the failed request are returned without being cached.
         url = self._http_get_scores_for_season_url_format
-        html_response = self._http_request.get(url)
 
-        if html_response.status_code == 200:
-            return self._get_scores_for_found_page(html_response)
+        try:
+            return self._results_cache.get(self._season_cache_key, self._fetch_season_snapshot,
+                                           lambda: self._restore_page(url, SeasonSnapshot.from_document))
+        except requests.RequestException as error:
+            return SeasonSnapshot(self._get_error_details_for_failed_request('', url, error))
+
+    def get_season_age_seconds(self):
+        # Returns how long ago the season page was fetched, or None if it has not been fetched or restored yet
+        return self._results_cache.get_age_seconds(self._season_cache_key)
+
+    def get_rounds_age_seconds(self, round_numbers):
+        # Returns how long ago the oldest of the pages the rounds are answered from was fetched (the season page, or the page of a
+        # round that is not on the season page), or None if none of them has been fetched or restored yet
+        try_parse_int = ignore_exception(ValueError, None)(int)
+        snapshot = self._results_cache.peek(self._season_cache_key)
+        keys = set()
+
+        for round_number in round_numbers:
+            if snapshot is not None and snapshot.get_results_for_round(try_parse_int(round_number)) is not None:
+                keys.add(self._season_cache_key)
+            else:
+                keys.add(str(round_number))
+
+        ages_seconds = [age_seconds for age_seconds in map(self._results_cache.get_age_seconds, keys) if age_seconds is not None]
+        return max(ages_seconds) if len(ages_seconds) > 0 else None
+
+    def refresh_season(self):
+        return self._results_cache.refresh(self._season_cache_key, self._fetch_season_snapshot)
+
+    def refresh_round(self, round_number):
+        # Rounds answered from the season snapshot are refreshed by refreshing the season page
+        if self.get_season_snapshot().get_results_for_round(round_number) is not None:
+            return self.refresh_season().get_results_for_round(round_number)
+
+        return self._results_cache.refresh(str(round_number), lambda: self._fetch_scores_for_round(round_number))
+
+    def get_round_numbers_fetched_individually(self):
+        # Rounds that were not on the season page, and have had results parsed from their own page
+        try_parse_int = ignore_exception(ValueError, None)(int)
+        round_numbers = []
+
+        for key in self._results_cache.get_keys():
+            round_number = try_parse_int(key)
+            round_results = self._results_cache.peek(key)
+
+            if key != self._season_cache_key and round_number is not None and round_results is not None and 'results' in round_results:
+                round_numbers.append(round_number)
+
+        return sorted(round_numbers)
+
+    def set_season_refresh_interval(self, interval_seconds):
+        # Cached results are served without being refreshed until the interval has elapsed, or indefinitely if it is None
+        self._results_cache.set_ttl(self._season_cache_key, interval_seconds)
+
+    def set_round_refresh_interval(self, round_number, interval_seconds):
+        self._results_cache.set_ttl(str(round_number), interval_seconds)
+
+    def _get_valid_round_number(self, round_number, snapshot):
+        # Returns the round number as an integer, or None if no such round can exist. Rounds are numbered from 1 up to the
+        # configured maximum, or up to the last round on the season page for a season with more rounds than that.
+        # Rounds are validated before the results cache is used, so that requests for any other round (e.g. /round/123456)
+        # neither become cache keys nor are sent to sportstg.
+        try_parse_int = ignore_exception(ValueError, None)(int)
+        parsed_round_number = try_parse_int(round_number)
+        max_round_number = max([self._max_round_number] + snapshot.get_round_numbers())
+
+        if parsed_round_number is None or parsed_round_number < 1 or parsed_round_number > max_round_number:
+            return None
+
+        return parsed_round_number
+
+    def _get_scores_for_round_not_in_snapshot(self, round_number):
+        url = self._http_get_scores_for_round_url_format.format(round_number)
+
+        try:
+            return self._results_cache.get(str(round_number), lambda: self._fetch_scores_for_round(round_number),
+                                           lambda: self._restore_page(url, from_serializable))
+        except requests.RequestException as error:
+            return self._get_error_details_for_failed_request(round_number, url, error)
+
+    def _restore_page(self, url, from_document):
+        # Returns the persisted results of the page and their age, or None if the page has not been persisted
+        persisted_page = self._results_store.load(url)
+
+        if persisted_page is None:
+            return None
+
+        result = from_document(persisted_page.document)
+
+        # The validators of the persisted page allow its next fetch to be conditional
+        self._conditional_request_store.restore(url, persisted_page.etag, persisted_page.last_modified, persisted_page.digest, result)
+
+        return result, self._results_store.get_age_seconds(persisted_page)
+
+    def _get_fetched_round_results(self, round_number, pending_round):
+        # A failure to obtain one round is reported in the results for that round, rather than failing every round
+        try:
+            return pending_round.result()
+        except Exception as error:
+            url = self._http_get_scores_for_round_url_format.format(round_number)
+            return self._get_error_details_for_failed_request(round_number, url, error)
+
+    def _fetch_scores_for_round(self, round_number):
+        url = self._http_get_scores_for_round_url_format.format(round_number)
+
+        return self._fetch_page(url,
+                                lambda html_response: self._get_scores_for_found_page(html_response, round_number),
+                                lambda html_response: self._get_error_details_for_not_found_page(html_response, round_number),
+                                to_serializable)
+
+    def _fetch_season_snapshot(self):
+        url = self._http_get_scores_for_season_url_format
+
+        return self._fetch_page(url,
+                                self._get_season_snapshot_for_found_page,
+                                lambda html_response: SeasonSnapshot(self._get_error_details_for_not_found_page(html_response)),
+                                SeasonSnapshot.to_document)
+
+    def _fetch_page(self, url, parse_found_page, parse_not_found_page, to_document):
+        # Concurrent requests for the same page share a single fetch and parse
+        return self._single_flight.do(url, lambda: self._fetch_and_parse_page(url, parse_found_page, parse_not_found_page, to_document))
+
+    def _fetch_and_parse_page(self, url, parse_found_page, parse_not_found_page, to_document):
+        # Conditional headers are only sent once the page has been fetched before
+        request_headers = self._conditional_request_store.get_request_headers(url)
+
+        if len(request_headers) > 0:
+            html_response = self._http_request.get(url, headers=request_headers)
         else:
-            return self._get_error_details_for_not_found_page(html_response)
+            html_response = self._http_request.get(url)
+
+        digest = None
+
+        if html_response.status_code == 200:
+            digest = self._conditional_request_store.get_digest(html_response)
+
+        # A page that has not changed since it was last parsed (HTTP 304 or identical content) is not parsed again
+        unchanged_result = self._conditional_request_store.get_unchanged_result(url, html_response, digest)
+
+        if unchanged_result is not None:
+            self._results_store.touch(url)
+            return unchanged_result
+
+        if html_response.status_code != 200:
+            return parse_not_found_page(html_response)
+
+        result = parse_found_page(html_response)
+        self._conditional_request_store.remember(url, html_response, digest, result)
+
+        # Results are written through to disk, so that they can be served by processes started later
+        self._results_store.save(url, html_response.headers.get('ETag'), html_response.headers.get('Last-Modified'), digest, to_document(result))
+
+        return result
+
+    def _get_season_snapshot_for_found_page(self, html_response):
+        # The season page is parsed once, with the same pass identifying the round of each match
+        start_time = time.perf_counter()
+        extracted_page = self._extract_page(html_response.content, include_match_round_names=True)
+        season_results = self._get_scores_for_extracted_page(extracted_page, html_response)
+        match_rounds = None
+
+        if 'results' in season_results:
+            match_rounds = [self._get_round_number(round_name) for round_name in extracted_page.match_round_names]
+
+        self._observe_parse('season', start_time, season_results)
+        return SeasonSnapshot(season_results, match_rounds)
 
     def _get_scores_for_found_page(self, html_response, round_number=''):
+        start_time = time.perf_counter()
+        extracted_page = self._extract_page(html_response.content)
+        round_results = self._get_scores_for_extracted_page(extracted_page, html_response, round_number)
+        self._observe_parse('round', start_time, round_results)
+        return round_results
+
+    def _observe_parse(self, page, start_time, results_dict):
+        number_of_matches = len(results_dict['results']) if 'results' in results_dict else None
+        self._metrics.observe_parse(page, time.perf_counter() - start_time, number_of_matches)
+
+    def _extract_page(self, content, include_match_round_names=False):
+        streaming_html_extractor = self._get_streaming_html_extractor()
+
+        if streaming_html_extractor is not None:
+            return streaming_html_extractor.extract(content, include_match_round_names)
+
+        tree = html.fromstring(content)
+        match_round_names = None
+
+        if include_match_round_names:
+            match_round_names = self._get_match_round_names(tree)
+
+        return ExtractedPage(tree.xpath(self._xpath_get_teams),
+                             tree.xpath(self._xpath_get_scores),
+                             tree.xpath(self._xpath_get_match_times),
+                             tree.xpath(self._xpath_get_venues),
+                             match_round_names)
+
+    def _get_streaming_html_extractor(self):
+        # The streaming extractor is only used when enabled and every XPath expression can be evaluated while streaming,
+        # otherwise the full tree is built and queried
+        if self._html_extractor_mode != 'streaming':
+            return None
+
+        if self._streaming_html_extractor is None:
+            xpaths = (self._xpath_get_teams, self._xpath_get_scores, self._xpath_get_match_times, self._xpath_get_venues, self._xpath_get_round_names)
+
+            if StreamingHtmlExtractor.supports(*xpaths):
+                self._streaming_html_extractor = StreamingHtmlExtractor(*xpaths)
+
+        return self._streaming_html_extractor
+
+    def _get_scores_for_extracted_page(self, extracted_page, html_response, round_number=''):
         try_parse_int = ignore_exception(ValueError, 'All')(int)
         results_dict = {'round': try_parse_int(round_number)}
-        tree = html.fromstring(html_response.content)
-        teams = tree.xpath(self._xpath_get_teams)
-        scores = tree.xpath(self._xpath_get_scores)
-        match_times = tree.xpath(self._xpath_get_match_times)
-        venues = tree.xpath(self._xpath_get_venues)
+        teams = extracted_page.teams
+        scores = extracted_page.scores
+        match_times = extracted_page.match_times
+        venues = extracted_page.venues
         number_of_teams = len(teams)
         number_of_scores = len(scores)
         number_of_match_times = len(match_times)
@@ -84,6 +377,30 @@ class FootballResultsParser(Component):
 
         return results_dict
 
+    def _get_match_round_names(self, tree):
+        # A union of the round names and match times is returned in document order,
+        # so each match belongs to the round name that most recently preceded its match time
+        round_name_elements = set(round_name.getparent() for round_name in tree.xpath(self._xpath_get_round_names))
+        union_xpath = '{0} | {1}'.format(self._xpath_get_round_names, self._xpath_get_match_times)
+        current_round_name = None
+        match_round_names = []
+
+        for text in tree.xpath(union_xpath):
+            if text.getparent() in round_name_elements:
+                current_round_name = text
+            else:
+                match_round_names.append(current_round_name)
+
+        return match_round_names
+
+    def _get_round_number(self, round_name):
+        round_name_match = None
+
+        if round_name is not None:
+            round_name_match = self._round_name_pattern.search(round_name)
+
+        return int(round_name_match.group(1)) if round_name_match else None
+
     def _get_results(self, teams, venues, match_times, scores):
         # There is the possibility that some games do not have scores
         # (e.g. postponed games), so convert non-integer values to None
@@ -96,25 +413,12 @@ class FootballResultsParser(Component):
         # Teams appear in home team, away team, home team, away team order.
         # Thus scores appear in home score, away score, home score, away score order.
         while team_index < len(teams) - 1:
-            result = {
-                'venue': venues[match_time_index],
-                'timeOfMatch': match_times[match_time_index],
-                'homeTeam': teams[team_index],
-                'homeScore': try_parse_int(scores[team_index]),
-                'awayTeam': teams[team_index + 1],
-                'awayScore': try_parse_int(scores[team_index + 1])
-            }
-
-            if result['homeScore'] is None or result['awayScore'] is None:
-                result['result'] = None
-            elif result['homeScore'] > result['awayScore']:
-                result['result'] = 'Winner: {0}'.format(result['homeTeam'])
-            elif result['homeScore'] < result['awayScore']:
-                result['result'] = 'Winner: {0}'.format(result['awayTeam'])
-            else:
-                result['result'] = 'Draw'
-
-            results.append(result)
+            results.append(MatchRecord(venues[match_time_index],
+                                       match_times[match_time_index],
+                                       teams[team_index],
+                                       try_parse_int(scores[team_index]),
+                                       teams[team_index + 1],
+                                       try_parse_int(scores[team_index + 1])))
 
             team_index += 2
             match_time_index += 1
@@ -130,6 +434,24 @@ class FootballResultsParser(Component):
             'errorMessage': error_message
         }
 
+    def _get_error_details_for_failed_request(self, round_number, url, error):
+        try_parse_int = ignore_exception(ValueError, 'All')(int)
+
+        return {
+            'round': try_parse_int(round_number),
+            'urlInvoked': url,
+            'errorMessage': 'Unable to obtain results: {0}'.format(error)
+        }
+
+    def _get_error_details_for_invalid_round(self, round_number, snapshot):
+        try_parse_int = ignore_exception(ValueError, round_number)(int)
+        max_round_number = max([self._max_round_number] + snapshot.get_round_numbers())
+
+        return {
+            'invalidRoundSpecified': try_parse_int(round_number),
+            'errorMessage': 'Rounds are numbered from 1 to {0}'.format(max_round_number)
+        }
+
     def _get_error_details_for_not_found_page(self, html_response, round_number=''):
         try_parse_int = ignore_exception(ValueError, 'All')(int)
 
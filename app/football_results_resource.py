@@ -1,16 +1,38 @@
-from flask_restful import Resource
+from datetime import datetime, tzinfo
 
-from app.inversion_of_control import HasMethods, RequiredFeature, features
+from flask import Response, request
+from flask_restful import Resource, abort
+
+from app.inversion_of_control import HasMethods, IsInstanceOf, RequiredFeature, features
+from app.season_query import SeasonQuery
+
+def _is_long_lived(results):
+    # Parsed results are kept by the season snapshot or the results cache, whereas the details of a request to sportstg
+    # that failed are built for each request, so only parsed results are worth caching once rendered
+    return 'results' in results
 
 class FootballSeasonResultsResource(Resource):
-    _football_results_parser = RequiredFeature('FootballSeasonResultsParser', HasMethods('get_scores_for_season'))
+    _football_results_parser = RequiredFeature('FootballSeasonResultsParser', HasMethods('get_scores_for_season', 'query_season'))
+    _match_timezone = RequiredFeature('MatchTimezone', IsInstanceOf(tzinfo))
     _pretty_json_renderer = RequiredFeature('PrettyJson')
 
     def __init__(self):
         pass
 
     def get(self):
-        return self._pretty_json_renderer(self._football_results_parser.get_scores_for_season())
+        # The full season is returned unless the results are filtered (e.g. ?team=bentleigh-greens&status=played) or paginated
+        try:
+            season_query = SeasonQuery.from_arguments(request.args)
+        except ValueError as error:
+            abort(400, message=str(error))
+
+        if season_query is None:
+            season_results = self._football_results_parser.get_scores_for_season()
+            return self._pretty_json_renderer(season_results, cache=_is_long_lived(season_results))
+
+        # Each combination of filters, cursor and limit is a different object, so queries are not kept once rendered,
+        # as they would otherwise evict the rendered versions of the season, rounds and teams
+        return self._pretty_json_renderer(self._football_results_parser.query_season(season_query, datetime.now(self._match_timezone)), cache=False)
 
 class FootballRoundResultsResource(Resource):
     _football_results_parser = RequiredFeature('FootballRoundResultsParser', HasMethods('get_scores_for_round'))
@@ -20,40 +42,169 @@ class FootballRoundResultsResource(Resource):
         pass
 
     def get(self, round_number):
-        return self._pretty_json_renderer(self._football_results_parser.get_scores_for_round(round_number))
+        round_results = self._football_results_parser.get_scores_for_round(round_number)
+        return self._pretty_json_renderer(round_results, cache=_is_long_lived(round_results))
+
+class FootballMultipleRoundResultsResource(Resource):
+    _football_results_parser = RequiredFeature('FootballRoundResultsParser', HasMethods('get_scores_for_rounds'))
+    _pretty_json_renderer = RequiredFeature('PrettyJson')
+
+    # Limits the number of rounds that can be requested at once, so that a single request cannot flood sportstg
+    _max_rounds = 50
+
+    def __init__(self):
+        pass
+
+    def get(self):
+        round_numbers = self._get_round_numbers(request.args)
+        # The rounds are combined into a new object for each request, so it is not kept once rendered
+        return self._pretty_json_renderer({'rounds': self._football_results_parser.get_scores_for_rounds(round_numbers)}, cache=False)
+
+    def _get_round_numbers(self, arguments):
+        # Rounds are specified either as a list (e.g. ?numbers=1,4,7) or as an inclusive range (e.g. ?from=1&to=10)
+        try:
+            if 'numbers' in arguments:
+                round_numbers = [int(round_number) for round_number in arguments['numbers'].split(',')]
+            elif 'from' in arguments and 'to' in arguments:
+                first_round_number = int(arguments['from'])
+                last_round_number = int(arguments['to'])
+            else:
+                abort(400, message='Rounds must be specified using either the numbers parameter, or the from and to parameters')
+        except ValueError:
+            abort(400, message='Round numbers must be integers')
+
+        # The size of a range is checked before the range is built, so that a huge range (e.g. ?from=1&to=20000000)
+        # is rejected without building a list of every round in it
+        if 'numbers' not in arguments:
+            if last_round_number < first_round_number:
+                abort(400, message='The from round must not be after the to round')
+
+            if last_round_number - first_round_number + 1 > self._max_rounds:
+                abort(400, message='No more than {0} rounds can be requested at once'.format(self._max_rounds))
+
+            round_numbers = list(range(first_round_number, last_round_number + 1))
+
+        if len(round_numbers) == 0:
+            abort(400, message='No rounds were specified')
+
+        if len(round_numbers) > self._max_rounds:
+            abort(400, message='No more than {0} rounds can be requested at once'.format(self._max_rounds))
+
+        return round_numbers
+
+class FootballTeamResultsResource(Resource):
+    _football_results_parser = RequiredFeature('FootballSeasonResultsParser', HasMethods('get_scores_for_team'))
+    _pretty_json_renderer = RequiredFeature('PrettyJson')
+
+    def __init__(self):
+        pass
+
+    def get(self, team_name):
+        team_results = self._football_results_parser.get_scores_for_team(team_name)
+
+        if team_results is None:
+            abort(404, message='No matches were found for team {0}'.format(team_name))
+
+        return self._pretty_json_renderer(team_results, cache=_is_long_lived(team_results))
+
+class FootballVenueResultsResource(Resource):
+    _football_results_parser = RequiredFeature('FootballSeasonResultsParser', HasMethods('get_scores_for_venue'))
+    _pretty_json_renderer = RequiredFeature('PrettyJson')
+
+    def __init__(self):
+        pass
+
+    def get(self, venue_name):
+        venue_results = self._football_results_parser.get_scores_for_venue(venue_name)
+
+        if venue_results is None:
+            abort(404, message='No matches were found at venue {0}'.format(venue_name))
+
+        return self._pretty_json_renderer(venue_results, cache=_is_long_lived(venue_results))
+
+class FootballLeagueTableResource(Resource):
+    _football_results_parser = RequiredFeature('FootballSeasonResultsParser', HasMethods('get_scores_for_season'))
+    _league_table = RequiredFeature('LeagueTable', HasMethods('get_table'))
+    _pretty_json_renderer = RequiredFeature('PrettyJson')
+
+    def __init__(self):
+        pass
+
+    def get(self):
+        season_results = self._football_results_parser.get_scores_for_season()
+
+        # The details of a season page that could not be parsed are returned, rather than a table that may be out of date
+        if 'results' not in season_results:
+            return self._pretty_json_renderer(season_results, cache=False)
+
+        return self._pretty_json_renderer(self._league_table.get_table(season_results))
 
 class RootEndpointResource(Resource):
     _pretty_json_renderer = RequiredFeature('PrettyJson')
 
+    # The same document is returned on every request, so that its rendered JSON is reused
+    _app_doc = {
+        'application' : 'NPL Victoria 2018 Football Results',
+        'purpose' : 'RESTful API for obtaining football results of the NPL Victoria 2018 competition',
+        'endpoints' : [
+            {
+                'endpoint' : '/',
+                'purpose' : 'Gets a description of the application (this document)'
+            },
+            {
+                'endpoint' : '/season',
+                'purpose' : 'Get entire 2018 season results'
+            },
+            {
+                'endpoint' : '/season?from=<date>&to=<date>&fromRound=<round_number>&toRound=<round_number>&team=<team_name>&status=<played|unplayed|postponed>&limit=<count>&cursor=<cursor>',
+                'purpose' : 'Get the season results satisfying any combination of filters, a page at a time when a limit is specified'
+            },
+            {
+                'endpoint' : '/round/<round_number>',
+                'purpose' : 'Get the results for a specified round'
+            },
+            {
+                'endpoint' : '/rounds?numbers=<round_number>,<round_number>,... or /rounds?from=<round_number>&to=<round_number>',
+                'purpose' : 'Get the results for several rounds at once'
+            },
+            {
+                'endpoint' : '/team/<team_name>',
+                'purpose' : 'Get the results for the matches of a team (e.g. /team/bentleigh-greens)'
+            },
+            {
+                'endpoint' : '/venue/<venue_name>',
+                'purpose' : 'Get the results for the matches played at a venue'
+            },
+            {
+                'endpoint' : '/table',
+                'purpose' : 'Get the league table, with the points, goal difference, wins, draws, losses and form of each team'
+            },
+            {
+                'endpoint' : '/metrics',
+                'purpose' : 'Get request, upstream, parse and cache metrics in the Prometheus text format'
+            },
+            {
+                'endpoint' : '/healthCheck',
+                'purpose' : 'Get results of a system health check'
+            },
+            {
+                'endpoint' : '/environmentDump',
+                'purpose' : 'Gets a dump of the environment this application is running from, including application details'
+            }
+        ]
+    }
+
+    def __init__(self):
+        pass
+
+    def get(self):
+        return self._pretty_json_renderer(self._app_doc)
+
+class MetricsResource(Resource):
+    _metrics = RequiredFeature('Metrics', HasMethods('render', 'get_content_type'))
+
     def __init__(self):
         pass
 
     def get(self):
-        app_doc = {
-            'application' : 'NPL Victoria 2018 Football Results',
-            'purpose' : 'RESTful API for obtaining football results of the NPL Victoria 2018 competition',
-            'endpoints' : [
-                {
-                    'endpoint' : '/',
-                    'purpose' : 'Gets a description of the application (this document)'
-                },
-                {
-                    'endpoint' : '/season',
-                    'purpose' : 'Get entire 2018 season results'
-                },
-                {
-                    'endpoint' : '/round/<round_number>',
-                    'purpose' : 'Get the results for a specified round'
-                },
-                {
-                    'endpoint' : '/healthCheck',
-                    'purpose' : 'Get results of a system health check'
-                },
-                {
-                    'endpoint' : '/environmentDump',
-                    'purpose' : 'Gets a dump of the environment this application is running from, including application details'
-                }
-            ]
-        }
-
-        return self._pretty_json_renderer(app_doc)
+        return Response(self._metrics.render(), content_type=self._metrics.get_content_type())
@@ -4,18 +4,125 @@
 ## Obtained from http://code.activestate.com/recipes/413268/
 ######################################################################
 
+import threading
+import time
+
+######################################################################
+## Lifetimes of features provided with ProvideScoped
+##   Singleton - built once, on first use, and shared by every thread
+##   PerThread - built once for each thread that uses it
+##   PerRequest - built once for each request (between BeginRequest
+##                and EndRequest on the thread handling the request)
+##   Transient - built every time it is used
+## Features provided with Provide keep their original behaviour: a
+## callable provider is called on every lookup, and RequiredFeature
+## keeps the first value it obtains.
+######################################################################
+
+Singleton = 'singleton'
+PerThread = 'thread'
+PerRequest = 'request'
+Transient = 'transient'
+
+_NotBuilt = object()
+
+class ScopedProvider(object):
+   "Builds the value of a feature according to its lifetime, with singletons built under a lock so that they are built once"
+   def __init__(self, broker, feature, lifetime, factory, args, kwargs):
+      assert lifetime in (Singleton, PerThread, PerRequest, Transient), "Unknown lifetime %r of %r" % (lifetime, feature)
+      self.broker = broker
+      self.feature = feature
+      self.lifetime = lifetime
+      self.factory = factory
+      self.args = args
+      self.kwargs = kwargs
+      self.instance = _NotBuilt
+      self.lock = threading.Lock()
+      self.threadInstances = threading.local()
+   def __call__(self):
+      if self.lifetime == Singleton:
+         instance = self.instance
+         if instance is _NotBuilt:
+            with self.lock:
+               if self.instance is _NotBuilt:
+                  self.instance = self.Build()
+               instance = self.instance
+         return instance
+      if self.lifetime == PerThread:
+         instance = getattr(self.threadInstances, 'instance', _NotBuilt)
+         if instance is _NotBuilt:
+            instance = self.threadInstances.instance = self.Build()
+         return instance
+      if self.lifetime == PerRequest:
+         instances = self.broker.GetRequestInstances()
+         assert instances is not None, "%r is a per-request feature and no request has begun" % self.feature
+         instance = instances.get(self.feature, _NotBuilt)
+         if instance is _NotBuilt:
+            instance = instances[self.feature] = self.Build()
+         return instance
+      return self.Build()
+   def Build(self):
+      return self.broker.Build(self.feature, self.lifetime, self.factory, self.args, self.kwargs)
+   def Refresh(self):
+      # Singletons and the instance of the calling thread are built again when next used
+      with self.lock:
+         self.instance = _NotBuilt
+      self.threadInstances.__dict__.pop('instance', None)
+
 class FeatureBroker:
    def __init__(self, allowReplace=False):
       self.providers = {}
       self.allowReplace = allowReplace
+      self.requestScope = threading.local()
+      self.statisticsLock = threading.Lock()
+      self.buildStatistics = {}
    def Provide(self, feature, provider, *args, **kwargs):
       if not self.allowReplace:
          assert not feature in self.providers, "Duplicate feature: %r" % feature
       if callable(provider):
-         def call(): return provider(*args, **kwargs)
+         def call(): return self.Build(feature, Transient, provider, args, kwargs)
       else:
          def call(): return provider
       self.providers[feature] = call
+   def ProvideScoped(self, feature, lifetime, provider, *args, **kwargs):
+      "Provides a feature built by calling the provider with the arguments, once for each use within its lifetime"
+      if not self.allowReplace:
+         assert not feature in self.providers, "Duplicate feature: %r" % feature
+      self.providers[feature] = ScopedProvider(self, feature, lifetime, provider, args, kwargs)
+   def IsScoped(self, feature):
+      return isinstance(self.providers.get(feature), ScopedProvider)
+   def Refresh(self, feature):
+      "Discards the singleton (or per-thread) value of a scoped feature, so that it is built again when next used"
+      provider = self.providers[feature]
+      assert isinstance(provider, ScopedProvider), "%r was not provided with a lifetime" % feature
+      provider.Refresh()
+   def BeginRequest(self):
+      self.requestScope.instances = {}
+   def EndRequest(self):
+      self.requestScope.instances = None
+   def GetRequestInstances(self):
+      return getattr(self.requestScope, 'instances', None)
+   def Build(self, feature, lifetime, factory, args, kwargs):
+      startTime = time.perf_counter()
+      instance = factory(*args, **kwargs)
+      elapsedMilliseconds = (time.perf_counter() - startTime) * 1000
+      with self.statisticsLock:
+         statistics = self.buildStatistics.get(feature)
+         if statistics is None:
+            statistics = self.buildStatistics[feature] = {'lifetime': lifetime, 'builds': 0, 'totalMilliseconds': 0.0, 'maxMilliseconds': 0.0}
+         statistics['lifetime'] = lifetime
+         statistics['builds'] += 1
+         statistics['totalMilliseconds'] += elapsedMilliseconds
+         statistics['maxMilliseconds'] = max(statistics['maxMilliseconds'], elapsedMilliseconds)
+      return instance
+   def GetResolutionReport(self):
+      "Number of times each feature was built and how long building it took, for features with a callable provider"
+      with self.statisticsLock:
+         return {feature: {'lifetime': statistics['lifetime'],
+                           'builds': statistics['builds'],
+                           'totalMilliseconds': round(statistics['totalMilliseconds'], 3),
+                           'maxMilliseconds': round(statistics['maxMilliseconds'], 3)}
+                 for feature, statistics in self.buildStatistics.items()}
    def __getitem__(self, feature):
       try:
          provider = self.providers[feature]
@@ -68,17 +175,29 @@ class RequiredFeature(object):
    def __init__(self, feature, assertion=NoAssertion):
       self.feature = feature
       self.assertion = assertion
+      self.scoped = False
+      self.verified = None
    def __get__(self, obj, T):
+      # Features provided with a lifetime are requested on every use, as their value depends on the thread or request
+      if self.scoped:
+         return self.Request()
       return self.result # <-- will request the feature upon first call
    def __getattr__(self, name):
       assert name == 'result', "Unexpected attribute request other than 'result'"
-      self.result = self.Request()
-      return self.result
+      result = self.Request()
+      if not self.scoped:
+         self.result = result
+      return result
    def Request(self):
+      self.scoped = features.IsScoped(self.feature)
       obj = features[self.feature]
-      assert self.assertion(obj), \
-             "The value %r of %r does not match the specified criteria" \
-             % (obj, self.feature)
+      # The criteria are only checked when the value differs from the value last checked (e.g. a singleton is checked once)
+      if obj is not self.verified:
+         assert self.assertion(obj), \
+                "The value %r of %r does not match the specified criteria" \
+                % (obj, self.feature)
+         if self.scoped:
+            self.verified = obj
       return obj
 
 class Component(object):
@@ -0,0 +1,195 @@
+import threading
+from datetime import datetime, timezone
+
+from app.refresh_policy import parse_match_time
+
+class _TeamRow():
+    __slots__ = ('team', 'fixtures', 'played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'form_results')
+
+    def __init__(self, team):
+        self.team = team
+
+        # Number of matches (with or without a score) the team appears in, so that the row is removed along with its last match
+        self.fixtures = 0
+        self.played = 0
+        self.won = 0
+        self.drawn = 0
+        self.lost = 0
+        self.goals_for = 0
+        self.goals_against = 0
+
+        # Letter (W, D or L) for each match with a score, keyed by match key
+        self.form_results = {}
+
+class LeagueTable():
+    """ Standings of each team, maintained incrementally from the season results.
+    The matches of each version of the season results are compared with the matches of the previous version,
+    and only matches that were added, removed or had their score changed are applied to the rows of their two teams.
+    The table is only built again when a row has changed, so that every version of the table is the same object
+    (allowing its rendered JSON to be reused).
+    """
+
+    _earliest_kickoff = datetime.min.replace(tzinfo=timezone.utc)
+
+    def __init__(self, points_for_win=3, points_for_draw=1, form_length=5, match_timezone=timezone.utc):
+        self._points_for_win = points_for_win
+        self._points_for_draw = points_for_draw
+        self._form_length = form_length
+        self._match_timezone = match_timezone
+        self._lock = threading.Lock()
+        self._applied_results = None
+        self._matches = {}
+        self._rows = {}
+        self._row_summaries = {}
+        self._table = {'table': []}
+        self._updates = 0
+        self._matches_applied = 0
+        self._rows_updated = 0
+
+    def get_table(self, season_results):
+        with self._lock:
+            # Results are only compared when the parser has returned a new version of them
+            if season_results is not self._applied_results:
+                self._update(season_results)
+
+            return self._table
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'teams': len(self._rows),
+                'matches': len(self._matches),
+                'updates': self._updates,
+                'matchesApplied': self._matches_applied,
+                'rowsUpdated': self._rows_updated
+            }
+
+    def _update(self, season_results):
+        self._applied_results = season_results
+
+        # Results that could not be parsed (e.g. the page could not be found) leave the table as it was
+        if 'results' not in season_results:
+            return
+
+        matches = self._get_matches_by_key(season_results['results'])
+        changed_teams = set()
+
+        for key, match in list(self._matches.items()):
+            if key not in matches or not self._is_same_result(match, matches[key]):
+                self._apply(key, match, -1)
+                changed_teams.update((match.home_team, match.away_team))
+
+        for key, match in matches.items():
+            if key not in self._matches or not self._is_same_result(self._matches[key], match):
+                self._apply(key, match, 1)
+                changed_teams.update((match.home_team, match.away_team))
+
+        self._matches = matches
+        self._updates += 1
+
+        if len(changed_teams) == 0:
+            return
+
+        # Only the rows of teams in changed matches are summarised again, with the other rows reused when sorting the table
+        for team in changed_teams:
+            if team in self._rows:
+                self._row_summaries[team] = self._get_row_summary(self._rows[team])
+            else:
+                self._row_summaries.pop(team, None)
+
+        self._rows_updated += len(changed_teams)
+        self._table = self._build_table()
+
+    def _get_matches_by_key(self, matches):
+        # Matches are identified by their teams and kick-off, with an occurrence number in case the same key appears twice
+        matches_by_key = {}
+
+        for match in matches:
+            occurrence = 0
+
+            while (match.home_team, match.away_team, match.time_of_match, occurrence) in matches_by_key:
+                occurrence += 1
+
+            matches_by_key[(match.home_team, match.away_team, match.time_of_match, occurrence)] = match
+
+        return matches_by_key
+
+    def _is_same_result(self, match, other_match):
+        return match.home_score == other_match.home_score and match.away_score == other_match.away_score
+
+    def _apply(self, key, match, sign):
+        # A sign of 1 adds the match to the rows of its teams, and a sign of -1 removes it
+        self._matches_applied += 1
+        home_row = self._get_row(match.home_team)
+        away_row = self._get_row(match.away_team)
+        home_row.fixtures += sign
+        away_row.fixtures += sign
+
+        if match.has_score():
+            self._apply_score(home_row, key, match.home_score, match.away_score, sign)
+            self._apply_score(away_row, key, match.away_score, match.home_score, sign)
+
+        for row in (home_row, away_row):
+            if row.fixtures == 0:
+                del self._rows[row.team]
+
+    def _apply_score(self, row, key, goals_for, goals_against, sign):
+        row.played += sign
+        row.goals_for += sign * goals_for
+        row.goals_against += sign * goals_against
+
+        if goals_for > goals_against:
+            row.won += sign
+            letter = 'W'
+        elif goals_for < goals_against:
+            row.lost += sign
+            letter = 'L'
+        else:
+            row.drawn += sign
+            letter = 'D'
+
+        if sign > 0:
+            row.form_results[key] = letter
+        else:
+            del row.form_results[key]
+
+    def _get_row(self, team):
+        if team not in self._rows:
+            self._rows[team] = _TeamRow(team)
+
+        return self._rows[team]
+
+    def _build_table(self):
+        summaries = sorted(self._row_summaries.values(),
+                           key=lambda summary: (-summary['points'], -summary['goalDifference'], -summary['goalsFor'], summary['team']))
+        table = []
+
+        for position, summary in enumerate(summaries, start=1):
+            row = {'position': position}
+            row.update(summary)
+            table.append(row)
+
+        return {'table': table}
+
+    def _get_points(self, row):
+        return row.won * self._points_for_win + row.drawn * self._points_for_draw
+
+    def _get_form(self, row):
+        # Results of the most recent matches, from oldest to most recent
+        keys = sorted(row.form_results, key=lambda key: (parse_match_time(key[2], self._match_timezone) or self._earliest_kickoff,
+                                                         key[0], key[1], key[2] or '', key[3]))
+        return ''.join(row.form_results[key] for key in keys[-self._form_length:])
+
+    def _get_row_summary(self, row):
+        return {
+            'team': row.team,
+            'played': row.played,
+            'won': row.won,
+            'drawn': row.drawn,
+            'lost': row.lost,
+            'goalsFor': row.goals_for,
+            'goalsAgainst': row.goals_against,
+            'goalDifference': row.goals_for - row.goals_against,
+            'points': self._get_points(row),
+            'form': self._get_form(row)
+        }
@@ -0,0 +1,111 @@
+import enum
+import re
+import sys
+import unicodedata
+
+class Outcome(enum.Enum):
+    HOME_WIN = 'homeWin'
+    AWAY_WIN = 'awayWin'
+    DRAW = 'draw'
+    UNKNOWN = 'unknown'
+
+def _intern(text):
+    # Strings returned by lxml refer back to their element (and so the whole parsed tree), so they are copied before being interned
+    return sys.intern(str(text)) if text is not None else None
+
+_name_separator_pattern = re.compile(r'[\W_]+')
+
+def normalize_name(name):
+    """ Key under which a team or venue is indexed, so that names differing only in case, accents, spacing or punctuation
+    are treated as the same name (e.g. 'Bentleigh Greens', 'bentleigh-greens' and 'BENTLEIGH  GREENS').
+    """
+    decomposed_name = unicodedata.normalize('NFKD', name)
+    unaccented_name = ''.join(character for character in decomposed_name if not unicodedata.combining(character))
+    return _name_separator_pattern.sub('-', unaccented_name.casefold()).strip('-')
+
+class MatchRecord():
+    """ Result of a single match, as held in memory. Team names, venues and match times are interned, so that
+    the many matches sharing them hold a single copy, and the outcome is held as an enum rather than formatted text.
+    Records are only converted to the dictionaries returned by the API when they are serialised (see to_serializable).
+    """
+
+    __slots__ = ('venue', 'time_of_match', 'home_team', 'home_score', 'away_team', 'away_score', 'outcome')
+
+    def __init__(self, venue, time_of_match, home_team, home_score, away_team, away_score):
+        self.venue = _intern(venue)
+        self.time_of_match = _intern(time_of_match)
+        self.home_team = _intern(home_team)
+        self.home_score = home_score
+        self.away_team = _intern(away_team)
+        self.away_score = away_score
+
+        if home_score is None or away_score is None:
+            self.outcome = Outcome.UNKNOWN
+        elif home_score > away_score:
+            self.outcome = Outcome.HOME_WIN
+        elif home_score < away_score:
+            self.outcome = Outcome.AWAY_WIN
+        else:
+            self.outcome = Outcome.DRAW
+
+    @classmethod
+    def from_dict(cls, match):
+        return cls(match['venue'], match['timeOfMatch'], match['homeTeam'], match['homeScore'], match['awayTeam'], match['awayScore'])
+
+    def has_score(self):
+        return self.outcome != Outcome.UNKNOWN
+
+    def get_winner(self):
+        if self.outcome == Outcome.HOME_WIN:
+            return self.home_team
+
+        if self.outcome == Outcome.AWAY_WIN:
+            return self.away_team
+
+        return None
+
+    def to_dict(self):
+        if self.outcome == Outcome.UNKNOWN:
+            result = None
+        elif self.outcome == Outcome.DRAW:
+            result = 'Draw'
+        else:
+            result = 'Winner: {0}'.format(self.get_winner())
+
+        return {
+            'venue': self.venue,
+            'timeOfMatch': self.time_of_match,
+            'homeTeam': self.home_team,
+            'homeScore': self.home_score,
+            'awayTeam': self.away_team,
+            'awayScore': self.away_score,
+            'result': result
+        }
+
+def to_serializable(value):
+    """ Converts results containing match records into dictionaries and lists that can be serialised as JSON.
+    """
+    if isinstance(value, MatchRecord):
+        return value.to_dict()
+
+    if isinstance(value, dict):
+        return {key: to_serializable(item) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [to_serializable(item) for item in value]
+
+    return value
+
+def from_serializable(value):
+    """ Converts dictionaries produced by to_serializable (e.g. after being persisted as JSON) back into match records.
+    """
+    if isinstance(value, dict):
+        if 'homeTeam' in value and 'awayTeam' in value:
+            return MatchRecord.from_dict(value)
+
+        return {key: from_serializable(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [from_serializable(item) for item in value]
+
+    return value
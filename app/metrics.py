@@ -0,0 +1,370 @@
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Upper bounds (in seconds, or matches) of the buckets of each histogram, with a final bucket of +Inf added when rendered
+_request_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_upstream_buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15)
+_parse_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+_match_count_buckets = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Type, help text and (for histograms) buckets of each metric
+_definitions = {
+    'football_results_request_duration_seconds':
+        ('histogram', 'Time taken to answer requests, by endpoint, method and status code', _request_buckets),
+    'football_results_requests_in_progress':
+        ('gauge', 'Requests being answered, by endpoint', None),
+    'football_results_upstream_request_duration_seconds':
+        ('histogram', 'Time taken by each request sent to sportstg, by method and status code (error when no response was received)', _upstream_buckets),
+    'football_results_parse_duration_seconds':
+        ('histogram', 'Time taken to parse a page fetched from sportstg, by page and outcome', _parse_buckets),
+    'football_results_parsed_matches':
+        ('histogram', 'Number of matches parsed from each page fetched from sportstg, by page', _match_count_buckets),
+    'football_results_cache_lookups_total':
+        ('counter', 'Lookups of cached results and rendered responses, by cache and outcome', None)
+}
+
+_content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _is_process_running(process_id):
+    try:
+        os.kill(process_id, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+class Metrics():
+    """ Counters, gauges and histograms of request, upstream and parse timings, rendered in the Prometheus text format.
+    Recording a value only updates this process's totals in memory, so collection can be left on in production.
+    When a directory is supplied, each process (e.g. each gunicorn worker) writes its totals to its own file in the directory
+    at most once per flush interval, and the metrics rendered by any process are the totals of the files written by every
+    process with the same parent (e.g. every worker of the gunicorn master), so that files left by earlier servers are ignored.
+    Counters and histograms include processes that have exited, so that totals do not go backwards when a worker is restarted,
+    whereas gauges (e.g. requests in progress) only include processes that are still running. The counters and histograms
+    of a process that has exited are folded into a single archive file for the parent and its file is removed, so that
+    the number of files read does not grow as workers are restarted.
+    Collectors added with add_collector are called when the totals are written or rendered, and return (name, labels, value)
+    samples of counters kept elsewhere (e.g. the statistics of the results cache).
+    """
+
+    def __init__(self, directory=None, flush_interval_seconds=5, clock=time.monotonic, is_process_running=_is_process_running):
+        self._directory = directory
+        self._flush_interval_seconds = flush_interval_seconds
+        self._clock = clock
+        self._is_process_running = is_process_running
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._collectors = []
+        self._process_id = os.getpid()
+        self._parent_process_id = os.getppid()
+        self._last_flushed_at = None
+        self._reset()
+
+    def observe_request(self, endpoint, method, status_code, elapsed_seconds):
+        self.observe('football_results_request_duration_seconds', elapsed_seconds, endpoint=endpoint, method=method, status=str(status_code))
+
+    def request_started(self, endpoint):
+        self.add_to_gauge('football_results_requests_in_progress', 1, endpoint=endpoint)
+
+    def request_finished(self, endpoint):
+        self.add_to_gauge('football_results_requests_in_progress', -1, endpoint=endpoint)
+
+    def observe_upstream_request(self, method, status_code, elapsed_milliseconds):
+        # Invoked as a request listener of the HTTP client, with a status code of None when no response was received
+        status = 'error' if status_code is None else str(status_code)
+        self.observe('football_results_upstream_request_duration_seconds', elapsed_milliseconds / 1000, method=method, status=status)
+
+    def observe_parse(self, page, elapsed_seconds, number_of_matches=None):
+        # Pages that could not be parsed are given a number of matches of None, and only their parse time is recorded
+        outcome = 'error' if number_of_matches is None else 'parsed'
+        self.observe('football_results_parse_duration_seconds', elapsed_seconds, page=page, outcome=outcome)
+
+        if number_of_matches is not None:
+            self.observe('football_results_parsed_matches', number_of_matches, page=page)
+
+    def observe(self, name, value, **labels):
+        buckets = _definitions[name][2]
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            self._check_process()
+            histogram = self._histograms.get(key)
+
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+
+            histogram[0][bisect.bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+        self._flush_if_due()
+
+    def add_to_gauge(self, name, amount, **labels):
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            self._check_process()
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+        self._flush_if_due()
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def get_content_type(self):
+        return _content_type
+
+    def render(self):
+        # The totals of this process are written first, so that they are current in the totals of every process
+        document = self._get_document()
+
+        if self._directory is None:
+            return self._render_documents([document])
+
+        self._write_document(document)
+        documents = []
+        exited_paths = []
+
+        # Requests in progress in a process that has exited will never finish, so only running processes are included as they are
+        for path, process_document in self._read_documents():
+            if process_document['processId'] == self._process_id or self._is_process_running(process_document['processId']):
+                documents.append(process_document)
+            else:
+                exited_paths.append(path)
+
+        documents.append(self._archive_documents(exited_paths))
+        return self._render_documents(documents)
+
+    def _reset(self):
+        self._gauges = {}
+        self._histograms = {}
+
+    def _check_process(self):
+        # Totals recorded before a fork (e.g. by a preloaded gunicorn master) belong to the parent process, not to its workers
+        if self._process_id != os.getpid():
+            self._process_id = os.getpid()
+            self._parent_process_id = os.getppid()
+            self._last_flushed_at = None
+            self._reset()
+
+    def _flush_if_due(self):
+        if self._directory is None:
+            return
+
+        now = self._clock()
+
+        if self._last_flushed_at is not None and now - self._last_flushed_at < self._flush_interval_seconds:
+            return
+
+        # Only one thread writes the file at a time, with other threads carrying on without waiting
+        if not self._flush_lock.acquire(blocking=False):
+            return
+
+        try:
+            self._last_flushed_at = now
+            self._write_document(self._get_document())
+        finally:
+            self._flush_lock.release()
+
+    def _get_document(self):
+        with self._lock:
+            self._check_process()
+            collectors = list(self._collectors)
+            document = {
+                'processId': self._process_id,
+                'parentProcessId': self._parent_process_id,
+                'counters': [],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self._gauges.items()],
+                'histograms': [[name, list(labels), list(histogram[0]), histogram[1], histogram[2]]
+                               for (name, labels), histogram in self._histograms.items()]
+            }
+
+        for collector in collectors:
+            try:
+                samples = collector()
+            except Exception as error:
+                _logger.warning('Unable to collect metrics from %r: %s', collector, error)
+                continue
+
+            document['counters'].extend([name, sorted(labels.items()), value] for name, labels, value in samples)
+
+        return document
+
+    def _write_document(self, document):
+        path = os.path.join(self._directory, 'metrics_{0}_{1}.json'.format(document['parentProcessId'], document['processId']))
+
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            self._write_file(path, document)
+        except OSError as error:
+            _logger.warning('Unable to write metrics to %s: %s', path, error)
+
+    def _write_file(self, path, document):
+        # The file is replaced rather than rewritten, so that other processes never read a partially written file
+        temporary_path = '{0}.tmp'.format(path)
+
+        with open(temporary_path, mode='w') as metrics_file:
+            json.dump(document, metrics_file)
+
+        os.replace(temporary_path, path)
+
+    def _read_documents(self):
+        # Returns the path and document of the file written by each process with the same parent, other than the archive
+        documents = []
+        archive_path = self._get_archive_path()
+
+        for path in glob.glob(os.path.join(self._directory, 'metrics_{0}_*.json'.format(self._get_parent_process_id()))):
+            if path == archive_path:
+                continue
+
+            document = self._read_document(path)
+
+            if document is not None:
+                documents.append((path, document))
+
+        return documents
+
+    def _read_document(self, path):
+        try:
+            with open(path, mode='r') as metrics_file:
+                return json.load(metrics_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            _logger.warning('Unable to read metrics from %s: %s', path, error)
+            return None
+
+    def _archive_documents(self, exited_paths):
+        # Returns the archive (the counters and histograms of processes that have exited) once the files in exited_paths
+        # have been added to it and removed. Processes rendering at the same time take turns through the lock file, and
+        # each file is read again while holding the lock, as another process may already have added it to the archive.
+        archive_path = self._get_archive_path()
+        empty_archive = {'processId': None, 'parentProcessId': self._get_parent_process_id(), 'counters': [], 'gauges': [], 'histograms': []}
+
+        if len(exited_paths) == 0:
+            return self._read_document(archive_path) or empty_archive
+
+        try:
+            with open('{0}.lock'.format(os.path.splitext(archive_path)[0]), mode='w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                archive = self._read_document(archive_path) or empty_archive
+                archived_paths = []
+
+                for path in exited_paths:
+                    document = self._read_document(path)
+
+                    if document is not None:
+                        archive = self._merge_documents(archive, document)
+                        archived_paths.append(path)
+
+                # The archive is written before the files are removed, so that totals are never lost
+                if len(archived_paths) > 0:
+                    self._write_file(archive_path, archive)
+
+                    for path in archived_paths:
+                        os.remove(path)
+
+                return archive
+        except OSError as error:
+            _logger.warning('Unable to archive metrics to %s: %s', archive_path, error)
+            return self._read_document(archive_path) or empty_archive
+
+    def _merge_documents(self, archive, document):
+        # Returns the archive with the counters and histograms of the document added to it (but not its gauges)
+        counters = {}
+        histograms = {}
+        self._add_totals(archive, counters, histograms)
+        self._add_totals(document, counters, histograms)
+
+        return dict(archive,
+                    counters=[[name, [list(label) for label in labels], value] for (name, labels), value in counters.items()],
+                    histograms=[[name, [list(label) for label in labels], bucket_counts, total, count]
+                                for (name, labels), (bucket_counts, total, count) in histograms.items()])
+
+    def _get_archive_path(self):
+        return os.path.join(self._directory, 'metrics_{0}_archive.json'.format(self._get_parent_process_id()))
+
+    def _get_parent_process_id(self):
+        with self._lock:
+            return self._parent_process_id
+
+    def _render_documents(self, documents):
+        counters = {}
+        gauges = {}
+        histograms = {}
+
+        for document in documents:
+            self._add_totals(document, counters, histograms)
+
+            for name, labels, value in document['gauges']:
+                key = (name, tuple(tuple(label) for label in labels))
+                gauges[key] = gauges.get(key, 0) + value
+
+        lines = []
+
+        for name, (metric_type, help_text, buckets) in sorted(_definitions.items()):
+            lines.append('# HELP {0} {1}'.format(name, help_text))
+            lines.append('# TYPE {0} {1}'.format(name, metric_type))
+
+            if metric_type == 'histogram':
+                for (sample_name, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                    if sample_name == name:
+                        lines.extend(self._render_histogram(name, labels, buckets, bucket_counts, total, count))
+            else:
+                samples = counters if metric_type == 'counter' else gauges
+
+                for (sample_name, labels), value in sorted(samples.items()):
+                    if sample_name == name:
+                        lines.append('{0}{1} {2}'.format(name, self._render_labels(labels), self._render_value(value)))
+
+        return '\n'.join(lines) + '\n'
+
+    def _add_totals(self, document, counters, histograms):
+        # Adds the counters and histograms of the document to the totals, keyed by name and labels
+        for name, labels, value in document['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+
+        for name, labels, bucket_counts, total, count in document['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            histogram = histograms.get(key)
+
+            if histogram is None:
+                histogram = histograms[key] = [[0] * len(bucket_counts), 0.0, 0]
+
+            histogram[0] = [existing + added for existing, added in zip(histogram[0], bucket_counts)]
+            histogram[1] += total
+            histogram[2] += count
+
+    def _render_histogram(self, name, labels, buckets, bucket_counts, total, count):
+        cumulative_count = 0
+
+        for upper_bound, bucket_count in zip(list(buckets) + ['+Inf'], bucket_counts):
+            cumulative_count += bucket_count
+            bucket_labels = labels + (('le', upper_bound if upper_bound == '+Inf' else self._render_value(upper_bound)),)
+            yield '{0}_bucket{1} {2}'.format(name, self._render_labels(bucket_labels), cumulative_count)
+
+        yield '{0}_sum{1} {2}'.format(name, self._render_labels(labels), self._render_value(total))
+        yield '{0}_count{1} {2}'.format(name, self._render_labels(labels), count)
+
+    def _render_labels(self, labels):
+        if len(labels) == 0:
+            return ''
+
+        escaped_labels = ('{0}="{1}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                          for key, value in labels)
+        return '{' + ','.join(escaped_labels) + '}'
+
+    def _render_value(self, value):
+        return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone, tzinfo
+
+class MelbourneTimezone(tzinfo):
+    """ Melbourne time, as displayed by sportstg: Australian Eastern Standard Time (UTC+10), or Australian Eastern Daylight
+    Time (UTC+11) from 2 AM on the first Sunday in October until 3 AM on the first Sunday in April (the rules in Victoria since 2008).
+    Implemented with the standard library, as match times only need the current rules rather than a timezone database.
+    """
+
+    _standard_offset = timedelta(hours=10)
+    _daylight_saving = timedelta(hours=1)
+
+    def utcoffset(self, dt):
+        return self._standard_offset + self.dst(dt)
+
+    def dst(self, dt):
+        # dt is a time in Melbourne, with the hour repeated when daylight saving ends being daylight saving time unless dt.fold is 1
+        if dt is None:
+            return timedelta(0)
+
+        local_time = dt.replace(tzinfo=None, fold=0)
+        daylight_saving_ends, daylight_saving_starts = self._get_daylight_saving_changes(dt.year)
+
+        if daylight_saving_ends <= local_time < daylight_saving_ends + self._daylight_saving:
+            return timedelta(0) if dt.fold == 1 else self._daylight_saving
+
+        if local_time < daylight_saving_ends or local_time >= daylight_saving_starts:
+            return self._daylight_saving
+
+        return timedelta(0)
+
+    def tzname(self, dt):
+        return 'AEDT' if self.dst(dt) else 'AEST'
+
+    def fromutc(self, dt):
+        standard_time = dt.replace(tzinfo=None) + self._standard_offset
+        daylight_saving_ends, daylight_saving_starts = self._get_daylight_saving_changes(standard_time.year)
+
+        if standard_time < daylight_saving_ends or standard_time >= daylight_saving_starts:
+            return (standard_time + self._daylight_saving).replace(tzinfo=self)
+
+        # The hour after daylight saving ends repeats the last hour of daylight saving time
+        is_repeated_hour = standard_time < daylight_saving_ends + self._daylight_saving
+        return standard_time.replace(tzinfo=self, fold=1 if is_repeated_hour else 0)
+
+    def _get_daylight_saving_changes(self, year):
+        # Returns the times that daylight saving ends (in April) and starts (in October) in the year, both of which are 2 AM
+        # in standard time (i.e. 3 AM in daylight saving time as the clocks go back, and 2 AM as the clocks go forward)
+        return self._get_first_sunday(year, 4) + timedelta(hours=2), self._get_first_sunday(year, 10) + timedelta(hours=2)
+
+    def _get_first_sunday(self, year, month):
+        first_day = datetime(year, month, 1)
+        return first_day + timedelta(days=(6 - first_day.weekday()) % 7)
+
+    def __repr__(self):
+        return 'MelbourneTimezone()'
+
+def parse_match_time(time_of_match, match_timezone, formats=('%A %d %B %Y, %I:%M %p',)):
+    """ Converts a match time as displayed by sportstg (e.g. 'Friday 13 April 2018, 7:30 PM') into a timezone aware datetime.
+    Returns None when the match time is missing or is not in a recognised format (e.g. 'TBA').
+    """
+    if time_of_match is None:
+        return None
+
+    for time_format in formats:
+        try:
+            return datetime.strptime(time_of_match.strip(), time_format).replace(tzinfo=match_timezone)
+        except ValueError:
+            pass
+
+    return None
+
+class KickoffAwareRefreshPolicy():
+    """ Decides how often the results of a page should be refreshed, based on the kick-off times and scores of its matches.
+    Pages with a match in play (or just finished) are refreshed frequently. Pages where every match has finished
+    with a final score are never refreshed again, pages with matches that have no score after they were due to finish
+    (e.g. postponed matches) are refreshed occasionally, and pages with future matches are refreshed rarely
+    until their first kick-off approaches.
+    """
+
+    def __init__(self, match_timezone, live_interval_seconds=60, postponed_interval_seconds=3600, future_interval_seconds=21600,
+                 live_window_seconds=3 * 3600, wall_clock=None):
+        self._match_timezone = match_timezone
+        self._live_interval_seconds = live_interval_seconds
+        self._postponed_interval_seconds = postponed_interval_seconds
+        self._future_interval_seconds = future_interval_seconds
+
+        # Time from kick-off until a score is considered final, covering the match and the results being published
+        self._live_window = timedelta(seconds=live_window_seconds)
+        self._wall_clock = wall_clock if wall_clock is not None else (lambda: datetime.now(timezone.utc))
+
+    def get_refresh_interval(self, matches):
+        # Returns the number of seconds until the matches should be refreshed, or None if they never need to be refreshed
+        now = self._wall_clock()
+        seconds_until_next_kickoff = None
+        has_match_without_final_score = False
+
+        for match in matches:
+            kickoff = parse_match_time(match.time_of_match, self._match_timezone)
+            has_score = match.has_score()
+
+            if kickoff is None:
+                # Without a kick-off time, a match is treated as final once it has a score
+                has_match_without_final_score = has_match_without_final_score or not has_score
+            elif kickoff > now:
+                seconds_until_kickoff = (kickoff - now).total_seconds()
+
+                if seconds_until_next_kickoff is None or seconds_until_kickoff < seconds_until_next_kickoff:
+                    seconds_until_next_kickoff = seconds_until_kickoff
+            elif now <= kickoff + self._live_window:
+                return self._live_interval_seconds
+            elif not has_score:
+                has_match_without_final_score = True
+
+        if has_match_without_final_score:
+            interval_seconds = self._postponed_interval_seconds
+        elif seconds_until_next_kickoff is not None:
+            interval_seconds = self._future_interval_seconds
+        else:
+            return None
+
+        # Refreshing resumes at the live cadence once the next kick-off is reached
+        if seconds_until_next_kickoff is not None:
+            interval_seconds = min(interval_seconds, max(self._live_interval_seconds, seconds_until_next_kickoff))
+
+        return interval_seconds
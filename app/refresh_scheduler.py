@@ -0,0 +1,207 @@
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.inversion_of_control import Component, HasMethods, RequiredFeature
+
+_logger = logging.getLogger(__name__)
+
+class RefreshScheduler(Component):
+    """ Keeps results warm by refreshing them in the background, so that requests rarely wait on sportstg.
+    The season page and any round fetched individually are each refreshed at an interval chosen by the refresh policy
+    from the kick-off times and scores of their matches, so that pages with matches in play are refreshed frequently
+    while pages with only completed matches are not refreshed again. Refreshes run on a bounded pool of worker threads,
+    and intervals are jittered so that gunicorn workers do not all refresh at the same moment.
+    """
+
+    _football_results_parser = RequiredFeature('FootballSeasonResultsParser',
+                                               HasMethods('refresh_season', 'refresh_round', 'get_round_numbers_fetched_individually',
+                                                          'set_season_refresh_interval', 'set_round_refresh_interval'))
+    _refresh_policy = RequiredFeature('RefreshPolicy', HasMethods('get_refresh_interval'))
+
+    _season_refresh_key = 'season'
+
+    def __init__(self, retry_interval_seconds=60, jitter_ratio=0.1, max_workers=4, max_wait_seconds=60,
+                 clock=time.monotonic, executor_factory=ThreadPoolExecutor):
+        self._retry_interval_seconds = retry_interval_seconds
+        self._jitter_ratio = jitter_ratio
+        self._max_workers = max_workers
+        self._max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self._executor_factory = executor_factory
+        self._lock = threading.Lock()
+        self._process_id = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._pending_refreshes = {}
+        self._next_refreshes = {}
+        self._refreshes_submitted = 0
+        self._refreshes_skipped = 0
+        self._refreshes_completed = 0
+        self._refresh_failures = 0
+        atexit.register(self.stop)
+
+    def start(self):
+        # Threads of a parent process do not exist in a forked child (e.g. a gunicorn worker when the application
+        # is preloaded), so the scheduler is started again when called from a different process
+        if self._process_id == os.getpid():
+            return
+
+        with self._lock:
+            if self._process_id == os.getpid():
+                return
+
+            self._process_id = os.getpid()
+            self._stop_event = threading.Event()
+            self._pending_refreshes = {}
+            self._next_refreshes = {}
+            self._executor = None
+            self._thread = threading.Thread(target=self._run, name='RefreshScheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout_seconds=5):
+        with self._lock:
+            if self._process_id != os.getpid():
+                return
+
+            self._process_id = None
+            self._stop_event.set()
+            thread = self._thread
+            executor = self._executor
+            self._executor = None
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout_seconds)
+
+        # Refreshes already running are left to finish (each is bounded by the HTTP client timeouts)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def is_running(self):
+        return self._process_id == os.getpid()
+
+    def run_due_refreshes(self):
+        # Submits the refreshes that are due, and returns the time at which the next refresh will be due
+        # (or None when every page is complete and will not be refreshed again)
+        now = self._clock()
+        refreshes = [(self._season_refresh_key, self._refresh_season)]
+
+        for round_number in self._get_round_numbers_fetched_individually():
+            refreshes.append((round_number, lambda round_number=round_number: self._refresh_round(round_number)))
+
+        for refresh_key, refresh in refreshes:
+            with self._lock:
+                # Pages that have not been refreshed yet are due immediately
+                next_refresh = self._next_refreshes.setdefault(refresh_key, now)
+
+            if next_refresh is not None and now >= next_refresh:
+                self._submit(refresh_key, refresh)
+
+        with self._lock:
+            next_refreshes = [next_refresh for next_refresh in self._next_refreshes.values() if next_refresh is not None]
+
+        return min(next_refreshes) if len(next_refreshes) > 0 else None
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'running': self.is_running(),
+                'pendingRefreshes': len(self._pending_refreshes),
+                'refreshesSubmitted': self._refreshes_submitted,
+                'refreshesSkipped': self._refreshes_skipped,
+                'refreshesCompleted': self._refreshes_completed,
+                'refreshFailures': self._refresh_failures,
+                'frozenPages': sum(1 for next_refresh in self._next_refreshes.values() if next_refresh is None)
+            }
+
+    def _run(self):
+        stop_event = self._stop_event
+
+        while not stop_event.is_set():
+            try:
+                next_refresh = self.run_due_refreshes()
+            except Exception as error:
+                _logger.warning('Unable to schedule refreshes: %s', error)
+                next_refresh = None
+
+            # Waits are capped, so that newly fetched rounds and rescheduled refreshes are picked up promptly
+            wait_seconds = self._max_wait_seconds if next_refresh is None else next_refresh - self._clock()
+            stop_event.wait(min(max(0, wait_seconds), self._max_wait_seconds))
+
+    def _get_round_numbers_fetched_individually(self):
+        try:
+            return self._football_results_parser.get_round_numbers_fetched_individually()
+        except Exception as error:
+            _logger.warning('Unable to identify the rounds to be refreshed: %s', error)
+            return []
+
+    def _submit(self, refresh_key, refresh):
+        with self._lock:
+            # A refresh is not submitted again while the previous refresh of the same results is pending
+            if refresh_key in self._pending_refreshes:
+                self._refreshes_skipped += 1
+                return
+
+            # The worker threads are only created once the first refresh is due
+            if self._executor is None:
+                self._executor = self._executor_factory(max_workers=self._max_workers)
+
+            self._pending_refreshes[refresh_key] = True
+            self._refreshes_submitted += 1
+            executor = self._executor
+
+        try:
+            executor.submit(self._run_refresh, refresh_key, refresh)
+        except RuntimeError:
+            # The executor has been shut down by stop()
+            with self._lock:
+                self._pending_refreshes.pop(refresh_key, None)
+
+    def _run_refresh(self, refresh_key, refresh):
+        try:
+            interval_seconds = refresh()
+            succeeded = True
+        except Exception as error:
+            _logger.warning('Unable to refresh results for %s: %s', refresh_key, error)
+            interval_seconds = self._get_jittered_interval(self._retry_interval_seconds)
+            succeeded = False
+
+        with self._lock:
+            self._pending_refreshes.pop(refresh_key, None)
+            self._next_refreshes[refresh_key] = None if interval_seconds is None else self._clock() + interval_seconds
+
+            if succeeded:
+                self._refreshes_completed += 1
+            else:
+                self._refresh_failures += 1
+
+    def _refresh_season(self):
+        # The cached results expire when they are next due to be refreshed, so that requests do not refresh them sooner
+        parser = self._football_results_parser
+        interval_seconds = self._get_refresh_interval(parser.refresh_season().get_season_results())
+        parser.set_season_refresh_interval(interval_seconds)
+        return interval_seconds
+
+    def _refresh_round(self, round_number):
+        parser = self._football_results_parser
+        interval_seconds = self._get_refresh_interval(parser.refresh_round(round_number))
+        parser.set_round_refresh_interval(round_number, interval_seconds)
+        return interval_seconds
+
+    def _get_refresh_interval(self, results):
+        # Pages whose results could not be parsed (e.g. a round that does not exist yet) are retried
+        if 'results' not in results:
+            return self._get_jittered_interval(self._retry_interval_seconds)
+
+        return self._get_jittered_interval(self._refresh_policy.get_refresh_interval(results['results']))
+
+    def _get_jittered_interval(self, interval_seconds):
+        if interval_seconds is None:
+            return None
+
+        return interval_seconds * (1 + random.uniform(-self._jitter_ratio, self._jitter_ratio))
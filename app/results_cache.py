@@ -0,0 +1,177 @@
+import collections
+import threading
+import time
+
+class _CacheEntry():
+    __slots__ = ('value', 'stored_at', 'ttl_seconds')
+
+    def __init__(self, value, stored_at, ttl_seconds):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl_seconds = ttl_seconds
+
+class ResultsCache():
+    """ In-memory cache of parsed results keyed by round.
+    Entries younger than the TTL are served directly. Once an entry is older than the TTL it is still served
+    (stale-while-revalidate), and a single background refresh is started for that key to replace it.
+    The TTL of an entry can be changed until it is next stored, with entries given a TTL of None never going stale.
+    Values that is_error identifies as the details of an error (e.g. a page that could not be parsed) are given
+    error_ttl_seconds instead, so that they are fetched again soon rather than being served for the full TTL.
+    When max_entries is supplied, the least recently used entries are forgotten once there are more entries than that.
+    """
+
+    def __init__(self, ttl_seconds, clock=time.monotonic, max_entries=None, error_ttl_seconds=None, is_error=None):
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._max_entries = max_entries
+        self._error_ttl_seconds = error_ttl_seconds
+        self._is_error = is_error
+        self._entries = collections.OrderedDict()
+        self._keys_being_refreshed = set()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._restores = 0
+        self._evictions = 0
+
+    def get(self, key, loader, restore=None):
+        # When there is no entry for the key, restore (if supplied) can return a value loaded from elsewhere (e.g. disk)
+        # together with its age, which is then served as if it had been cached for that long
+        start_refresh = False
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+            if entry is None:
+                self._misses += 1
+            elif entry.ttl_seconds is None or self._clock() - entry.stored_at < entry.ttl_seconds:
+                self._hits += 1
+                return entry.value
+            else:
+                self._stale_hits += 1
+
+                # Only one background refresh is allowed per key, other callers keep receiving the stale entry
+                if key not in self._keys_being_refreshed:
+                    self._keys_being_refreshed.add(key)
+                    start_refresh = True
+
+        if entry is None:
+            restored = restore() if restore is not None else None
+
+            if restored is None:
+                value = loader()
+                self._store(key, value)
+                return value
+
+            value, age_seconds = restored
+            start_refresh = self._store_restored(key, value, age_seconds)
+        else:
+            value = entry.value
+
+        if start_refresh:
+            refresh_thread = threading.Thread(target=self._refresh, args=(key, loader), daemon=True)
+            refresh_thread.start()
+
+        return value
+
+    def refresh(self, key, loader):
+        # Replaces the entry for the key immediately, e.g. when results are being kept warm ahead of requests
+        value = loader()
+
+        with self._lock:
+            self._put(key, value, self._clock())
+            self._refreshes += 1
+
+        return value
+
+    def get_keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def peek(self, key):
+        # Returns the cached value regardless of its age, without affecting statistics or triggering a refresh
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def get_age_seconds(self, key):
+        # Returns how long ago the entry for the key was loaded (including the age it was restored with), or None if there is no entry
+        with self._lock:
+            entry = self._entries.get(key)
+            return self._clock() - entry.stored_at if entry is not None else None
+
+    def set_ttl(self, key, ttl_seconds):
+        # Applies to the current entry for the key only, e.g. while it is being kept warm by a scheduler
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                entry.ttl_seconds = ttl_seconds
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'ttlSeconds': self._ttl_seconds,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'staleHits': self._stale_hits,
+                'misses': self._misses,
+                'refreshes': self._refreshes,
+                'refreshFailures': self._refresh_failures,
+                'restores': self._restores,
+                'maxEntries': self._max_entries,
+                'evictions': self._evictions
+            }
+
+    def _store(self, key, value):
+        with self._lock:
+            self._put(key, value, self._clock())
+
+    def _store_restored(self, key, value, age_seconds):
+        # Returns whether a background refresh should be started, as the restored value is already stale
+        with self._lock:
+            entry = self._put(key, value, self._clock() - age_seconds)
+            self._restores += 1
+
+            if age_seconds < entry.ttl_seconds or key in self._keys_being_refreshed:
+                return False
+
+            self._keys_being_refreshed.add(key)
+            return True
+
+    def _refresh(self, key, loader):
+        try:
+            value = loader()
+        except Exception:
+            # Keep serving the stale entry; the next request after the TTL will attempt another refresh
+            with self._lock:
+                self._refresh_failures += 1
+                self._keys_being_refreshed.discard(key)
+            return
+
+        with self._lock:
+            self._put(key, value, self._clock())
+            self._refreshes += 1
+            self._keys_being_refreshed.discard(key)
+
+    def _put(self, key, value, stored_at):
+        # Must be called while holding the lock
+        is_error = self._is_error is not None and self._error_ttl_seconds is not None and self._is_error(value)
+        entry = self._entries[key] = _CacheEntry(value, stored_at, self._error_ttl_seconds if is_error else self._ttl_seconds)
+        self._entries.move_to_end(key)
+
+        while self._max_entries is not None and len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+        return entry
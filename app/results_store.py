@@ -0,0 +1,110 @@
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Results of a page as last persisted, where fetched_at is the time (in seconds since the epoch) the page was last fetched
+PersistedPage = collections.namedtuple('PersistedPage', ['url', 'fetched_at', 'etag', 'last_modified', 'digest', 'document'])
+
+class ResultsStore():
+    """ Persists the results parsed from each page to a SQLite database, keyed by the URL of the page
+    (which identifies the round), together with the time it was fetched and the digest of its content.
+    This allows a new process to serve results from disk without waiting on sportstg, including during an outage.
+    Failures to read or write the database are logged and otherwise ignored, as the store is only an optimisation.
+    """
+
+    def __init__(self, database_path, clock=time.time):
+        self._database_path = database_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._connection = None
+        self._process_id = None
+        self._reads = 0
+        self._pages_restored = 0
+        self._writes = 0
+        self._failures = 0
+
+    def load(self, url):
+        try:
+            with self._lock:
+                self._reads += 1
+                row = self._get_connection().execute(
+                    'SELECT url, fetched_at, etag, last_modified, digest, document FROM pages WHERE url = ?', (url,)).fetchone()
+
+                if row is None:
+                    return None
+
+                # A truncated or corrupt document is treated as a failure to read, so that the page is fetched instead
+                document = json.loads(row[5])
+                self._pages_restored += 1
+        except (sqlite3.Error, TypeError, ValueError) as error:
+            self._record_failure('Unable to load results for {0}'.format(url), error)
+            return None
+
+        return PersistedPage(row[0], row[1], row[2], row[3], row[4], document)
+
+    def save(self, url, etag, last_modified, digest, document):
+        try:
+            with self._lock:
+                connection = self._get_connection()
+
+                with connection:
+                    connection.execute('INSERT OR REPLACE INTO pages (url, fetched_at, etag, last_modified, digest, document) VALUES (?, ?, ?, ?, ?, ?)',
+                                       (url, self._clock(), etag, last_modified, digest, json.dumps(document)))
+
+                self._writes += 1
+        except sqlite3.Error as error:
+            self._record_failure('Unable to save results for {0}'.format(url), error)
+
+    def touch(self, url):
+        # Records that a page was fetched again without its content changing
+        try:
+            with self._lock:
+                connection = self._get_connection()
+
+                with connection:
+                    connection.execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (self._clock(), url))
+
+                self._writes += 1
+        except sqlite3.Error as error:
+            self._record_failure('Unable to update fetch time for {0}'.format(url), error)
+
+    def get_age_seconds(self, persisted_page):
+        return max(0, self._clock() - persisted_page.fetched_at)
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'databasePath': self._database_path,
+                'reads': self._reads,
+                'pagesRestored': self._pages_restored,
+                'writes': self._writes,
+                'failures': self._failures
+            }
+
+    def _get_connection(self):
+        # A SQLite connection cannot be used across a fork, so each process (e.g. a gunicorn worker) opens its own
+        if self._process_id != os.getpid():
+            self._connection = sqlite3.connect(self._database_path, timeout=5, check_same_thread=False)
+
+            # Write-ahead logging allows workers to read while another worker writes
+            self._connection.execute('PRAGMA journal_mode=WAL')
+
+            with self._connection:
+                self._connection.execute('CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, fetched_at REAL NOT NULL, etag TEXT, '
+                                         'last_modified TEXT, digest TEXT, document TEXT NOT NULL)')
+
+            self._process_id = os.getpid()
+
+        return self._connection
+
+    def _record_failure(self, message, error):
+        with self._lock:
+            self._failures += 1
+
+        _logger.warning('%s: %s', message, error)
@@ -0,0 +1,283 @@
+import base64
+import bisect
+import heapq
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.match_record import normalize_name
+from app.refresh_policy import parse_match_time
+
+def encode_cursor(sort_key):
+    # The cursor holds the sort key of the last match returned rather than a position, so that it remains valid
+    # when a refresh of the season page adds, removes or changes matches
+    return base64.urlsafe_b64encode(json.dumps(list(sort_key)).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        sort_key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8'))
+    except (ValueError, TypeError):
+        raise ValueError('The cursor is not valid')
+
+    if not isinstance(sort_key, list) or len(sort_key) != 3 or not all(isinstance(value, str) for value in sort_key):
+        raise ValueError('The cursor is not valid')
+
+    return tuple(sort_key)
+
+class SeasonQuery():
+    """ Filters and page of the season results requested through the query string of /season.
+    Dates are in the form YYYY-MM-DD and compared with the date of each match as displayed by sportstg,
+    with both the date and round ranges being inclusive.
+    """
+
+    statuses = ('played', 'unplayed', 'postponed')
+    max_limit = 500
+    _parameters = ('from', 'to', 'fromRound', 'toRound', 'team', 'status', 'limit', 'cursor')
+
+    def __init__(self, start_date=None, end_date=None, first_round=None, last_round=None, team=None, status=None, limit=None, after=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.first_round = first_round
+        self.last_round = last_round
+        self.team = team
+        self.status = status
+        self.limit = limit
+
+        # Sort key of the last match of the previous page
+        self.after = after
+
+    @classmethod
+    def from_arguments(cls, arguments):
+        # Returns None when no filter or page was requested, raising ValueError when a parameter is not valid
+        if not any(parameter in arguments for parameter in cls._parameters):
+            return None
+
+        start_date = cls._parse_date(arguments.get('from'), 'from')
+        end_date = cls._parse_date(arguments.get('to'), 'to')
+        first_round = cls._parse_int(arguments.get('fromRound'), 'fromRound')
+        last_round = cls._parse_int(arguments.get('toRound'), 'toRound')
+        limit = cls._parse_int(arguments.get('limit'), 'limit')
+        status = arguments.get('status')
+        after = None
+
+        if start_date is not None and end_date is not None and start_date > end_date:
+            raise ValueError('The from date must not be after the to date')
+
+        if first_round is not None and last_round is not None and first_round > last_round:
+            raise ValueError('The fromRound parameter must not be greater than the toRound parameter')
+
+        if status is not None and status not in cls.statuses:
+            raise ValueError('The status parameter must be one of {0}'.format(', '.join(cls.statuses)))
+
+        if limit is not None and (limit < 1 or limit > cls.max_limit):
+            raise ValueError('The limit parameter must be between 1 and {0}'.format(cls.max_limit))
+
+        if arguments.get('cursor'):
+            after = decode_cursor(arguments.get('cursor'))
+
+        return cls(start_date, end_date, first_round, last_round, arguments.get('team'), status, limit, after)
+
+    @staticmethod
+    def _parse_date(value, parameter):
+        if value is None:
+            return None
+
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('The {0} parameter must be a date in the form YYYY-MM-DD'.format(parameter))
+
+    @staticmethod
+    def _parse_int(value, parameter):
+        if value is None:
+            return None
+
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError('The {0} parameter must be an integer'.format(parameter))
+
+    def get_start_key(self):
+        # Prefix of the sort keys of matches on or after the start date
+        return (self.start_date.isoformat(),) if self.start_date is not None else None
+
+    def get_end_key(self):
+        # Prefix of the sort keys of matches after the end date
+        return ((self.end_date + timedelta(days=1)).isoformat(),) if self.end_date is not None else None
+
+    def get_key(self):
+        return (self.start_date, self.end_date, self.first_round, self.last_round, self.team, self.status, self.limit, self.after)
+
+class SeasonQueryIndex():
+    """ Matches of the season sorted by kick-off, with the positions of the matches of each team, each round,
+    and the matches with and without a score in that order. Each query takes the range of positions between
+    its dates (and after its cursor) by bisecting the sorted kick-offs, then only visits the positions in the
+    smallest index that applies to it, so that queries do not scan the season.
+    """
+
+    # Sort key of matches without a recognised kick-off time, which are sorted after every other match
+    _unknown_kickoff_key = '~'
+
+    # Number of query results kept, so that repeated queries return the same results (allowing their rendered JSON to be reused)
+    _max_cached_queries = 256
+
+    def __init__(self, matches, match_rounds=None):
+        rounds = match_rounds if match_rounds is not None else [None] * len(matches)
+        ordered = sorted((self._get_sort_key(match), position, match, round_number)
+                         for position, (match, round_number) in enumerate(zip(matches, rounds)))
+
+        self._sort_keys = [sort_key for sort_key, _, _, _ in ordered]
+        self._matches = [match for _, _, match, _ in ordered]
+        self._rounds = [round_number for _, _, _, round_number in ordered]
+        self._team_keys = []
+        self._team_positions = {}
+        self._round_positions = {}
+        self._played_positions = []
+        self._unscored_positions = []
+        self._cached_queries = {}
+        self._lock = threading.Lock()
+
+        for position, match in enumerate(self._matches):
+            team_keys = tuple(normalize_name(team) for team in (match.home_team, match.away_team) if team is not None)
+            self._team_keys.append(team_keys)
+
+            for team_key in team_keys:
+                self._team_positions.setdefault(team_key, []).append(position)
+
+            if self._rounds[position] is not None:
+                self._round_positions.setdefault(self._rounds[position], []).append(position)
+
+            if match.has_score():
+                self._played_positions.append(position)
+            else:
+                self._unscored_positions.append(position)
+
+        self._round_numbers = sorted(self._round_positions)
+
+    def _get_sort_key(self, match):
+        # The kick-off is kept as displayed by sportstg (i.e. in the timezone of the match) rather than converted
+        kickoff = parse_match_time(match.time_of_match, timezone.utc)
+        kickoff_key = kickoff.strftime('%Y-%m-%dT%H:%M') if kickoff is not None else self._unknown_kickoff_key
+        return (kickoff_key, match.home_team or '', match.away_team or '')
+
+    def query(self, season_query, current_time):
+        """ Returns the matches satisfying the query in order of kick-off, along with the cursor for the next page
+        (or None for the last page). current_time is the current time in the timezone of the match times, and
+        determines which matches without a score are postponed (their kick-off has passed) or unplayed.
+        """
+        current_key = (current_time.strftime('%Y-%m-%dT%H:%M'),)
+        cache_key = (season_query.get_key(), current_key if season_query.status in ('unplayed', 'postponed') else None)
+
+        with self._lock:
+            cached_result = self._cached_queries.get(cache_key)
+
+        if cached_result is not None:
+            return cached_result
+
+        result = self._query(season_query, current_key)
+
+        with self._lock:
+            if len(self._cached_queries) >= self._max_cached_queries:
+                self._cached_queries.clear()
+
+            self._cached_queries[cache_key] = result
+
+        return result
+
+    def _query(self, season_query, current_key):
+        start_position, end_position = self._get_position_range(season_query, current_key)
+        candidate_positions = self._get_candidate_positions(season_query, start_position, end_position)
+        team_key = normalize_name(season_query.team) if season_query.team is not None else None
+        results = []
+        last_position = None
+        next_cursor = None
+
+        for position in candidate_positions:
+            if not self._satisfies(position, season_query, team_key):
+                continue
+
+            # A further match satisfying the query means there is another page, which starts after the last match returned
+            if season_query.limit is not None and len(results) == season_query.limit:
+                next_cursor = encode_cursor(self._sort_keys[last_position])
+                break
+
+            results.append(self._matches[position])
+            last_position = position
+
+        return {'results': results, 'nextCursor': next_cursor}
+
+    def _get_position_range(self, season_query, current_key):
+        start_position = 0
+        end_position = len(self._matches)
+
+        if season_query.start_date is not None:
+            start_position = bisect.bisect_left(self._sort_keys, season_query.get_start_key())
+
+        if season_query.end_date is not None:
+            end_position = bisect.bisect_left(self._sort_keys, season_query.get_end_key())
+
+        # Matches sharing the sort key of the last match of the previous page are skipped along with it
+        if season_query.after is not None:
+            start_position = max(start_position, bisect.bisect_right(self._sort_keys, season_query.after))
+
+        # Matches without a score that kicked off before the current time are postponed, with the others yet to be played
+        if season_query.status == 'postponed':
+            end_position = min(end_position, bisect.bisect_left(self._sort_keys, current_key))
+        elif season_query.status == 'unplayed':
+            start_position = max(start_position, bisect.bisect_left(self._sort_keys, current_key))
+
+        return start_position, max(start_position, end_position)
+
+    def _get_candidate_positions(self, season_query, start_position, end_position):
+        # Each index holds positions in order of kick-off, so the positions within the range are found by bisecting
+        candidate_lists = []
+
+        if season_query.team is not None:
+            candidate_lists.append([self._slice(self._team_positions.get(normalize_name(season_query.team), []), start_position, end_position)])
+
+        if season_query.first_round is not None or season_query.last_round is not None:
+            first_index = 0 if season_query.first_round is None else bisect.bisect_left(self._round_numbers, season_query.first_round)
+            last_index = len(self._round_numbers) if season_query.last_round is None else bisect.bisect_right(self._round_numbers, season_query.last_round)
+            candidate_lists.append([self._slice(self._round_positions[round_number], start_position, end_position)
+                                    for round_number in self._round_numbers[first_index:last_index]])
+
+        if season_query.status == 'played':
+            candidate_lists.append([self._slice(self._played_positions, start_position, end_position)])
+        elif season_query.status in ('unplayed', 'postponed'):
+            candidate_lists.append([self._slice(self._unscored_positions, start_position, end_position)])
+
+        if len(candidate_lists) == 0:
+            return range(start_position, end_position)
+
+        # Only the positions of the smallest index are visited, with the other filters checked for each of them
+        smallest_list = min(candidate_lists, key=lambda position_lists: sum(len(positions) for positions in position_lists))
+
+        return heapq.merge(*smallest_list) if len(smallest_list) > 1 else smallest_list[0]
+
+    def _slice(self, positions, start_position, end_position):
+        return positions[bisect.bisect_left(positions, start_position):bisect.bisect_left(positions, end_position)]
+
+    def _satisfies(self, position, season_query, team_key):
+        match = self._matches[position]
+        round_number = self._rounds[position]
+
+        if team_key is not None and team_key not in self._team_keys[position]:
+            return False
+
+        if season_query.first_round is not None or season_query.last_round is not None:
+            if round_number is None:
+                return False
+
+            if season_query.first_round is not None and round_number < season_query.first_round:
+                return False
+
+            if season_query.last_round is not None and round_number > season_query.last_round:
+                return False
+
+        if season_query.status == 'played':
+            return match.has_score()
+
+        if season_query.status in ('unplayed', 'postponed'):
+            return not match.has_score()
+
+        return True
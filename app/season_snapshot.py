@@ -0,0 +1,84 @@
+from app.match_record import from_serializable, normalize_name, to_serializable
+from app.season_query import SeasonQueryIndex
+
+class SeasonSnapshot():
+    """ Results parsed from a single fetch of the season page, indexed by round, team and venue.
+    The results for each round, team and venue are built once when the snapshot is created, so that every
+    request for them is answered from memory without fetching a page or scanning the season, and as a
+    refreshed season page creates a new snapshot, the indexes never disagree with the season results.
+    Filtered and paginated queries of the season are answered from a SeasonQueryIndex built with the snapshot.
+    """
+
+    def __init__(self, season_results, match_rounds=None):
+        self._season_results = season_results
+        self._match_rounds = match_rounds
+        self._round_results = {}
+        self._team_results = {}
+        self._venue_results = {}
+        self._query_index = None
+
+        if 'results' not in season_results:
+            return
+
+        self._query_index = SeasonQueryIndex(season_results['results'], match_rounds)
+
+        for match in season_results['results']:
+            self._add_to_index(self._team_results, 'team', match.home_team, match)
+            self._add_to_index(self._team_results, 'team', match.away_team, match)
+            self._add_to_index(self._venue_results, 'venue', match.venue, match)
+
+        if match_rounds is None:
+            return
+
+        # match_rounds holds the round number of each match in the season results, in the same order.
+        # Matches that could not be attributed to a round are only available through the season results.
+        for match, round_number in zip(season_results['results'], match_rounds):
+            if round_number is None:
+                continue
+
+            if round_number not in self._round_results:
+                self._round_results[round_number] = {'round': round_number, 'results': []}
+
+            self._round_results[round_number]['results'].append(match)
+
+    def _add_to_index(self, index, name_key, name, match):
+        if name is None:
+            return
+
+        key = normalize_name(name)
+
+        # Results are returned under the name as it first appeared on the season page
+        if key not in index:
+            index[key] = {name_key: name, 'results': []}
+
+        index[key]['results'].append(match)
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(from_serializable(document['seasonResults']), document['matchRounds'])
+
+    def to_document(self):
+        # Document from which the snapshot can be recreated, e.g. after being persisted as JSON
+        return {'seasonResults': to_serializable(self._season_results), 'matchRounds': self._match_rounds}
+
+    def get_season_results(self):
+        return self._season_results
+
+    def get_round_numbers(self):
+        return sorted(self._round_results)
+
+    def get_results_for_round(self, round_number):
+        return self._round_results.get(round_number)
+
+    def get_results_for_team(self, team_name):
+        return self._team_results.get(normalize_name(team_name))
+
+    def get_results_for_venue(self, venue_name):
+        return self._venue_results.get(normalize_name(venue_name))
+
+    def query(self, season_query, current_time):
+        # Returns None when the season page could not be parsed
+        if self._query_index is None:
+            return None
+
+        return self._query_index.query(season_query, current_time)
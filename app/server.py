@@ -1,3 +1,8 @@
+import time
+
+from flask import g, request
+
+from app.circuit_breaker import CircuitBreaker
 from app.inversion_of_control import (HasAttributes, HasMethods, IsInstanceOf,
                                       RequiredFeature)
 
@@ -8,17 +13,120 @@ class FootballResultsServer():
     _season_results_endpoint = RequiredFeature('SeasonResultsEndpoint', IsInstanceOf(str))
     _round_results_resource = RequiredFeature('RoundResultsResource', HasAttributes('__name__'))
     _round_results_endpoint = RequiredFeature('RoundResultsEndpoint', IsInstanceOf(str))
+    _multiple_round_results_resource = RequiredFeature('MultipleRoundResultsResource', HasAttributes('__name__'))
+    _multiple_round_results_endpoint = RequiredFeature('MultipleRoundResultsEndpoint', IsInstanceOf(str))
+    _team_results_resource = RequiredFeature('TeamResultsResource', HasAttributes('__name__'))
+    _team_results_endpoint = RequiredFeature('TeamResultsEndpoint', IsInstanceOf(str))
+    _venue_results_resource = RequiredFeature('VenueResultsResource', HasAttributes('__name__'))
+    _venue_results_endpoint = RequiredFeature('VenueResultsEndpoint', IsInstanceOf(str))
+    _league_table_resource = RequiredFeature('LeagueTableResource', HasAttributes('__name__'))
+    _league_table_endpoint = RequiredFeature('LeagueTableEndpoint', IsInstanceOf(str))
     _root_resource = RequiredFeature('RootResource', HasAttributes('__name__'))
     _root_endpoint = RequiredFeature('RootEndpoint', IsInstanceOf(str))
+    _metrics_resource = RequiredFeature('MetricsResource', HasAttributes('__name__'))
+    _metrics_endpoint = RequiredFeature('MetricsEndpoint', IsInstanceOf(str))
+    _metrics = RequiredFeature('Metrics', HasMethods('observe_request', 'request_started', 'request_finished'))
     _system_status = RequiredFeature('SystemStatus')
+    _refresh_scheduler = RequiredFeature('RefreshScheduler', HasMethods('start'))
+    _circuit_breaker = RequiredFeature('UpstreamCircuitBreaker', HasMethods('get_state'))
+    _football_results_parser = RequiredFeature('FootballSeasonResultsParser', HasMethods('get_season_age_seconds', 'get_rounds_age_seconds'))
+    _feature_broker = RequiredFeature('FeatureBroker', HasMethods('BeginRequest', 'EndRequest'))
 
     def __init__(self):
-        self._api.add_resource(self._season_results_resource, self._season_results_endpoint)
-        self._api.add_resource(self._round_results_resource, self._round_results_endpoint)
+        # Names of the Flask endpoints of the resources that return results (Flask-RESTful names them after the resource class)
+        self._results_endpoint_names = set()
+
+        self._add_results_resource(self._season_results_resource, self._season_results_endpoint)
+        self._add_results_resource(self._round_results_resource, self._round_results_endpoint)
+        self._add_results_resource(self._multiple_round_results_resource, self._multiple_round_results_endpoint)
+        self._add_results_resource(self._team_results_resource, self._team_results_endpoint)
+        self._add_results_resource(self._venue_results_resource, self._venue_results_endpoint)
+        self._add_results_resource(self._league_table_resource, self._league_table_endpoint)
         self._api.add_resource(self._root_resource, self._root_endpoint)
+        self._api.add_resource(self._metrics_resource, self._metrics_endpoint)
+        self._app.after_request(self._add_results_age)
+
+        # The latency of every request is observed by endpoint, along with the number of requests in progress
+        self._app.before_request(self._start_request_metrics)
+        self._app.after_request(self._observe_request_metrics)
+        self._app.teardown_request(self._finish_request_metrics)
+
+        # Features provided with a per-request lifetime are built once for each request, and discarded when it ends
+        self._app.before_request(self._feature_broker.BeginRequest)
+        self._app.teardown_request(self._end_request)
 
         # Performing this assert as a means of ensuring that system status is instantiated
         assert self._system_status is not None
 
+        # Results are refreshed in the background from the moment the server is created.
+        # The scheduler is also started before each request, which only has an effect in a process forked
+        # after the server was created (e.g. a gunicorn worker when the application is preloaded).
+        self._refresh_scheduler.start()
+        self._app.before_request(self._refresh_scheduler.start)
+
     def get_application(self):
         return self._app
+
+    def _end_request(self, error):
+        self._feature_broker.EndRequest()
+
+    def _get_results_age_seconds(self):
+        # Rounds that are not on the season page are cached on their own, so the age of the pages the requested rounds
+        # were answered from is given for the round endpoints, and the age of the season page for every other endpoint
+        round_numbers = self._get_requested_round_numbers()
+
+        if round_numbers is None:
+            return self._football_results_parser.get_season_age_seconds()
+
+        return self._football_results_parser.get_rounds_age_seconds(round_numbers)
+
+    def _get_requested_round_numbers(self):
+        if request.endpoint == self._round_results_resource.__name__.lower():
+            return [request.view_args['round_number']]
+
+        if request.endpoint != self._multiple_round_results_resource.__name__.lower():
+            return None
+
+        # The rounds were validated by the resource, as only responses with results are given an age
+        if 'numbers' in request.args:
+            return request.args['numbers'].split(',')
+
+        return [str(round_number) for round_number in range(int(request.args['from']), int(request.args['to']) + 1)]
+
+    def _get_metrics_endpoint(self):
+        # The URL rule (e.g. /round/<round_number>) is used rather than the path, so that each endpoint is a single series
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def _start_request_metrics(self):
+        g.metrics_start_time = time.perf_counter()
+        g.metrics_endpoint = self._get_metrics_endpoint()
+        self._metrics.request_started(g.metrics_endpoint)
+
+    def _observe_request_metrics(self, response):
+        if 'metrics_start_time' in g:
+            self._metrics.observe_request(g.metrics_endpoint, request.method, response.status_code, time.perf_counter() - g.metrics_start_time)
+
+        return response
+
+    def _finish_request_metrics(self, error):
+        # Requests are finished even when an error prevented a response from being observed
+        if 'metrics_endpoint' in g:
+            self._metrics.request_finished(g.metrics_endpoint)
+
+    def _add_results_resource(self, resource, endpoint):
+        self._api.add_resource(resource, endpoint)
+        self._results_endpoint_names.add(resource.__name__.lower())
+
+    def _add_results_age(self, response):
+        # While the circuit breaker is not closed, results are served from the cache without sportstg being contacted,
+        # so responses are marked with the age of the results they were answered from (rejected requests have no results)
+        if request.endpoint not in self._results_endpoint_names or response.status_code >= 400 or \
+           self._circuit_breaker.get_state() == CircuitBreaker.closed_state:
+            return response
+
+        age_seconds = self._get_results_age_seconds()
+
+        if age_seconds is not None:
+            response.headers['Age'] = str(int(age_seconds))
+
+        return response
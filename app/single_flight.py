@@ -0,0 +1,84 @@
+import threading
+
+import requests
+
+class SingleFlightTimeoutError(requests.Timeout):
+    """ Raised when a caller gives up waiting for the call it joined.
+    It is a Timeout, so callers treat it in the same way as sportstg taking too long to respond.
+    """
+
+class _Call():
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight():
+    """ Ensures that only one call runs at a time for a given key (e.g. the URL of a page being fetched).
+    Callers arriving while the call is running wait for it to complete and share its result, or its error.
+    Waiting callers give up with SingleFlightTimeoutError once the wait timeout has elapsed.
+    """
+
+    def __init__(self, wait_timeout_seconds=30):
+        self._wait_timeout_seconds = wait_timeout_seconds
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executed_calls = 0
+        self._coalesced_calls = 0
+        self._wait_timeouts = 0
+        self._max_waiters = 0
+
+    def do(self, key, function):
+        with self._lock:
+            call = self._calls.get(key)
+
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._executed_calls += 1
+                is_leader = True
+            else:
+                call.waiters += 1
+                self._coalesced_calls += 1
+                self._max_waiters = max(self._max_waiters, call.waiters)
+                is_leader = False
+
+        if is_leader:
+            return self._execute(key, call, function)
+
+        if not call.done.wait(self._wait_timeout_seconds):
+            with self._lock:
+                self._wait_timeouts += 1
+
+            raise SingleFlightTimeoutError('Timed out after {0} seconds waiting for {1}'.format(self._wait_timeout_seconds, key))
+
+        if call.error is not None:
+            raise call.error
+
+        return call.result
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'inFlight': len(self._calls),
+                'currentWaiters': sum(call.waiters for call in self._calls.values()),
+                'executedCalls': self._executed_calls,
+                'coalescedCalls': self._coalesced_calls,
+                'maxWaiters': self._max_waiters,
+                'waitTimeouts': self._wait_timeouts
+            }
+
+    def _execute(self, key, call, function):
+        try:
+            call.result = function()
+            return call.result
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            # The call is removed before waiters are released, so that later callers start a new call
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
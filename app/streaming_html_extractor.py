@@ -0,0 +1,156 @@
+import collections
+import re
+
+from lxml import etree
+
+# Values extracted from a page of results, each list being in document order.
+# match_round_names holds the round name preceding each match time, and is None when round names were not requested.
+ExtractedPage = collections.namedtuple('ExtractedPage', ['teams', 'scores', 'match_times', 'venues', 'match_round_names'])
+
+class _ElementMatcher():
+    # Matches elements selected by an XPath expression of the form //tag[@attribute="value"]/text()
+    _supported_xpath_pattern = re.compile(r'^//([\w-]+|\*)\[@([\w-]+)="([^"]*)"\]/text\(\)$')
+
+    def __init__(self, xpath):
+        match = self._supported_xpath_pattern.match(xpath.strip())
+        self.tag = match.group(1).lower()
+        self.attribute = match.group(2)
+        self.value = match.group(3)
+
+    @classmethod
+    def supports(cls, xpath):
+        return cls._supported_xpath_pattern.match(xpath.strip()) is not None
+
+    def matches(self, element):
+        return (self.tag == '*' or element.tag == self.tag) and element.get(self.attribute) == self.value
+
+class _TextSlot():
+    __slots__ = ('matcher', 'node', 'attribute', 'text')
+
+    def __init__(self, matcher, node, attribute):
+        self.matcher = matcher
+        self.node = node
+        self.attribute = attribute
+        self.text = None
+
+    def fill(self):
+        # The node is released once its text has been read, so that it can be discarded
+        self.text = getattr(self.node, self.attribute)
+        self.node = None
+
+class _Extraction():
+    # State of a single extraction. A slot is reserved for each text node when its position in the document
+    # is reached (the text of an element when it starts, the tail of a child when the child ends),
+    # and is filled once the matching element ends, so that values remain in document order.
+    def __init__(self, matchers):
+        self.matchers = matchers
+        self._slots = []
+        self._open_elements = {}
+
+    def start_element(self, element):
+        for matcher in self.matchers:
+            if matcher.matches(element):
+                self._open_elements.setdefault(element, []).append(self._reserve_slot(matcher, element, 'text'))
+
+    def end_element(self, element):
+        for slot in self._open_elements.pop(element, []):
+            slot.fill()
+
+        # The tail of an element is a text node of its parent
+        parent = element.getparent()
+
+        for matcher in [parent_slot.matcher for parent_slot in self._open_elements.get(parent, []) if parent_slot.node is parent]:
+            self._open_elements[parent].append(self._reserve_slot(matcher, element, 'tail'))
+
+    def has_open_elements(self):
+        return len(self._open_elements) > 0
+
+    def get_values(self, matcher):
+        return [slot.text for slot in self._slots if slot.matcher is matcher and slot.text is not None]
+
+    def get_values_in_document_order(self):
+        return [(slot.matcher, slot.text) for slot in self._slots if slot.text is not None]
+
+    def _reserve_slot(self, matcher, node, attribute):
+        slot = _TextSlot(matcher, node, attribute)
+        self._slots.append(slot)
+        return slot
+
+class StreamingHtmlExtractor():
+    """ Extracts teams, scores, match times and venues from a page in a single streaming pass.
+    The page is fed to an incremental parser in chunks, and elements are discarded once they have been processed,
+    so the full tree is never held in memory. Only XPath expressions of the form //tag[@attribute="value"]/text()
+    are supported, with the values extracted being identical to those returned by the XPath expressions.
+    """
+
+    def __init__(self, xpath_get_teams, xpath_get_scores, xpath_get_match_times, xpath_get_venues, xpath_get_round_names, chunk_size=65536):
+        self._teams_matcher = _ElementMatcher(xpath_get_teams)
+        self._scores_matcher = _ElementMatcher(xpath_get_scores)
+        self._match_times_matcher = _ElementMatcher(xpath_get_match_times)
+        self._venues_matcher = _ElementMatcher(xpath_get_venues)
+        self._round_names_matcher = _ElementMatcher(xpath_get_round_names)
+        self._chunk_size = chunk_size
+
+    @staticmethod
+    def supports(*xpaths):
+        return all(_ElementMatcher.supports(xpath) for xpath in xpaths)
+
+    def extract(self, content, include_match_round_names=False):
+        matchers = [self._teams_matcher, self._scores_matcher, self._match_times_matcher, self._venues_matcher]
+
+        if include_match_round_names:
+            matchers.append(self._round_names_matcher)
+
+        extraction = _Extraction(matchers)
+        parser = etree.HTMLPullParser(events=('start', 'end'))
+
+        for chunk_start in range(0, len(content), self._chunk_size):
+            parser.feed(content[chunk_start:chunk_start + self._chunk_size])
+            self._process_events(parser.read_events(), extraction)
+
+        # Closing the parser ends any elements that were left open by the page
+        parser.close()
+        self._process_events(parser.read_events(), extraction)
+
+        teams, scores, match_times, venues = [extraction.get_values(matcher) for matcher in matchers[:4]]
+        match_round_names = None
+
+        if include_match_round_names:
+            match_round_names = self._get_match_round_names(extraction)
+
+        return ExtractedPage(teams, scores, match_times, venues, match_round_names)
+
+    def _process_events(self, events, extraction):
+        for event, element in events:
+            if event == 'start':
+                extraction.start_element(element)
+                continue
+
+            extraction.end_element(element)
+
+            # Text and tails of descendants are needed until every matching ancestor has ended
+            if not extraction.has_open_elements():
+                self._discard(element)
+
+    def _get_match_round_names(self, extraction):
+        # Each match time belongs to the round name that most recently preceded it
+        current_round_name = None
+        match_round_names = []
+
+        for matcher, text in extraction.get_values_in_document_order():
+            if matcher is self._round_names_matcher:
+                current_round_name = text
+            elif matcher is self._match_times_matcher:
+                match_round_names.append(current_round_name)
+
+        return match_round_names
+
+    def _discard(self, element):
+        element.clear()
+
+        # Siblings that have already been processed are removed from the parent, so the tree does not grow
+        parent = element.getparent()
+
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
@@ -1,23 +1,96 @@
-from app.inversion_of_control import Component, HasAttributes, HasMethods, RequiredFeature
+from app.circuit_breaker import CircuitBreaker
+from app.inversion_of_control import Component, HasMethods, RequiredFeature
 
 class SystemStatus(Component):
-    _http_request = RequiredFeature('HttpRequest', HasAttributes('status_code') and HasMethods('get'))
+    _http_request = RequiredFeature('HttpRequest', HasMethods('get_statistics', 'add_request_listener'))
+    _upstream_health_probe = RequiredFeature('UpstreamHealthProbe', HasMethods('get_status', 'get_statistics'))
+    _upstream_health_section_name = RequiredFeature('UpstreamHealthSectionName')
+    _circuit_breaker = RequiredFeature('UpstreamCircuitBreaker', HasMethods('get_state', 'get_statistics'))
+    _circuit_breaker_section_name = RequiredFeature('CircuitBreakerSectionName')
     _app_info = RequiredFeature('ApplicationInformation', HasMethods('get_information'))
     _health_check = RequiredFeature('HealthCheck', HasMethods('add_check'))
     _environment_dump = RequiredFeature('EnvironmentDump', HasMethods('add_section'))
     _application_section_name = RequiredFeature('ApplicationSectionName')
+    _results_cache = RequiredFeature('ResultsCache', HasMethods('get_statistics'))
+    _results_cache_section_name = RequiredFeature('ResultsCacheSectionName')
+    _upstream_section_name = RequiredFeature('UpstreamSectionName')
+    _single_flight = RequiredFeature('SingleFlight', HasMethods('get_statistics'))
+    _single_flight_section_name = RequiredFeature('SingleFlightSectionName')
+    _results_store = RequiredFeature('ResultsStore', HasMethods('get_statistics'))
+    _results_store_section_name = RequiredFeature('ResultsStoreSectionName')
+    _json_renderer = RequiredFeature('PrettyJson', HasMethods('get_statistics'))
+    _rendered_responses_section_name = RequiredFeature('RenderedResponsesSectionName')
+    _league_table = RequiredFeature('LeagueTable', HasMethods('get_statistics'))
+    _league_table_section_name = RequiredFeature('LeagueTableSectionName')
+    _feature_broker = RequiredFeature('FeatureBroker', HasMethods('GetResolutionReport'))
+    _feature_resolution_section_name = RequiredFeature('FeatureResolutionSectionName')
+    _metrics = RequiredFeature('Metrics', HasMethods('observe_upstream_request', 'add_collector'))
 
-    def __init__(self, url_to_check):
-        self._url_to_check = url_to_check
+    def __init__(self):
         self._health_check.add_check(self.check_url)
+        self._health_check.add_check(self.check_circuit_breaker)
         self._environment_dump.add_section(self._application_section_name, self.get_application_data)
+        self._environment_dump.add_section(self._results_cache_section_name, self.get_results_cache_data)
+        self._environment_dump.add_section(self._upstream_section_name, self.get_upstream_data)
+        self._environment_dump.add_section(self._upstream_health_section_name, self.get_upstream_health_data)
+        self._environment_dump.add_section(self._circuit_breaker_section_name, self.get_circuit_breaker_data)
+        self._environment_dump.add_section(self._single_flight_section_name, self.get_single_flight_data)
+        self._environment_dump.add_section(self._results_store_section_name, self.get_results_store_data)
+        self._environment_dump.add_section(self._rendered_responses_section_name, self.get_rendered_responses_data)
+        self._environment_dump.add_section(self._league_table_section_name, self.get_league_table_data)
+        self._environment_dump.add_section(self._feature_resolution_section_name, self.get_feature_resolution_data)
+        self._http_request.add_request_listener(self._metrics.observe_upstream_request)
+        self._metrics.add_collector(self.get_cache_metrics)
 
     def check_url(self):
-        response = self._http_request.get(self._url_to_check)
-        if response.status_code == 200:
-            return True, 'URL %s OK' % self._url_to_check
-        else:
-            return False, 'URL %s did not return HTTP OK' % self._url_to_check
+        # Reports the last health of sportstg observed in the background, rather than fetching a page on every health check
+        return self._upstream_health_probe.get_status()
+
+    def check_circuit_breaker(self):
+        # Cached results are still served while the circuit breaker is open, but no results are being obtained from sportstg
+        state = self._circuit_breaker.get_state()
+        return state != CircuitBreaker.open_state, 'Circuit breaker for sportstg is %s' % state
 
     def get_application_data(self):
         return self._app_info.get_information()
+
+    def get_results_cache_data(self):
+        return self._results_cache.get_statistics()
+
+    def get_upstream_data(self):
+        return self._http_request.get_statistics()
+
+    def get_upstream_health_data(self):
+        return self._upstream_health_probe.get_statistics()
+
+    def get_circuit_breaker_data(self):
+        return self._circuit_breaker.get_statistics()
+
+    def get_single_flight_data(self):
+        return self._single_flight.get_statistics()
+
+    def get_results_store_data(self):
+        return self._results_store.get_statistics()
+
+    def get_rendered_responses_data(self):
+        return self._json_renderer.get_statistics()
+
+    def get_league_table_data(self):
+        return self._league_table.get_statistics()
+
+    def get_feature_resolution_data(self):
+        return self._feature_broker.GetResolutionReport()
+
+    def get_cache_metrics(self):
+        # Lookups are reported as counters, so that hit ratios can be calculated across workers (e.g. with rate in Prometheus)
+        results_cache_statistics = self._results_cache.get_statistics()
+        rendered_responses_statistics = self._json_renderer.get_statistics()
+        metric_name = 'football_results_cache_lookups_total'
+
+        return [
+            (metric_name, {'cache': 'results', 'outcome': 'hit'}, results_cache_statistics['hits']),
+            (metric_name, {'cache': 'results', 'outcome': 'stale'}, results_cache_statistics['staleHits']),
+            (metric_name, {'cache': 'results', 'outcome': 'miss'}, results_cache_statistics['misses']),
+            (metric_name, {'cache': 'renderedResponses', 'outcome': 'hit'}, rendered_responses_statistics['reuses']),
+            (metric_name, {'cache': 'renderedResponses', 'outcome': 'miss'}, rendered_responses_statistics['renders'])
+        ]
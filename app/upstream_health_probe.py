@@ -0,0 +1,122 @@
+import collections
+import threading
+import time
+from urllib.parse import urlsplit
+
+from app.inversion_of_control import Component, HasMethods, RequiredFeature
+
+def _start_daemon_thread(target):
+    threading.Thread(target=target, daemon=True).start()
+
+class UpstreamHealthProbe(Component):
+    """ Health of sportstg, as last observed by a background probe or by an ordinary fetch of results.
+    The health check reports the last observation without waiting on sportstg. Once the last observation is
+    older than the time to live, a single probe is started in the background, using a HEAD request so that the
+    season page is not downloaded. Responses to fetches of results from the same host are also used as evidence
+    that sportstg is up, so probes are rarely needed while results are being refreshed.
+    """
+
+    _http_request = RequiredFeature('HttpRequest', HasMethods('head', 'get', 'add_response_listener'))
+
+    # HTTP 304 is returned for conditional fetches of pages that have not changed
+    _healthy_status_codes = (200, 304)
+
+    # Status codes returned by servers that do not support HEAD requests, in which case the page is requested without reading its body
+    _head_not_supported_status_codes = (405, 501)
+
+    def __init__(self, url_to_check, ttl_seconds=30, timings_to_keep=100, clock=time.monotonic, start_thread=_start_daemon_thread):
+        self._url_to_check = url_to_check
+        self._host = urlsplit(url_to_check).netloc
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._start_thread = start_thread
+        self._lock = threading.Lock()
+        self._last_result = None
+        self._last_observed_at = None
+        self._probe_running = False
+        self._probes = 0
+        self._probe_failures = 0
+        self._evidence_responses = 0
+        self._timings = collections.deque(maxlen=timings_to_keep)
+        self._http_request.add_response_listener(self.record_response)
+
+    def get_status(self):
+        # Returns a tuple of whether sportstg is healthy and a message, as expected by the health check
+        with self._lock:
+            age_seconds = None if self._last_observed_at is None else self._clock() - self._last_observed_at
+            start_probe = not self._probe_running and (age_seconds is None or age_seconds >= self._ttl_seconds)
+            last_result = self._last_result
+
+            if start_probe:
+                self._probe_running = True
+
+        if start_probe:
+            self._start_thread(self._probe)
+
+        # Until the first observation, sportstg is assumed to be up, so that a new process is not reported as unhealthy
+        if last_result is None:
+            return True, 'URL %s has not been checked yet' % self._url_to_check
+
+        healthy, message = last_result
+        return healthy, '%s (observed %.0f seconds ago)' % (message, age_seconds)
+
+    def record_response(self, url, status_code, elapsed_milliseconds):
+        # Only successful responses from sportstg are evidence of its health, with failures left for the probe to confirm
+        if status_code not in self._healthy_status_codes or urlsplit(url).netloc != self._host:
+            return
+
+        with self._lock:
+            self._evidence_responses += 1
+            self._last_result = (True, 'URL %s OK' % url)
+            self._last_observed_at = self._clock()
+
+    def get_statistics(self):
+        with self._lock:
+            timings = sorted(self._timings)
+
+            return {
+                'healthy': None if self._last_result is None else self._last_result[0],
+                'lastObservedSecondsAgo': None if self._last_observed_at is None else round(self._clock() - self._last_observed_at, 3),
+                'probes': self._probes,
+                'probeFailures': self._probe_failures,
+                'evidenceResponses': self._evidence_responses,
+                'p50ProbeMilliseconds': self._get_percentile(timings, 0.5),
+                'p95ProbeMilliseconds': self._get_percentile(timings, 0.95),
+                'p99ProbeMilliseconds': self._get_percentile(timings, 0.99)
+            }
+
+    def _probe(self):
+        start_time = time.perf_counter()
+
+        try:
+            response = self._http_request.head(self._url_to_check, allow_redirects=True)
+
+            if response.status_code in self._head_not_supported_status_codes:
+                response = self._http_request.get(self._url_to_check, stream=True)
+                response.close()
+
+            if response.status_code in self._healthy_status_codes:
+                result = (True, 'URL %s OK' % self._url_to_check)
+            else:
+                result = (False, 'URL %s did not return HTTP OK' % self._url_to_check)
+        except Exception as error:
+            result = (False, 'URL %s could not be reached: %s' % (self._url_to_check, error))
+
+        elapsed_milliseconds = (time.perf_counter() - start_time) * 1000
+
+        with self._lock:
+            self._probes += 1
+            self._probe_running = False
+            self._last_result = result
+            self._last_observed_at = self._clock()
+            self._timings.append(elapsed_milliseconds)
+
+            if not result[0]:
+                self._probe_failures += 1
+
+    def _get_percentile(self, sorted_timings, percentile):
+        if len(sorted_timings) == 0:
+            return None
+
+        index = min(len(sorted_timings) - 1, int(percentile * len(sorted_timings)))
+        return round(sorted_timings[index], 3)
@@ -0,0 +1,215 @@
+import collections
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.circuit_breaker import CircuitOpenError
+
+class UpstreamHttpClient():
+    """ Drop-in replacement for the requests module when registered as the 'HttpRequest' feature.
+    Requests are sent through a pooled keep-alive session with connect and read timeouts.
+    Connection failures, timeouts and gateway errors are retried with jittered exponential backoff,
+    subject to both a per-call cap and an overall retry budget, so retries cannot multiply upstream load during an outage.
+    Listeners added with add_response_listener are told of every response to a GET request (e.g. so that responses to
+    ordinary fetches can be used as evidence that sportstg is up), and HEAD requests are available for lightweight probes.
+    Listeners added with add_request_listener are told of every request sent, including retries and requests that received no response.
+    When a circuit breaker is supplied, each attempt of a GET request must be allowed by it (otherwise CircuitOpenError is raised
+    without contacting sportstg), and its outcome is recorded with it, with server errors and connection failures counting as failures.
+    When a deadline is supplied, a GET request gives up retrying once the deadline has passed, and the timeouts of each attempt
+    are shortened to the time remaining, so that a caller is not held for much longer than the deadline however sportstg responds.
+    """
+
+    _retryable_status_codes = (502, 503, 504)
+
+    def __init__(self, pool_size=10, connect_timeout_seconds=3.05, read_timeout_seconds=10, max_retries=2,
+                 backoff_seconds=0.1, retry_budget_ratio=0.2, minimum_retry_budget=10,
+                 session=None, sleep=time.sleep, timings_to_keep=1000, circuit_breaker=None, deadline_seconds=None):
+        self._timeout = (connect_timeout_seconds, read_timeout_seconds)
+        self._circuit_breaker = circuit_breaker
+        self._deadline_seconds = deadline_seconds
+        self._max_retries = max_retries
+        self._backoff_seconds = backoff_seconds
+        self._retry_budget_ratio = retry_budget_ratio
+        self._minimum_retry_budget = minimum_retry_budget
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._retries = 0
+        self._failures = 0
+        self._status_codes = collections.Counter()
+        self._timings = collections.deque(maxlen=timings_to_keep)
+        self._response_listeners = []
+        self._request_listeners = []
+
+        # pool_block ensures the number of connections to sportstg never exceeds the pool size,
+        # with additional threads waiting for a connection to be returned to the pool
+        self._session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def get(self, url, **kwargs):
+        timeout = kwargs.pop('timeout', self._timeout)
+        deadline = time.perf_counter() + self._deadline_seconds if self._deadline_seconds is not None else None
+        attempt = 0
+
+        with self._lock:
+            self._calls += 1
+
+        while True:
+            if self._circuit_breaker is not None and not self._circuit_breaker.allow_request():
+                raise CircuitOpenError('Requests to {0} are not being sent while the circuit breaker is open'.format(url))
+
+            start_time = time.perf_counter()
+
+            try:
+                response = self._session.get(url, timeout=self._get_timeout(timeout, deadline), **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                elapsed_milliseconds = self._record_timing(start_time)
+                self._record_circuit_outcome(None)
+                self._notify_request_listeners('GET', None, elapsed_milliseconds)
+
+                if not self._can_retry(attempt, deadline):
+                    self._record_failure()
+                    raise
+            except requests.RequestException:
+                # Other errors (e.g. a response body that could not be read) are not retried, but are still recorded
+                # with the circuit breaker, as a trial call that is never recorded would keep the breaker from closing
+                elapsed_milliseconds = self._record_timing(start_time)
+                self._record_circuit_outcome(None)
+                self._notify_request_listeners('GET', None, elapsed_milliseconds)
+                self._record_failure()
+                raise
+            else:
+                elapsed_milliseconds = self._record_timing(start_time, response.status_code)
+                self._record_circuit_outcome(response.status_code, elapsed_milliseconds)
+                self._notify_request_listeners('GET', response.status_code, elapsed_milliseconds)
+                self._notify_response_listeners(url, response.status_code, elapsed_milliseconds)
+
+                if response.status_code not in self._retryable_status_codes or not self._can_retry(attempt, deadline):
+                    return response
+
+            # Full jitter spreads retries from concurrent callers, rather than having them all retry at the same moment
+            backoff_seconds = random.uniform(0, self._backoff_seconds * (2 ** attempt))
+
+            if deadline is not None:
+                backoff_seconds = min(backoff_seconds, max(0, deadline - time.perf_counter()))
+
+            self._sleep(backoff_seconds)
+            attempt += 1
+
+    def head(self, url, **kwargs):
+        # HEAD requests are only used for probing sportstg, so they are not retried
+        kwargs.setdefault('timeout', self._timeout)
+        start_time = time.perf_counter()
+
+        with self._lock:
+            self._calls += 1
+
+        try:
+            response = self._session.head(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self._notify_request_listeners('HEAD', None, self._record_timing(start_time))
+            self._record_failure()
+            raise
+
+        self._notify_request_listeners('HEAD', response.status_code, self._record_timing(start_time, response.status_code))
+        return response
+
+    def add_response_listener(self, listener):
+        # The listener is invoked with the URL, status code and elapsed milliseconds of each response
+        with self._lock:
+            self._response_listeners.append(listener)
+
+    def add_request_listener(self, listener):
+        # The listener is invoked with the method, status code (None when no response was received) and elapsed milliseconds of each request
+        with self._lock:
+            self._request_listeners.append(listener)
+
+    def get_statistics(self):
+        with self._lock:
+            timings = sorted(self._timings)
+            return {
+                'calls': self._calls,
+                'retries': self._retries,
+                'failures': self._failures,
+                'statusCodes': {str(status_code): count for status_code, count in self._status_codes.items()},
+                'timingsSampled': len(timings),
+                'p50Milliseconds': self._get_percentile(timings, 0.5),
+                'p95Milliseconds': self._get_percentile(timings, 0.95),
+                'p99Milliseconds': self._get_percentile(timings, 0.99)
+            }
+
+    def _get_timeout(self, timeout, deadline):
+        if deadline is None:
+            return timeout
+
+        # A small minimum ensures that an attempt made just before the deadline times out rather than waiting indefinitely
+        remaining_seconds = max(0.001, deadline - time.perf_counter())
+
+        if isinstance(timeout, tuple):
+            return tuple(min(value, remaining_seconds) for value in timeout)
+
+        return min(timeout, remaining_seconds)
+
+    def _record_circuit_outcome(self, status_code, elapsed_milliseconds=None):
+        # Responses other than server errors show that sportstg is answering, even when the page does not exist
+        if self._circuit_breaker is None:
+            return
+
+        if status_code is None or status_code >= 500:
+            self._circuit_breaker.record_failure()
+        else:
+            self._circuit_breaker.record_success(elapsed_milliseconds)
+
+    def _can_retry(self, attempt, deadline=None):
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+
+        with self._lock:
+            retry_budget = self._minimum_retry_budget + self._retry_budget_ratio * self._calls
+
+            if attempt >= self._max_retries or self._retries >= retry_budget:
+                return False
+
+            self._retries += 1
+            return True
+
+    def _record_timing(self, start_time, status_code=None):
+        elapsed_milliseconds = (time.perf_counter() - start_time) * 1000
+
+        with self._lock:
+            self._timings.append(elapsed_milliseconds)
+
+            if status_code is not None:
+                self._status_codes[status_code] += 1
+
+        return elapsed_milliseconds
+
+    def _notify_response_listeners(self, url, status_code, elapsed_milliseconds):
+        with self._lock:
+            response_listeners = list(self._response_listeners)
+
+        for listener in response_listeners:
+            listener(url, status_code, elapsed_milliseconds)
+
+    def _notify_request_listeners(self, method, status_code, elapsed_milliseconds):
+        with self._lock:
+            request_listeners = list(self._request_listeners)
+
+        for listener in request_listeners:
+            listener(method, status_code, elapsed_milliseconds)
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+
+    def _get_percentile(self, sorted_timings, percentile):
+        if len(sorted_timings) == 0:
+            return None
+
+        index = min(len(sorted_timings) - 1, int(percentile * len(sorted_timings)))
+        return round(sorted_timings[index], 3)
@@ -0,0 +1,115 @@
+######################################################################
+## Compares parse time and peak memory of the tree and streaming
+## HTML extractors used by FootballResultsParser.
+##
+## Run from the root of the repository:
+##   python -m benchmarks.benchmark_html_extractors [--scale N] [--iterations N]
+##
+## --scale repeats the content of each page N times, so that the
+## difference between the extractors can be seen on larger pages.
+######################################################################
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from lxml import html
+
+from app.streaming_html_extractor import StreamingHtmlExtractor
+
+_test_path = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_data', 'test_football_results_parser')
+_xpaths = [
+    '//div[@class="teamname"]/text()',
+    '//div[@class="score"]/text()',
+    '//div[@class="matchtime"]/text()',
+    '//div[@class="venuename"]/text()',
+    '//div[@class="roundname"]/text()'
+]
+
+def read_page(html_file, scale):
+    with open(file=html_file, mode='r') as f:
+        content = f.read()
+
+    # Repeats everything within the body of the page, keeping the page well formed
+    body_start = content.find('<body>') + len('<body>')
+    body_end = content.rfind('</body>')
+
+    if body_start < len('<body>') or body_end < 0 or scale <= 1:
+        return content
+
+    return content[:body_start] + content[body_start:body_end] * scale + content[body_end:]
+
+def extract_with_tree(content):
+    tree = html.fromstring(content)
+    return [tree.xpath(xpath) for xpath in _xpaths[:4]]
+
+def extract_with_streaming(content, extractor=StreamingHtmlExtractor(*_xpaths)):
+    return list(extractor.extract(content)[:4])
+
+_extractors = {
+    'tree': extract_with_tree,
+    'streaming': extract_with_streaming
+}
+
+def measure(mode, html_file, scale, iterations):
+    # Runs in its own process, so that the peak resident set size only reflects this extractor
+    content = read_page(html_file, scale)
+    extract = _extractors[mode]
+    rss_before_kilobytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    extract(content)
+    _, python_peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    peak_rss_increase_kilobytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before_kilobytes
+    start_time = time.perf_counter()
+
+    for _ in range(iterations):
+        extract(content)
+
+    elapsed_seconds = time.perf_counter() - start_time
+
+    return {
+        'mode': mode,
+        'page': os.path.basename(html_file),
+        'pageBytes': len(content),
+        'meanMilliseconds': round(elapsed_seconds * 1000 / iterations, 4),
+        'pythonPeakKilobytes': round(python_peak_bytes / 1024, 1),
+        'peakRssIncreaseKilobytes': peak_rss_increase_kilobytes
+    }
+
+def run_in_child_process(mode, html_file, scale, iterations):
+    command = [sys.executable, '-m', 'benchmarks.benchmark_html_extractors', '--child', mode, html_file,
+               '--scale', str(scale), '--iterations', str(iterations)]
+    output = subprocess.check_output(command, cwd=os.path.join(os.path.dirname(__file__), '..'))
+    return json.loads(output.decode('utf-8'))
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Benchmark the tree and streaming HTML extractors')
+    argument_parser.add_argument('--scale', type=int, default=1)
+    argument_parser.add_argument('--iterations', type=int, default=200)
+    argument_parser.add_argument('--child', nargs=2, metavar=('MODE', 'HTML_FILE'), help=argparse.SUPPRESS)
+    arguments = argument_parser.parse_args()
+
+    if arguments.child is not None:
+        print(json.dumps(measure(arguments.child[0], arguments.child[1], arguments.scale, arguments.iterations)))
+        return
+
+    row_format = '{0:<58} {1:>10} {2:>10} {3:>12} {4:>14} {5:>14}'
+    print(row_format.format('page', 'mode', 'bytes', 'mean ms', 'python peak KB', 'RSS increase KB'))
+
+    for html_file in sorted(glob.glob(os.path.join(_test_path, '*.html'))):
+        for mode in sorted(_extractors):
+            result = run_in_child_process(mode, html_file, arguments.scale, arguments.iterations)
+            print(row_format.format(result['page'], result['mode'], result['pageBytes'], result['meanMilliseconds'],
+                                    result['pythonPeakKilobytes'], result['peakRssIncreaseKilobytes']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+######################################################################
+## Compares the time taken to render the results of a parsed season
+## as pretty-printed JSON (the default format, as rendered by
+## Flask-Jsonpify with Flask 0.12) and as compact JSON (requested with
+## format=compact), along with the size of each body.
+##
+## Run from the root of the repository:
+##   python -m benchmarks.benchmark_json_formats [--scale N] [--repeat N]
+##
+## --scale repeats the content of the season page N times, so that
+## the results resemble those of a full season (or several seasons).
+######################################################################
+
+import argparse
+import gzip
+import json
+import os
+import timeit
+
+from app.match_record import to_serializable
+from benchmarks.benchmark_html_extractors import _test_path, extract_with_tree, read_page
+from benchmarks.benchmark_match_records import build_match_records
+
+_season_html_file = os.path.join(_test_path, 'test_football_results_for_season.html')
+
+def render_pretty(data):
+    # Flask 0.12 sets JSONIFY_PRETTYPRINT_REGULAR by default, and its JSON encoder sorts keys
+    return json.dumps(data, indent=2, sort_keys=True).encode('utf-8')
+
+def render_compact(data):
+    # As rendered by CachedJsonRenderer for the compact format
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+_formats = {
+    'pretty': render_pretty,
+    'compact': render_compact
+}
+
+def load_season(scale):
+    teams, scores, match_times, venues = extract_with_tree(read_page(_season_html_file, scale))
+    return {'round': 'All', 'results': build_match_records(teams, scores, match_times, venues)}
+
+def measure(output_format, season, repeat):
+    render = _formats[output_format]
+
+    # Results are converted once for each version before rendering, so the conversion is included
+    elapsed_seconds = min(timeit.repeat(lambda: render(to_serializable(season)), number=1, repeat=repeat))
+    body = render(to_serializable(season))
+
+    return {
+        'format': output_format,
+        'milliseconds': round(elapsed_seconds * 1000, 2),
+        'kilobytes': round(len(body) / 1024, 1),
+        'gzipKilobytes': round(len(gzip.compress(body, compresslevel=9)) / 1024, 1)
+    }
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Benchmark rendering results as pretty-printed and compact JSON')
+    argument_parser.add_argument('--scale', type=int, default=30)
+    argument_parser.add_argument('--repeat', type=int, default=20)
+    arguments = argument_parser.parse_args()
+
+    season = load_season(arguments.scale)
+    print('{0} matches'.format(len(season['results'])))
+
+    row_format = '{0:<8} {1:>10} {2:>10} {3:>10}'
+    print(row_format.format('format', 'ms', 'KB', 'gzip KB'))
+
+    for output_format in sorted(_formats, reverse=True):
+        result = measure(output_format, season, arguments.repeat)
+        print(row_format.format(result['format'], result['milliseconds'], result['kilobytes'], result['gzipKilobytes']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+######################################################################
+## Compares the memory retained by the results of a parsed season
+## when matches are held as dictionaries (as they were before match
+## records were introduced) and as match records.
+##
+## Run from the root of the repository:
+##   python -m benchmarks.benchmark_match_records [--scale N]
+##
+## --scale repeats the content of the season page N times, so that
+## the results resemble those of a full season (or several seasons).
+######################################################################
+
+import argparse
+import gc
+import os
+import tracemalloc
+
+from app.football_results_parser import ignore_exception
+from app.match_record import MatchRecord
+from benchmarks.benchmark_html_extractors import _test_path, extract_with_tree, read_page
+
+_season_html_file = os.path.join(_test_path, 'test_football_results_for_season.html')
+
+def build_dictionaries(teams, scores, match_times, venues):
+    # The representation previously built by FootballResultsParser._get_results
+    try_parse_int = ignore_exception(ValueError, None)(int)
+    results = []
+
+    for match_index in range(len(match_times)):
+        result = {
+            'venue': venues[match_index],
+            'timeOfMatch': match_times[match_index],
+            'homeTeam': teams[match_index * 2],
+            'homeScore': try_parse_int(scores[match_index * 2]),
+            'awayTeam': teams[match_index * 2 + 1],
+            'awayScore': try_parse_int(scores[match_index * 2 + 1])
+        }
+
+        if result['homeScore'] is None or result['awayScore'] is None:
+            result['result'] = None
+        elif result['homeScore'] > result['awayScore']:
+            result['result'] = 'Winner: {0}'.format(result['homeTeam'])
+        elif result['homeScore'] < result['awayScore']:
+            result['result'] = 'Winner: {0}'.format(result['awayTeam'])
+        else:
+            result['result'] = 'Draw'
+
+        results.append(result)
+
+    return results
+
+def build_match_records(teams, scores, match_times, venues):
+    try_parse_int = ignore_exception(ValueError, None)(int)
+
+    return [MatchRecord(venues[match_index], match_times[match_index], teams[match_index * 2], try_parse_int(scores[match_index * 2]),
+                        teams[match_index * 2 + 1], try_parse_int(scores[match_index * 2 + 1]))
+            for match_index in range(len(match_times))]
+
+_representations = {
+    'dictionaries': build_dictionaries,
+    'matchRecords': build_match_records
+}
+
+def measure(representation, scale):
+    content = read_page(_season_html_file, scale)
+    gc.collect()
+    tracemalloc.start()
+
+    # Only the results are kept once the page has been parsed, as is the case when they are cached
+    teams, scores, match_times, venues = extract_with_tree(content)
+    results = _representations[representation](teams, scores, match_times, venues)
+    del teams, scores, match_times, venues
+    gc.collect()
+
+    retained_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'representation': representation,
+        'matches': len(results),
+        'retainedKilobytes': round(retained_bytes / 1024, 1),
+        'bytesPerMatch': round(retained_bytes / max(1, len(results)))
+    }
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Benchmark the memory retained by dictionaries and match records')
+    argument_parser.add_argument('--scale', type=int, default=30)
+    arguments = argument_parser.parse_args()
+
+    row_format = '{0:<14} {1:>8} {2:>14} {3:>10}'
+    print(row_format.format('representation', 'matches', 'retained KB', 'per match'))
+
+    for representation in sorted(_representations):
+        result = measure(representation, arguments.scale)
+        print(row_format.format(result['representation'], result['matches'], result['retainedKilobytes'], result['bytesPerMatch']))
+
+if __name__ == '__main__':
+    main()
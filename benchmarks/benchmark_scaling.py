@@ -0,0 +1,181 @@
+######################################################################
+## Measures how parse time and memory grow with the size of the
+## season page, using pages generated by
+## benchmarks/season_page_generator.py, to catch parts of parsing
+## that grow faster than the number of matches.
+##
+## Run from the root of the repository:
+##   python -m benchmarks.benchmark_scaling [--matches N N ...] [--mode tree|streaming]
+##       [--postponed-ratio R] [--missing-score-ratio R] [--malformed N] [--max-exponent E] [--csv FILE]
+##
+## For each page size the season page is extracted (lxml parse and
+## XPath queries, or the streaming extractor), its match records are
+## built (_get_results), and the whole page is turned into a season
+## snapshot, by the parser as wired in app/app.py. Each size is
+## measured in its own process, so that the peak resident set size
+## only reflects that size.
+##
+## The growth exponent between consecutive sizes is the slope of time
+## (or memory) against matches on a log-log chart: 1 is linear, and 2
+## quadratic. The harness exits with a non-zero status when a stage
+## grows with an exponent above --max-exponent (1.2 by default)
+## between sizes of at least --check-from matches, as fixed costs
+## dominate smaller pages. --csv writes the measurements for charting.
+######################################################################
+
+import argparse
+import csv
+import gc
+import json
+import math
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+_default_matches = [300, 1000, 3000, 10000, 30000, 100000]
+_stages = ('extract', 'results', 'snapshot')
+
+def _time_operation(operation, min_seconds, min_operations):
+    timings = []
+    start_time = time.perf_counter()
+
+    while len(timings) < min_operations or time.perf_counter() - start_time < min_seconds:
+        operation_start_time = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - operation_start_time)
+
+    return statistics.median(timings) * 1000
+
+def measure(matches, mode, postponed_ratio, missing_score_ratio, malformed, min_seconds, min_operations):
+    # Runs in its own process, so that the peak resident set size only reflects this page size
+    from app.inversion_of_control import features
+    from benchmarks.benchmark_suite import FixtureSession, _season_url, create_application
+    from benchmarks.season_page_generator import generate_page
+
+    pages = {_season_url: generate_page(matches, postponed_matches=int(matches * postponed_ratio),
+                                        missing_scores=int(matches * missing_score_ratio), malformed_blocks=malformed).encode('utf-8')}
+    create_application(pages, html_extractor_mode=mode)
+    parser = features['FootballSeasonResultsParser']
+    response = FixtureSession(pages).get(_season_url)
+    gc.collect()
+
+    rss_before_kilobytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    snapshot = parser._get_season_snapshot_for_found_page(response)
+    _, python_peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss_increase_kilobytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before_kilobytes
+
+    season_results = snapshot.get_season_results()
+    del snapshot
+    extracted_page = parser._extract_page(response.content, include_match_round_names=True)
+    operations = {
+        'extract': lambda: parser._extract_page(response.content, include_match_round_names=True),
+        'results': lambda: parser._get_results(extracted_page.teams, extracted_page.venues, extracted_page.match_times, extracted_page.scores),
+        'snapshot': lambda: parser._get_season_snapshot_for_found_page(response)
+    }
+
+    result = {
+        'matches': matches,
+        'mode': mode,
+        'pageBytes': len(response.content),
+        'parsedMatches': len(season_results.get('results', [])),
+        'error': season_results.get('error'),
+        'pythonPeakKilobytes': round(python_peak_bytes / 1024, 1),
+        'peakRssIncreaseKilobytes': peak_rss_increase_kilobytes
+    }
+
+    for stage in _stages:
+        result[stage + 'Milliseconds'] = round(_time_operation(operations[stage], min_seconds, min_operations), 4)
+
+    return result
+
+def run_in_child_process(matches, arguments):
+    command = [sys.executable, '-m', 'benchmarks.benchmark_scaling', '--child', str(matches), '--mode', arguments.mode,
+               '--postponed-ratio', str(arguments.postponed_ratio), '--missing-score-ratio', str(arguments.missing_score_ratio),
+               '--malformed', str(arguments.malformed), '--min-seconds', str(arguments.min_seconds),
+               '--min-operations', str(arguments.min_operations)]
+    output = subprocess.check_output(command, cwd=os.path.join(os.path.dirname(__file__), '..'), stderr=subprocess.DEVNULL)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+def get_exponent(previous, current, key):
+    if previous is None or previous[key] <= 0 or current[key] <= 0:
+        return None
+
+    return round(math.log(current[key] / previous[key]) / math.log(current['matches'] / previous['matches']), 2)
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Measure how parse time and memory grow with the number of matches on the season page')
+    argument_parser.add_argument('--matches', type=int, nargs='+', default=_default_matches)
+    argument_parser.add_argument('--mode', choices=['tree', 'streaming'], default='tree')
+    argument_parser.add_argument('--postponed-ratio', type=float, default=0.02, help='Fraction of matches without a score for either team')
+    argument_parser.add_argument('--missing-score-ratio', type=float, default=0.01, help='Fraction of matches without a score for one team')
+    argument_parser.add_argument('--malformed', type=int, default=0, help='Number of malformed blocks on each page')
+    argument_parser.add_argument('--min-seconds', type=float, default=1.0)
+    argument_parser.add_argument('--min-operations', type=int, default=3)
+    argument_parser.add_argument('--max-exponent', type=float, default=1.2)
+    argument_parser.add_argument('--check-from', type=int, default=3000)
+    argument_parser.add_argument('--csv', help='File to write the measurements to')
+    argument_parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    arguments = argument_parser.parse_args()
+
+    if arguments.child is not None:
+        print(json.dumps(measure(arguments.child, arguments.mode, arguments.postponed_ratio, arguments.missing_score_ratio, arguments.malformed,
+                                 arguments.min_seconds, arguments.min_operations)))
+        return 0
+
+    row_format = '{0:>8} {1:>11} {2:>11} {3:>11} {4:>12} {5:>9} {6:>14} {7:>15} {8:>9} {9:>11}'
+    print(row_format.format('matches', 'bytes', 'extract ms', 'results ms', 'snapshot ms', 'us/match', 'python peak KB', 'RSS increase KB',
+                            'time exp', 'memory exp'))
+
+    results = []
+    superlinear_stages = []
+    previous = None
+
+    for matches in sorted(arguments.matches):
+        result = run_in_child_process(matches, arguments)
+        exponents = {stage: get_exponent(previous, result, stage + 'Milliseconds') for stage in _stages}
+        exponents['memory'] = get_exponent(previous, result, 'pythonPeakKilobytes')
+        result.update({key + 'Exponent': exponent for key, exponent in exponents.items()})
+        results.append(result)
+
+        if previous is not None and previous['matches'] >= arguments.check_from:
+            superlinear_stages.extend('{0} from {1} to {2} matches (exponent {3})'.format(key, previous['matches'], matches, exponent)
+                                      for key, exponent in sorted(exponents.items())
+                                      if exponent is not None and exponent > arguments.max_exponent)
+
+        print(row_format.format(matches, result['pageBytes'], result['extractMilliseconds'], result['resultsMilliseconds'],
+                                result['snapshotMilliseconds'], round(result['snapshotMilliseconds'] * 1000 / matches, 2),
+                                result['pythonPeakKilobytes'], result['peakRssIncreaseKilobytes'],
+                                '' if exponents['snapshot'] is None else exponents['snapshot'],
+                                '' if exponents['memory'] is None else exponents['memory']))
+
+        # Pages that were rejected (e.g. with malformed blocks) or truncated are reported, as their timings are not comparable
+        if result['error'] is not None or result['parsedMatches'] != matches:
+            print('{0:>8} {1} ({2} matches parsed)'.format('', result['error'] or 'Matches were left out', result['parsedMatches']))
+
+        previous = result
+
+    if arguments.csv is not None:
+        with open(file=arguments.csv, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    if len(superlinear_stages) > 0:
+        print()
+        print('Growing faster than an exponent of {0}:'.format(arguments.max_exponent))
+
+        for superlinear_stage in superlinear_stages:
+            print('  ' + superlinear_stage)
+
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+######################################################################
+## Measures how long a new process (e.g. a gunicorn worker) takes to
+## import the application, build it, and answer its first request,
+## along with the modules that take the longest to import.
+##
+## Run from the root of the repository:
+##   python -m benchmarks.benchmark_startup [--repeat N] [--modules N]
+##
+## Each measurement is taken in a new interpreter, so that modules
+## imported by earlier measurements are not reused. The first request
+## is for the root document, so that the measurement does not depend
+## on sportstg.
+######################################################################
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in each new interpreter, printing the elapsed milliseconds of each stage as JSON.
+# The process exits without waiting for the background threads of the application (e.g. refreshes of results).
+_startup_script = '''
+import json, os, sys, time
+start_time = time.perf_counter()
+import app.app
+imported_time = time.perf_counter()
+application = app.app.get_new_application_instance()
+built_time = time.perf_counter()
+response = application.test_client().get('/')
+responded_time = time.perf_counter()
+print(json.dumps({
+    'importMilliseconds': (imported_time - start_time) * 1000,
+    'buildMilliseconds': (built_time - imported_time) * 1000,
+    'firstResponseMilliseconds': (responded_time - start_time) * 1000,
+    'statusCode': response.status_code,
+    'githubImported': 'github' in sys.modules
+}))
+sys.stdout.flush()
+os._exit(0)
+'''
+
+_import_time_pattern = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$')
+
+def _get_environment():
+    # Results are persisted to a temporary database, so that the measurement does not depend on results persisted earlier
+    environment = dict(os.environ)
+    environment['RESULTS_STORE_PATH'] = os.path.join(tempfile.mkdtemp(), 'football_results.sqlite3')
+    return environment
+
+def measure_startup():
+    output = subprocess.check_output([sys.executable, '-c', _startup_script], cwd=_repository_path, env=_get_environment(),
+                                     stderr=subprocess.DEVNULL)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+def measure_slowest_imports(count):
+    # Returns the modules imported directly by the application modules that took the longest to import (including their own imports)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app.app'], cwd=_repository_path, env=_get_environment(),
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    import_times = {}
+    parents = []
+
+    # Modules are listed after the modules they import, so the lines are read in reverse, keeping the chain of modules
+    # being imported, to know which module imported each one
+    for line in reversed(process.stderr.decode('utf-8').splitlines()):
+        import_time_match = _import_time_pattern.match(line)
+
+        if import_time_match is None:
+            continue
+
+        microseconds, indent, module_name = int(import_time_match.group(1)), len(import_time_match.group(2)), import_time_match.group(3)
+
+        while len(parents) > 0 and parents[-1][0] >= indent:
+            parents.pop()
+
+        top_level_name = module_name.split('.')[0]
+
+        if top_level_name != 'app' and len(parents) > 0 and parents[-1][1].split('.')[0] == 'app':
+            import_times[top_level_name] = import_times.get(top_level_name, 0) + microseconds
+
+        parents.append((indent, module_name))
+
+    return sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:count]
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Benchmark the time taken to start the application and answer its first request')
+    argument_parser.add_argument('--repeat', type=int, default=10)
+    argument_parser.add_argument('--modules', type=int, default=10)
+    arguments = argument_parser.parse_args()
+
+    measurements = [measure_startup() for _ in range(arguments.repeat)]
+
+    if any(measurement['statusCode'] != 200 for measurement in measurements):
+        print('The first request was not answered with HTTP 200')
+
+    if any(measurement['githubImported'] for measurement in measurements):
+        print('The github package was imported during startup')
+
+    row_format = '{0:<20} {1:>10} {2:>10} {3:>10}'
+    print(row_format.format('stage', 'min ms', 'median ms', 'max ms'))
+
+    for stage, key in [('import', 'importMilliseconds'), ('build', 'buildMilliseconds'), ('first response', 'firstResponseMilliseconds')]:
+        values = [measurement[key] for measurement in measurements]
+        print(row_format.format(stage, round(min(values), 1), round(statistics.median(values), 1), round(max(values), 1)))
+
+    print()
+    print('{0:<20} {1:>10}'.format('module', 'import ms'))
+
+    for module_name, microseconds in measure_slowest_imports(arguments.modules):
+        print('{0:<20} {1:>10}'.format(module_name, round(microseconds / 1000, 1)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+######################################################################
+## Measures the throughput and latency of parsing pages, building
+## match records, rendering JSON, and answering requests to /season
+## and /round/<n> in-process through the Flask test client, and
+## compares them with the baselines in benchmarks/baselines.json.
+##
+## Run from the root of the repository:
+##   python -m benchmarks.benchmark_suite [--scale N | --matches N] [--threshold RATIO] [--benchmark NAME ...]
+##   python -m benchmarks.benchmark_suite --update-baselines [--baselines FILE]
+##
+## The suite exits with a non-zero status when a benchmark's
+## throughput falls, or its median latency rises, by more than the
+## threshold (25% by default) compared with its baseline. Baselines
+## depend on the machine they were measured on, so they should be
+## updated on the machine used for comparisons before changes are
+## measured.
+##
+## Requests are answered by the application as wired in app/app.py,
+## with sportstg replaced by a session serving the pages in
+## tests/test_data/test_football_results_parser (repeated --scale
+## times), or pages with --matches matches generated by
+## benchmarks/season_page_generator.py, and the background refreshing
+## of results disabled so that it does not affect timings.
+######################################################################
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import requests
+
+_test_path = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_data', 'test_football_results_parser')
+_season_html_file = os.path.join(_test_path, 'test_football_results_for_season_with_round_names.html')
+_round_html_file = os.path.join(_test_path, 'test_football_results_round1.html')
+_baselines_file = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+_season_url = 'http://benchmark.sportstg.com/comp_info.cgi?round=-1'
+_round_url_format = 'http://benchmark.sportstg.com/comp_info.cgi?round={0}'
+
+class FixtureSession(requests.Session):
+    """ Session answering requests for the season and round pages with the test pages, without any network access.
+    """
+
+    def __init__(self, pages):
+        super().__init__()
+        self._pages = pages
+
+    def get(self, url, **kwargs):
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200 if url in self._pages else 404
+        response._content = self._pages.get(url, b'<html><body></body></html>')
+        return response
+
+    def head(self, url, **kwargs):
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response._content = b''
+        return response
+
+class IdleRefreshScheduler():
+    # Results are only refreshed by the requests being measured
+    def start(self):
+        pass
+
+def read_page(html_file, scale):
+    # Imported here, as the benchmark of HTML extractors imports lxml and the streaming extractor when loaded
+    from benchmarks.benchmark_html_extractors import read_page as read_scaled_page
+    return read_scaled_page(html_file, scale).encode('utf-8')
+
+def read_pages(scale=1, matches=None):
+    # Returns the season page and the page for round 1, keyed by their URLs
+    if matches is not None:
+        from benchmarks.season_page_generator import generate_page
+
+        return {
+            _season_url: generate_page(matches).encode('utf-8'),
+            _round_url_format.format(1): generate_page(matches, round_names=False, seed=1).encode('utf-8')
+        }
+
+    return {
+        _season_url: read_page(_season_html_file, scale),
+        _round_url_format.format(1): read_page(_round_html_file, scale)
+    }
+
+def create_application(pages, html_extractor_mode=None):
+    """ Builds the application as wired in app/app.py, replacing its access to sportstg and its persisted results.
+    """
+    os.environ['RESULTS_STORE_PATH'] = os.path.join(tempfile.mkdtemp(), 'football_results.sqlite3')
+
+    import app.app
+    from app.inversion_of_control import features
+    from app.results_store import ResultsStore
+    from app.upstream_http_client import UpstreamHttpClient
+
+    # The features replaced have not been used yet, as the application is built after they are replaced
+    features.allowReplace = True
+    features.Provide('HttpRequest', UpstreamHttpClient(session=FixtureSession(pages)))
+    features.Provide('HttpGetScoresForSeasonUrlFormat', _season_url)
+    features.Provide('HttpGetScoresForRoundUrlFormat', _round_url_format)
+    features.Provide('XpathGetTeams', '//div[@class="teamname"]/text()')
+    features.Provide('XpathGetScores', '//div[@class="score"]/text()')
+    features.Provide('XpathGetMatchTimes', '//div[@class="matchtime"]/text()')
+    features.Provide('XpathGetVenues', '//div[@class="venuename"]/text()')
+    features.Provide('XpathGetRoundNames', '//div[@class="roundname"]/text()')
+    features.Provide('ResultsStore', ResultsStore(os.environ['RESULTS_STORE_PATH']))
+    features.Provide('RefreshScheduler', IdleRefreshScheduler)
+
+    if html_extractor_mode is not None:
+        features.Provide('HtmlExtractorMode', html_extractor_mode)
+
+    return app.app.get_new_application_instance()
+
+def create_benchmarks(pages):
+    """ Returns each benchmark as a function performing one operation, keyed by the name of the benchmark.
+    """
+    from flask_jsonpify import jsonify
+
+    from app.inversion_of_control import features
+    from app.match_record import to_serializable
+    from app.streaming_html_extractor import ExtractedPage
+
+    application = create_application(pages)
+    client = application.test_client()
+    parser = features['FootballSeasonResultsParser']
+    results_cache = features['ResultsCache']
+    conditional_request_store = features['ConditionalRequestStore']
+
+    season_response = FixtureSession(pages).get(_season_url)
+    round_response = FixtureSession(pages).get(_round_url_format.format(1))
+    extracted_page = parser._extract_page(season_response.content)
+    season = parser.get_scores_for_season()
+
+    def parse_season_page():
+        parser._get_scores_for_found_page(season_response)
+
+    def parse_round_page():
+        parser._get_scores_for_found_page(round_response, 1)
+
+    def build_match_records():
+        parser._get_results(extracted_page.teams, extracted_page.venues, extracted_page.match_times, extracted_page.scores)
+
+    def render_season_pretty():
+        # Rendered as requests are, with jsonify checking the request for a JSONP callback
+        with application.test_request_context('/season'):
+            jsonify(to_serializable(season)).get_data()
+
+    def render_season_compact():
+        json.dumps(to_serializable(season), separators=(',', ':')).encode('utf-8')
+
+    def request(url, uncached_keys=()):
+        def perform_request():
+            # Forgetting the cached results and the digests of the pages means that they are fetched, parsed and rendered again
+            for key in uncached_keys:
+                results_cache.invalidate(key)
+
+            if len(uncached_keys) > 0:
+                conditional_request_store.clear()
+
+            response = client.get(url)
+            assert response.status_code == 200, 'HTTP {0} was returned for {1}'.format(response.status_code, url)
+
+        return perform_request
+
+    assert isinstance(extracted_page, ExtractedPage) and 'results' in season, 'The season page should have been parsed'
+
+    return {
+        'parse_season_page': parse_season_page,
+        'parse_round_page': parse_round_page,
+        'build_match_records': build_match_records,
+        'render_season_pretty': render_season_pretty,
+        'render_season_compact': render_season_compact,
+        'season_request': request('/season'),
+        'season_request_uncached': request('/season', uncached_keys=['season']),
+        'round_request': request('/round/1'),
+        'round_request_uncached': request('/round/1', uncached_keys=['season', '1'])
+    }
+
+def measure(operation, min_seconds, min_operations, warmup_operations=5):
+    for _ in range(warmup_operations):
+        operation()
+
+    gc.collect()
+    timings = []
+    start_time = time.perf_counter()
+
+    while len(timings) < min_operations or time.perf_counter() - start_time < min_seconds:
+        operation_start_time = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - operation_start_time)
+
+    elapsed_seconds = time.perf_counter() - start_time
+    timings.sort()
+
+    return {
+        'operations': len(timings),
+        'operationsPerSecond': round(len(timings) / elapsed_seconds, 1),
+        'p50Milliseconds': round(statistics.median(timings) * 1000, 4),
+        'p95Milliseconds': round(timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1000, 4)
+    }
+
+def find_regressions(name, result, baseline, threshold):
+    # Throughput and median latency are compared, as the 95th percentile varies too much between runs to be a threshold
+    regressions = []
+
+    if result['operationsPerSecond'] < baseline['operationsPerSecond'] * (1 - threshold):
+        regressions.append('{0}: throughput fell from {1} to {2} operations per second'.format(
+            name, baseline['operationsPerSecond'], result['operationsPerSecond']))
+
+    if result['p50Milliseconds'] > baseline['p50Milliseconds'] * (1 + threshold):
+        regressions.append('{0}: median latency rose from {1} ms to {2} ms'.format(name, baseline['p50Milliseconds'], result['p50Milliseconds']))
+
+    return regressions
+
+def load_baselines(baselines_file):
+    if not os.path.exists(baselines_file):
+        return None
+
+    with open(file=baselines_file, mode='r') as f:
+        return json.load(f)
+
+def save_baselines(baselines_file, scale, matches, results):
+    with open(file=baselines_file, mode='w') as f:
+        json.dump({'scale': scale, 'matches': matches, 'python': sys.version.split()[0], 'benchmarks': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Benchmark parsing, rendering and requests, and compare them with baselines')
+    argument_parser.add_argument('--scale', type=int, default=30)
+    argument_parser.add_argument('--matches', type=int, help='Number of matches on generated pages, used instead of the test pages')
+    argument_parser.add_argument('--threshold', type=float, default=0.25)
+    argument_parser.add_argument('--min-seconds', type=float, default=1.0)
+    argument_parser.add_argument('--min-operations', type=int, default=20)
+    argument_parser.add_argument('--benchmark', action='append', help='Name of a benchmark to run (all are run by default)')
+    argument_parser.add_argument('--baselines', default=_baselines_file, help='File holding the baselines (e.g. one for each page size)')
+    argument_parser.add_argument('--update-baselines', action='store_true', help='Store the results as the baselines')
+    arguments = argument_parser.parse_args()
+
+    baselines = None if arguments.update_baselines else load_baselines(arguments.baselines)
+
+    if baselines is not None and baselines.get('matches') is not None and baselines['matches'] != arguments.matches:
+        print('The baselines were measured with --matches {0}'.format(baselines['matches']))
+        return 2
+
+    if baselines is not None and baselines.get('matches') is None and (arguments.matches is not None or baselines['scale'] != arguments.scale):
+        print('The baselines were measured with --scale {0}'.format(baselines['scale']))
+        return 2
+
+    benchmarks = create_benchmarks(read_pages(arguments.scale, arguments.matches))
+    names = arguments.benchmark or list(benchmarks)
+    unknown_names = [name for name in names if name not in benchmarks]
+
+    if len(unknown_names) > 0:
+        print('Unknown benchmarks: {0} (expected one of {1})'.format(', '.join(unknown_names), ', '.join(benchmarks)))
+        return 2
+
+    results = {}
+    regressions = []
+
+    row_format = '{0:<26} {1:>12} {2:>10} {3:>10} {4:>14} {5:>8}'
+    print(row_format.format('benchmark', 'ops/s', 'p50 ms', 'p95 ms', 'baseline ops/s', 'change'))
+
+    for name in names:
+        result = measure(benchmarks[name], arguments.min_seconds, arguments.min_operations)
+        results[name] = result
+        baseline = baselines['benchmarks'].get(name) if baselines is not None else None
+        baseline_operations = ''
+        change = ''
+
+        if baseline is not None:
+            baseline_operations = baseline['operationsPerSecond']
+            change = '{0:+.1f}%'.format((result['operationsPerSecond'] / baseline['operationsPerSecond'] - 1) * 100)
+            regressions.extend(find_regressions(name, result, baseline, arguments.threshold))
+
+        print(row_format.format(name, result['operationsPerSecond'], result['p50Milliseconds'], result['p95Milliseconds'], baseline_operations, change))
+
+    if arguments.update_baselines:
+        save_baselines(arguments.baselines, arguments.scale, arguments.matches, results)
+        print('Baselines saved to {0}'.format(os.path.normpath(arguments.baselines)))
+        return 0
+
+    if len(regressions) > 0:
+        print()
+        print('Regressions of more than {0:.0%}:'.format(arguments.threshold))
+
+        for regression in regressions:
+            print('  ' + regression)
+
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+######################################################################
+## Generates pages shaped like the sportstg season and round pages
+## used by the tests, with any number of matches, so that parsing can
+## be measured on pages from a few hundred to hundreds of thousands
+## of matches.
+##
+## Run from the root of the repository:
+##   python -m benchmarks.season_page_generator --matches N [--teams N] [--postponed N]
+##       [--missing-scores N] [--malformed N] [--no-round-names] [--seed N] [--output FILE]
+##
+## Pages are written to standard output unless --output is given.
+## Matches are played by --teams teams, with each team playing once
+## per round (one round a week), and the same seed always generates
+## the same page. Postponed matches have no score for either team,
+## matches with a missing score have no score for one team, and
+## malformed blocks have a div that is not closed properly (as in
+## the malformed test pages), so that the numbers of teams, scores
+## and venues found no longer agree and the parser rejects the page.
+## As the rest of the page is nested within each unclosed div, lxml
+## stops building the tree once a few hundred blocks are malformed,
+## leaving out the matches that follow.
+######################################################################
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+
+# XPath expressions finding the content of the generated pages, which are those used for the test pages
+xpaths = {
+    'XpathGetTeams': '//div[@class="teamname"]/text()',
+    'XpathGetScores': '//div[@class="score"]/text()',
+    'XpathGetMatchTimes': '//div[@class="matchtime"]/text()',
+    'XpathGetVenues': '//div[@class="venuename"]/text()',
+    'XpathGetRoundNames': '//div[@class="roundname"]/text()'
+}
+
+_first_match_time = datetime(2018, 4, 13, 19, 30)
+
+# Kick-off times of the matches in a round, relative to the first match of the round
+_match_time_offsets = [timedelta(days=0), timedelta(days=1, hours=-3, minutes=-30), timedelta(days=1), timedelta(days=2, hours=-5)]
+
+_match_block = '''        <div>
+            <div class="venuename">{venue}</div>
+            <div class="matchtime">{match_time}</div>
+            <div class="teamname">{home_team}</div>
+            <div class="score">{home_score}</div>
+            <div class="teamname">{away_team}</div>
+            <div class="score">{away_score}</div>
+        </div>
+'''
+
+# Each malformed block leaves the end tag of one div unclosed, which yields more teams, scores or venues than expected
+_malformed_fields = ('venue', 'home_team', 'home_score')
+
+_missing_score = ' '
+
+def iter_page(matches, teams=12, postponed_matches=0, missing_scores=0, malformed_blocks=0, round_names=True, seed=0,
+              title='generated season'):
+    """ Yields the page in chunks, so that pages with hundreds of thousands of matches can be written without being held in memory.
+    """
+    if postponed_matches + missing_scores + malformed_blocks > matches:
+        raise ValueError('There are more postponed matches, missing scores and malformed blocks than matches')
+
+    if teams < 2:
+        raise ValueError('At least 2 teams are needed')
+
+    random_generator = random.Random(seed)
+
+    # Each kind of irregularity is given to a different set of matches
+    irregular_matches = random_generator.sample(range(matches), postponed_matches + missing_scores + malformed_blocks)
+    postponed = set(irregular_matches[:postponed_matches])
+    missing = set(irregular_matches[postponed_matches:postponed_matches + missing_scores])
+    malformed = set(irregular_matches[postponed_matches + missing_scores:])
+
+    team_names = ['Team {0}'.format(team_number) for team_number in range(1, teams + 1)]
+    venue_names = ['Venue {0}'.format(venue_number) for venue_number in range(1, teams // 2 + 1)]
+    matches_per_round = teams // 2
+
+    yield '<html>\n    <head><title>Football Results, {0}</title></head>\n    <body>\n'.format(title)
+
+    for match_index in range(matches):
+        round_index, match_in_round = divmod(match_index, matches_per_round)
+
+        if round_names and match_in_round == 0:
+            yield '        <div class="roundname">Round {0}</div>\n'.format(round_index + 1)
+
+        # Teams are paired differently in each round, by shuffling them with a generator seeded for the round
+        if match_in_round == 0:
+            round_teams = list(team_names)
+            random.Random(seed * 1000003 + round_index).shuffle(round_teams)
+
+        match_time = _first_match_time + timedelta(weeks=round_index) + _match_time_offsets[match_in_round % len(_match_time_offsets)]
+        fields = {
+            'venue': venue_names[match_in_round],
+            'match_time': '{0:%A} {1} {0:%B %Y}, {2}:{0:%M %p}'.format(match_time, match_time.day, match_time.hour % 12 or 12),
+            'home_team': round_teams[match_in_round * 2],
+            'home_score': random_generator.randint(0, 5),
+            'away_team': round_teams[match_in_round * 2 + 1],
+            'away_score': random_generator.randint(0, 5)
+        }
+
+        if match_index in postponed:
+            fields['home_score'] = fields['away_score'] = _missing_score
+        elif match_index in missing:
+            fields[random_generator.choice(('home_score', 'away_score'))] = _missing_score
+
+        block = _match_block.format(**fields)
+
+        if match_index in malformed:
+            field = random_generator.choice(_malformed_fields)
+            value = str(fields[field])
+            block = block.replace('>{0}</div>'.format(value), '>{0}/div>'.format(value), 1)
+
+        yield block
+
+    yield '    </body>\n</html>\n'
+
+def generate_page(matches, **kwargs):
+    """ Returns the page as a string (see iter_page for the arguments).
+    """
+    return ''.join(iter_page(matches, **kwargs))
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Generate a page shaped like the sportstg season page')
+    argument_parser.add_argument('--matches', type=int, required=True)
+    argument_parser.add_argument('--teams', type=int, default=12)
+    argument_parser.add_argument('--postponed', type=int, default=0, help='Number of matches without a score for either team')
+    argument_parser.add_argument('--missing-scores', type=int, default=0, help='Number of matches without a score for one team')
+    argument_parser.add_argument('--malformed', type=int, default=0, help='Number of matches with a div that is not closed properly')
+    argument_parser.add_argument('--no-round-names', action='store_true', help='Leave out round names, as on the page for a round')
+    argument_parser.add_argument('--seed', type=int, default=0)
+    argument_parser.add_argument('--output', help='File to write the page to')
+    arguments = argument_parser.parse_args()
+
+    chunks = iter_page(arguments.matches, teams=arguments.teams, postponed_matches=arguments.postponed, missing_scores=arguments.missing_scores,
+                       malformed_blocks=arguments.malformed, round_names=not arguments.no_round_names, seed=arguments.seed)
+
+    if arguments.output is None:
+        sys.stdout.writelines(chunks)
+        return
+
+    with open(file=arguments.output, mode='w') as f:
+        f.writelines(chunks)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from github import GithubException
+
+from app.application_information import ApplicationInformation
+from app.inversion_of_control import features
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 1000000
+
+    def __call__(self):
+        return self.current_time
+
+class MockObject():
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+class MockTags():
+    def __init__(self, tags):
+        self._tags = tags
+
+    def get_page(self, page):
+        return self._tags if page == 0 else []
+
+class MockRepository():
+    def get_commits(self):
+        return [MockObject(sha='sha12345'), MockObject(sha='sha12344')]
+
+    def get_tags(self):
+        return MockTags([MockObject(name='tag-v2', commit=MockObject(sha='sha99999')), MockObject(name='tag-v1', commit=MockObject(sha='sha12345'))])
+
+class MockGithub():
+    # Records the calls made to GitHub, with a lookup failing when an error is set
+    repositories_requested = []
+    error = None
+
+    def __init__(self, token):
+        self._token = token
+
+    def get_user(self):
+        return MockObject(login='unittester')
+
+    def get_repo(self, full_name):
+        if MockGithub.error is not None:
+            raise MockGithub.error
+
+        MockGithub.repositories_requested.append(full_name)
+        return MockRepository()
+
+class DeferredThreadStarter():
+    # Keeps the lookups that would have been started, so that tests control when they run
+    def __init__(self):
+        self.targets = []
+
+    def __call__(self, target):
+        self.targets.append(target)
+
+    def run_all(self):
+        targets = self.targets
+        self.targets = []
+
+        for target in targets:
+            target()
+
+class ApplicationInformationWithOwner(ApplicationInformation):
+    # Overrides the injected repository name, as the injected value is kept once requested
+    _repo_name = 'ktenedios/myob-webapi'
+
+class ApplicationInformationWithoutToken(ApplicationInformation):
+    _github_token = ''
+
+class TestApplicationInformation(unittest.TestCase):
+    def setUp(self):
+        # Allow the dependencies to be replaced so as not to affect unit tests in other test classes
+        features.allowReplace = True
+        features.Provide('GithubToken', 'token')
+        features.Provide('RepoName', 'myob-webapi')
+        MockGithub.repositories_requested = []
+        MockGithub.error = None
+        self._directory = tempfile.mkdtemp()
+        self._cache_path = os.path.join(self._directory, 'application_information.json')
+        self._clock = MockClock()
+        self._thread_starter = DeferredThreadStarter()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _create_information(self, cache_path=None, build_commit=None, information_class=ApplicationInformation):
+        return information_class(cache_path=cache_path, ttl_seconds=3600, retry_interval_seconds=300, build_commit=build_commit,
+                                      clock=self._clock, start_thread=self._thread_starter, github_factory=MockGithub)
+
+    def test_github_is_not_contacted_when_created(self):
+        self._create_information(self._cache_path)
+        self.assertListEqual([], self._thread_starter.targets, 'No lookup should have been started when created')
+        self.assertListEqual([], MockGithub.repositories_requested, 'GitHub should not have been contacted when created')
+
+    def test_information_returned_without_waiting_for_lookup(self):
+        information = self._create_information(build_commit='sha54321').get_information()
+        self.assertDictEqual({'name': 'NPL Victoria 2018 Football Results API', 'buildCommit': 'sha54321', 'mostRecentCommit': None, 'tag': None},
+                             information['app'], 'The build commit should have been returned before the repository was looked up')
+        self.assertEqual(1, len(self._thread_starter.targets), 'A lookup should have been started in the background')
+
+    def test_repository_looked_up_directly_with_tag_of_most_recent_commit(self):
+        application_information = self._create_information()
+        application_information.get_information()
+        self._thread_starter.run_all()
+        information = application_information.get_information()['app']
+
+        self.assertListEqual(['unittester/myob-webapi'], MockGithub.repositories_requested, 'The repository should have been requested directly')
+        self.assertEqual('sha12345', information['mostRecentCommit'], 'The most recent commit should have been returned')
+        self.assertEqual('tag-v1', information['tag'], 'The tag of the most recent commit should have been returned')
+        self.assertListEqual([], self._thread_starter.targets, 'No further lookup should have been started within the TTL')
+
+    def test_repository_name_with_owner_is_used_as_is(self):
+        application_information = self._create_information(information_class=ApplicationInformationWithOwner)
+        application_information.get_information()
+        self._thread_starter.run_all()
+        self.assertListEqual(['ktenedios/myob-webapi'], MockGithub.repositories_requested, 'The full name of the repository should have been used')
+
+    def test_no_lookup_without_token(self):
+        self._create_information(information_class=ApplicationInformationWithoutToken).get_information()
+        self.assertListEqual([], self._thread_starter.targets, 'No lookup should have been started without a GitHub token')
+
+    def test_details_cached_to_disk_are_reused_by_new_process(self):
+        first_information = self._create_information(self._cache_path)
+        first_information.get_information()
+        self._thread_starter.run_all()
+
+        information = self._create_information(self._cache_path).get_information()['app']
+        self.assertEqual('sha12345', information['mostRecentCommit'], 'The most recent commit should have been loaded from disk')
+        self.assertListEqual([], self._thread_starter.targets, 'No lookup should have been started while the cached details are fresh')
+        self.assertEqual(1, len(MockGithub.repositories_requested), 'GitHub should only have been contacted once')
+
+    def test_details_cached_to_disk_are_looked_up_again_after_ttl(self):
+        with open(self._cache_path, mode='w') as cache_file:
+            json.dump({'repoName': 'myob-webapi', 'fetchedAt': self._clock() - 3600, 'mostRecentCommit': 'sha00001', 'tag': None}, cache_file)
+
+        application_information = self._create_information(self._cache_path)
+        self.assertEqual('sha00001', application_information.get_information()['app']['mostRecentCommit'], \
+            'The stale details should have been returned while they are looked up again')
+        self._thread_starter.run_all()
+        self.assertEqual('sha12345', application_information.get_information()['app']['mostRecentCommit'], 'The details should have been refreshed')
+
+    def test_details_cached_for_another_repository_are_ignored(self):
+        with open(self._cache_path, mode='w') as cache_file:
+            json.dump({'repoName': 'other-repository', 'fetchedAt': self._clock(), 'mostRecentCommit': 'sha00001', 'tag': None}, cache_file)
+
+        self.assertIsNone(self._create_information(self._cache_path).get_information()['app']['mostRecentCommit'], \
+            'The details of another repository should not have been returned')
+
+    def test_failed_lookup_is_retried_after_retry_interval(self):
+        MockGithub.error = GithubException(403, {'message': 'API rate limit exceeded'})
+        application_information = self._create_information()
+        application_information.get_information()
+        self._thread_starter.run_all()
+
+        application_information.get_information()
+        self.assertListEqual([], self._thread_starter.targets, 'No lookup should have been started within the retry interval')
+
+        self._clock.current_time += 300
+        application_information.get_information()
+        self.assertEqual(1, len(self._thread_starter.targets), 'The lookup should have been started again after the retry interval')
@@ -0,0 +1,200 @@
+import gc
+import gzip
+import json
+import unittest
+
+from flask import Flask
+from flask_jsonpify import jsonify
+
+from app.cached_json_renderer import CachedJsonRenderer, brotli
+from app.match_record import MatchRecord, to_serializable
+
+_application = Flask(__name__)
+_results = {'round': 1, 'results': [{'homeTeam': 'Bentleigh Greens', 'awayTeam': 'Heidelberg United', 'homeScore': 2, 'awayScore': 1}]}
+
+# Results large enough for compression to reduce their size
+_season_results = {'round': 'All', 'results': [dict(match, round=round_number) for round_number in range(1, 27) for match in _results['results']]}
+
+class CountingRenderer():
+    def __init__(self):
+        self.invocation_count = 0
+
+    def __call__(self, data):
+        self.invocation_count += 1
+        return jsonify(data)
+
+class TestCachedJsonRenderer(unittest.TestCase):
+    def setUp(self):
+        self._renderer = CountingRenderer()
+        self._cached_json_renderer = CachedJsonRenderer(self._renderer, to_serializable, max_versions=2, max_age_seconds=60)
+
+    def _render(self, data, path='/round/1', headers=None):
+        with _application.test_request_context(path, headers=headers):
+            return self._cached_json_renderer(data)
+
+    def test_response_contains_json_with_etag_and_cache_control(self):
+        response = self._render(_results)
+        self.assertEqual(200, response.status_code, 'HTTP 200 should have been returned')
+        self.assertEqual('application/json', response.mimetype, 'JSON should have been returned')
+        self.assertDictEqual(_results, load_json(response.get_data()), 'The results should have been rendered as JSON')
+        self.assertFalse(response.get_etag()[1], 'A strong ETag should have been set')
+        self.assertEqual('public, max-age=60', response.headers['Cache-Control'], 'The response should be cacheable for 60 seconds')
+
+    def test_same_results_are_rendered_once(self):
+        first_response = self._render(_results)
+        second_response = self._render(_results)
+        self.assertEqual(1, self._renderer.invocation_count, 'The results should only have been rendered once')
+        self.assertEqual(first_response.get_data(), second_response.get_data(), 'The same body should have been returned')
+        self.assertEqual(first_response.get_etag(), second_response.get_etag(), 'The same ETag should have been returned')
+        self.assertEqual(1, self._cached_json_renderer.get_statistics()['reuses'], 'A reuse should have been counted')
+
+    def test_new_version_of_results_is_rendered_with_new_etag(self):
+        first_response = self._render(_results)
+        second_response = self._render(dict(_results, round=2))
+        self.assertEqual(2, self._renderer.invocation_count, 'Each version of the results should have been rendered')
+        self.assertNotEqual(first_response.get_etag(), second_response.get_etag(), 'Each version should have its own ETag')
+
+    def test_results_freed_after_rendering_are_not_confused_with_later_results(self):
+        # The renderer holds the only reference to the first results, which would otherwise be freed and their id reused
+        first_body = self._render(dict(_results, round=1)).get_data()
+        gc.collect()
+        second_results = dict(_results, round=2)
+        second_body = self._render(second_results).get_data()
+        self.assertNotEqual(first_body, second_body, 'The later results should not have been answered with the body of the freed results')
+        self.assertDictEqual(second_results, load_json(second_body), 'The later results should have been rendered')
+
+    def test_matching_if_none_match_returns_not_modified(self):
+        etag = self._render(_results).get_etag()[0]
+        response = self._render(_results, headers={'If-None-Match': '"{0}"'.format(etag)})
+        self.assertEqual(304, response.status_code, 'HTTP 304 should have been returned')
+        self.assertEqual(b'', response.get_data(), 'No body should have been returned')
+        self.assertEqual(etag, response.get_etag()[0], 'The ETag should have been returned')
+        self.assertEqual(1, self._cached_json_renderer.get_statistics()['notModifiedResponses'], 'A HTTP 304 response should have been counted')
+
+    def test_weakened_if_none_match_returns_not_modified(self):
+        etag = self._render(_results).get_etag()[0]
+        response = self._render(_results, headers={'If-None-Match': 'W/"{0}"'.format(etag)})
+        self.assertEqual(304, response.status_code, 'HTTP 304 should have been returned for the ETag weakened by a proxy')
+
+    def test_different_if_none_match_returns_results(self):
+        self._render(_results)
+        response = self._render(_results, headers={'If-None-Match': '"an-older-version"'})
+        self.assertEqual(200, response.status_code, 'HTTP 200 should have been returned')
+
+    def test_jsonp_request_is_not_cached(self):
+        response = self._render(_results, path='/round/1?callback=showResults')
+        self.assertEqual('application/javascript', response.mimetype, 'JavaScript should have been returned')
+        self.assertTrue(response.get_data(as_text=True).startswith('showResults('), 'The JSON should have been padded with the callback')
+        self.assertEqual(0, self._cached_json_renderer.get_statistics()['versions'], 'The JSONP response should not have been cached')
+
+    def test_least_recently_used_version_is_forgotten(self):
+        versions = [dict(_results, round=round_number) for round_number in [1, 2, 3]]
+
+        for version in versions:
+            self._render(version)
+
+        self._render(versions[0])
+        self.assertEqual(4, self._renderer.invocation_count, 'The first version should have been rendered again')
+        self.assertEqual(2, self._cached_json_renderer.get_statistics()['versions'], 'Only two versions should have been kept')
+
+    def test_results_built_for_one_request_are_rendered_on_each_request_without_being_kept(self):
+        cached_results = dict(_results, round=1)
+        self._render(cached_results)
+
+        with _application.test_request_context('/rounds?numbers=1,2'):
+            first_response = self._cached_json_renderer({'rounds': [_results]}, cache=False)
+            second_response = self._cached_json_renderer({'rounds': [_results]}, cache=False)
+
+        self._render(cached_results)
+        statistics = self._cached_json_renderer.get_statistics()
+        self.assertEqual(3, self._renderer.invocation_count, 'The uncached results should have been rendered on each request')
+        self.assertEqual(first_response.get_etag(), second_response.get_etag(), 'Identical uncached results should have the same ETag')
+        self.assertEqual(1, statistics['versions'], 'Only the cached results should have been kept')
+        self.assertEqual(1, statistics['reuses'], 'The rendered version of the cached results should not have been evicted')
+        self.assertEqual(2, statistics['uncachedRenders'], 'Each render of the uncached results should have been counted')
+
+    def test_results_built_for_one_request_are_compressed_in_accepted_encoding(self):
+        with _application.test_request_context('/season?team=team-1', headers={'Accept-Encoding': 'gzip'}):
+            response = self._cached_json_renderer(_season_results, cache=False)
+
+        self.assertEqual('gzip', response.headers['Content-Encoding'], 'The gzip variant should have been returned')
+        self.assertDictEqual(_season_results, load_json(gzip.decompress(response.get_data())), 'The gzip variant should contain the results')
+
+    def test_gzip_variant_returned_when_accepted(self):
+        response = self._render(_season_results, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual('gzip', response.headers['Content-Encoding'], 'The gzip variant should have been returned')
+        self.assertEqual('Accept, Accept-Encoding', response.headers['Vary'], 'The response should vary by Accept and Accept-Encoding')
+        self.assertDictEqual(_season_results, load_json(gzip.decompress(response.get_data())), 'The gzip variant should contain the results')
+
+    @unittest.skipIf(brotli is None, 'Brotli is not installed')
+    def test_brotli_variant_preferred_when_accepted(self):
+        response = self._render(_season_results, headers={'Accept-Encoding': 'gzip, deflate, br'})
+        self.assertEqual('br', response.headers['Content-Encoding'], 'The brotli variant should have been returned')
+        self.assertDictEqual(_season_results, load_json(brotli.decompress(response.get_data())), 'The brotli variant should contain the results')
+
+    def test_uncompressed_body_returned_when_no_encoding_accepted(self):
+        response = self._render(_season_results)
+        self.assertNotIn('Content-Encoding', response.headers, 'The uncompressed body should have been returned')
+        self.assertEqual('Accept, Accept-Encoding', response.headers['Vary'], 'The response should vary by Accept and Accept-Encoding')
+
+    def test_variants_are_compressed_once(self):
+        self._render(_season_results, headers={'Accept-Encoding': 'gzip'})
+        self._render(_season_results, headers={'Accept-Encoding': 'gzip'})
+        self._render(_season_results)
+        self.assertEqual(1, self._renderer.invocation_count, 'The results should only have been rendered once')
+        self.assertDictEqual({'gzip': 2, 'identity': 1}, self._cached_json_renderer.get_statistics()['encodedResponses'], \
+            'The responses for each encoding should have been counted')
+
+    def test_each_variant_has_its_own_etag(self):
+        gzip_etag = self._render(_season_results, headers={'Accept-Encoding': 'gzip'}).get_etag()[0]
+        identity_etag = self._render(_season_results).get_etag()[0]
+        self.assertNotEqual(gzip_etag, identity_etag, 'Each variant should have its own ETag')
+
+        response = self._render(_season_results, headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"{0}"'.format(gzip_etag)})
+        self.assertEqual(304, response.status_code, 'HTTP 304 should have been returned for the gzip variant')
+
+    def test_small_results_are_not_compressed(self):
+        response = self._render({'round': 1}, headers={'Accept-Encoding': 'gzip, br'})
+        self.assertNotIn('Content-Encoding', response.headers, 'Compression should not have been used when it does not reduce the size')
+
+    def test_match_records_are_serialised(self):
+        response = self._render({'round': 1, 'results': [MatchRecord('Venue 1', 'Friday 13 April 2018, 7:30 PM', 'Team 1', 0, 'Team 2', 1)]})
+        expected_match = {'venue': 'Venue 1', 'timeOfMatch': 'Friday 13 April 2018, 7:30 PM', 'homeTeam': 'Team 1', 'homeScore': 0,
+                          'awayTeam': 'Team 2', 'awayScore': 1, 'result': 'Winner: Team 2'}
+        self.assertDictEqual(expected_match, load_json(response.get_data())['results'][0], 'The match record should have been serialised')
+
+    def test_compact_format_requested_by_query_parameter(self):
+        response = self._render(_season_results, path='/season?format=compact')
+        self.assertEqual('application/json', response.mimetype, 'JSON should have been returned')
+        self.assertEqual(json.dumps(_season_results, separators=(',', ':')), response.get_data(as_text=True), \
+            'The results should have been rendered without whitespace')
+        self.assertEqual(0, self._renderer.invocation_count, 'The pretty renderer should not have been used')
+
+    def test_compact_format_requested_by_accept_header(self):
+        response = self._render(_results, headers={'Accept': CachedJsonRenderer.compact_media_type})
+        self.assertEqual(json.dumps(_results, separators=(',', ':')), response.get_data(as_text=True), \
+            'The results should have been rendered without whitespace')
+
+    def test_pretty_format_is_default_for_browsers(self):
+        self._render(_results, headers={'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'})
+        self.assertEqual(1, self._renderer.invocation_count, 'The pretty renderer should have been used')
+
+    def test_each_format_is_rendered_once_with_its_own_etag(self):
+        pretty_etag = self._render(_season_results).get_etag()[0]
+        compact_etag = self._render(_season_results, path='/season?format=compact').get_etag()[0]
+        self._render(_season_results, path='/season?format=compact')
+        self._render(_season_results)
+
+        self.assertNotEqual(pretty_etag, compact_etag, 'Each format should have its own ETag')
+        statistics = self._cached_json_renderer.get_statistics()
+        self.assertEqual(2, statistics['renders'], 'Each format should only have been rendered once')
+        self.assertEqual(1, statistics['versions'], 'Both formats should have been kept with the same version')
+        self.assertDictEqual({'pretty': 2, 'compact': 2}, statistics['formatResponses'], 'The responses for each format should have been counted')
+
+    def test_compact_format_is_compressed(self):
+        response = self._render(_season_results, path='/season?format=compact', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual('gzip', response.headers['Content-Encoding'], 'The gzip variant should have been returned')
+        self.assertDictEqual(_season_results, load_json(gzip.decompress(response.get_data())), 'The gzip variant should contain the results')
+
+def load_json(body):
+    return json.loads(body.decode('utf-8'))
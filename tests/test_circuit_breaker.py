@@ -0,0 +1,82 @@
+import unittest
+
+from app.circuit_breaker import CircuitBreaker
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 1000.0
+
+    def __call__(self):
+        return self.current_time
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self._clock = MockClock()
+        self._circuit_breaker = CircuitBreaker(failure_rate_threshold=0.5, slow_call_milliseconds=1000, window_size=4, minimum_calls=4,
+                                               open_seconds=30, half_open_max_calls=1, clock=self._clock)
+
+    def _record(self, *outcomes):
+        # Each outcome is the elapsed milliseconds of a successful call, or None for a failed call
+        for outcome in outcomes:
+            self.assertTrue(self._circuit_breaker.allow_request(), 'The call should have been allowed')
+
+            if outcome is None:
+                self._circuit_breaker.record_failure()
+            else:
+                self._circuit_breaker.record_success(outcome)
+
+    def _open_circuit(self):
+        self._record(None, None, None, None)
+
+    def test_circuit_remains_closed_below_failure_rate(self):
+        self._record(100, None, 100, 100)
+        self.assertEqual(CircuitBreaker.closed_state, self._circuit_breaker.get_state(), 'The circuit breaker should have remained closed')
+
+    def test_circuit_does_not_open_before_minimum_calls(self):
+        self._record(None, None, None)
+        self.assertEqual(CircuitBreaker.closed_state, self._circuit_breaker.get_state(), 'Too few calls should have been made to open the circuit breaker')
+
+    def test_circuit_opens_at_failure_rate_and_rejects_calls(self):
+        self._record(100, None, 100, None)
+        self.assertEqual(CircuitBreaker.open_state, self._circuit_breaker.get_state(), 'The circuit breaker should have opened')
+        self.assertFalse(self._circuit_breaker.allow_request(), 'Calls should have been rejected while the circuit breaker is open')
+        self.assertEqual(1, self._circuit_breaker.get_statistics()['rejectedCalls'], 'The rejected call should have been counted')
+
+    def test_slow_calls_count_as_failures(self):
+        self._record(100, 1000, 100, 2500)
+        statistics = self._circuit_breaker.get_statistics()
+        self.assertEqual(CircuitBreaker.open_state, statistics['state'], 'The slow calls should have opened the circuit breaker')
+        self.assertEqual(2, statistics['slowCalls'], 'The slow calls should have been counted')
+
+    def test_circuit_becomes_half_open_after_open_interval(self):
+        self._open_circuit()
+        self._clock.current_time += 30
+        self.assertEqual(CircuitBreaker.half_open_state, self._circuit_breaker.get_state(), 'The circuit breaker should have become half-open')
+        self.assertTrue(self._circuit_breaker.allow_request(), 'A trial call should have been allowed')
+        self.assertFalse(self._circuit_breaker.allow_request(), 'Only one trial call should have been allowed at a time')
+
+    def test_successful_trial_closes_circuit(self):
+        self._open_circuit()
+        self._clock.current_time += 30
+        self._record(100)
+        self.assertEqual(CircuitBreaker.closed_state, self._circuit_breaker.get_state(), 'The successful trial should have closed the circuit breaker')
+        self.assertEqual(0, self._circuit_breaker.get_statistics()['windowCalls'], 'The calls made before opening should have been forgotten')
+
+    def test_failed_trial_opens_circuit_again(self):
+        self._open_circuit()
+        self._clock.current_time += 30
+        self._record(None)
+        statistics = self._circuit_breaker.get_statistics()
+        self.assertEqual(CircuitBreaker.open_state, statistics['state'], 'The failed trial should have opened the circuit breaker again')
+        self.assertEqual(2, statistics['timesOpened'], 'The circuit breaker should have been counted as opened twice')
+        self.assertEqual(30, statistics['secondsUntilHalfOpen'], 'The open interval should have started again')
+
+    def test_calls_finishing_while_open_are_ignored(self):
+        for _ in range(4):
+            self.assertTrue(self._circuit_breaker.allow_request(), 'The call should have been allowed')
+
+        for _ in range(4):
+            self._circuit_breaker.record_failure()
+
+        self._circuit_breaker.record_success(100)
+        self.assertEqual(CircuitBreaker.open_state, self._circuit_breaker.get_state(), 'A call finishing while open should not have closed the circuit breaker')
@@ -0,0 +1,62 @@
+import unittest
+
+from app.conditional_request_store import ConditionalRequestStore
+
+_url = 'http://getresults.com?round=1'
+
+class MockResponse():
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers if headers is not None else {}
+
+class TestConditionalRequestStore(unittest.TestCase):
+    def setUp(self):
+        self._store = ConditionalRequestStore(max_pages=2)
+
+    def _remember(self, url, response, result):
+        self._store.remember(url, response, self._store.get_digest(response), result)
+
+    def test_no_request_headers_for_page_not_fetched_before(self):
+        self.assertDictEqual({}, self._store.get_request_headers(_url), 'No conditional headers should have been returned')
+
+    def test_request_headers_contain_validators_of_remembered_page(self):
+        self._remember(_url, MockResponse(200, '<html/>', {'ETag': '"v1"', 'Last-Modified': 'Sat, 14 Apr 2018 06:00:00 GMT'}), {'round': 1})
+        expected_headers = {'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 14 Apr 2018 06:00:00 GMT'}
+        self.assertDictEqual(expected_headers, self._store.get_request_headers(_url), 'The validators should have been returned as conditional headers')
+
+    def test_not_modified_response_returns_remembered_result(self):
+        result = {'round': 1}
+        self._remember(_url, MockResponse(200, '<html/>', {'ETag': '"v1"'}), result)
+        self.assertIs(result, self._store.get_unchanged_result(_url, MockResponse(304, '')), 'The remembered result should have been returned')
+
+    def test_identical_content_returns_remembered_result(self):
+        result = {'round': 1}
+        self._remember(_url, MockResponse(200, '<html/>'), result)
+        response = MockResponse(200, b'<html/>')
+        self.assertIs(result, self._store.get_unchanged_result(_url, response, self._store.get_digest(response)), \
+            'The remembered result should have been returned for identical content')
+
+    def test_changed_content_returns_no_result(self):
+        self._remember(_url, MockResponse(200, '<html/>'), {'round': 1})
+        response = MockResponse(200, '<html><body/></html>')
+        self.assertIsNone(self._store.get_unchanged_result(_url, response, self._store.get_digest(response)), \
+            'No result should have been returned for changed content')
+
+    def test_error_response_returns_no_result(self):
+        self._remember(_url, MockResponse(200, '<html/>'), {'round': 1})
+        self.assertIsNone(self._store.get_unchanged_result(_url, MockResponse(500, '')), 'No result should have been returned for an error')
+
+    def test_restored_page_returns_result_for_not_modified_response(self):
+        result = {'round': 1}
+        self._store.restore(_url, '"v1"', None, 'digest', result)
+        self.assertDictEqual({'If-None-Match': '"v1"'}, self._store.get_request_headers(_url), 'The restored validator should have been returned')
+        self.assertIs(result, self._store.get_unchanged_result(_url, MockResponse(304, '')), 'The restored result should have been returned')
+        self.assertEqual(0, self._store.get_statistics()['changedContentResponses'], 'Restoring a page should not have been counted as a response')
+
+    def test_least_recently_used_page_is_forgotten(self):
+        for round_number in 1, 2, 3:
+            self._remember('http://getresults.com?round={0}'.format(round_number), MockResponse(200, '<html/>', {'ETag': '"v1"'}), {})
+
+        self.assertDictEqual({}, self._store.get_request_headers('http://getresults.com?round=1'), 'The first page should have been forgotten')
+        self.assertEqual(2, self._store.get_statistics()['pages'], 'Only two pages should have been remembered')
@@ -1,18 +1,39 @@
 import json
 import os
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 
+import requests
+
+from app.circuit_breaker import CircuitOpenError
+from app.conditional_request_store import ConditionalRequestStore
 from app.football_results_parser import FootballResultsParser
+from app.match_record import to_serializable
+from app.results_store import PersistedPage
+from app.single_flight import SingleFlight, SingleFlightTimeoutError
 from app.inversion_of_control import features
 
 _test_path = os.path.join(os.path.dirname(__file__), 'test_data/test_football_results_parser')
 _full_season_url = 'http://getresults.com' # Properly formatted HTML with valid data
+_season_without_round_names_file = 'test_football_results_for_season.html'
+_season_with_round_names_file = 'test_football_results_for_season_with_round_names.html'
+
+# The season page returned by the mocked requests can be switched by tests, and every URL requested is recorded
+_season_html_file = _season_without_round_names_file
+_requested_urls = []
+_conditional_request_store = ConditionalRequestStore()
+
+def set_season_html_file(season_html_file):
+    global _season_html_file
+    _season_html_file = season_html_file
 
 class MockResponse():
-    def __init__(self, status_code, content, url):
+    def __init__(self, status_code, content, url, headers=None):
         self.status_code = status_code
         self.content = content
         self.url = url
+        self.headers = headers if headers is not None else {}
 
 class MockHttpFootballRequests():
     _round1_url = 'http://getresults.com?round=1' # Properly formatted HTML with valid data
@@ -25,13 +46,35 @@ class MockHttpFootballRequests():
     _round8_url = 'http://getresults.com?round=8' # Properly formatted HTML with invalid data - number of teams < number of match times * 2
     _round9_url = 'http://getresults.com?round=9' # Properly formatted HTML with invalid data - missing score for a home team
     _round10_url = 'http://getresults.com?round=10' # Properly formatted HTML with invalid data - missing score for an away team
+    _round11_url = 'http://getresults.com?round=11' # Properly formatted HTML with valid data, supporting conditional requests
+    _round11_etag = '"round11-version1"'
+    _round12_url = 'http://getresults.com?round=12' # Connection to the server fails
+    _round13_url = 'http://getresults.com?round=13' # Request is not sent, as the circuit breaker is open
+    _round14_url = 'http://getresults.com?round=14' # Waiting for a request for the same page to complete times out
     _non_existent_round_url = 'http://getresults.com?round=9999' # Page does not exist
 
     def __init__(self):
         pass
 
-    def get(self, url):
+    def get(self, url, headers=None):
         http_status_code = 200
+        _requested_urls.append(url)
+
+        if url == self._round12_url:
+            raise requests.exceptions.ConnectionError('Connection refused')
+
+        if url == self._round13_url:
+            raise CircuitOpenError('Requests to {0} are not being sent while the circuit breaker is open'.format(url))
+
+        if url == self._round14_url:
+            raise SingleFlightTimeoutError('Timed out after 30 seconds waiting for {0}'.format(url))
+
+        if url == self._round11_url:
+            if headers is not None and headers.get('If-None-Match') == self._round11_etag:
+                return MockResponse(304, '', url, {'ETag': self._round11_etag})
+
+            with open(file=os.path.join(_test_path, 'test_football_results_round1.html'), mode='r') as f:
+                return MockResponse(http_status_code, f.read(), url, {'ETag': self._round11_etag})
 
         if url == self._round1_url:
             html_file = os.path.join(_test_path, 'test_football_results_round1.html')
@@ -54,7 +97,7 @@ class MockHttpFootballRequests():
         elif url == self._round10_url:
             html_file = os.path.join(_test_path, 'test_football_results_with_a_missing_away_score.html')
         elif url == _full_season_url:
-            html_file = os.path.join(_test_path, 'test_football_results_for_season.html')
+            html_file = os.path.join(_test_path, _season_html_file)
         else:
             http_status_code = 404
             html_file = os.path.join(_test_path, 'file_not_found.html')
@@ -64,7 +107,64 @@ class MockHttpFootballRequests():
         with open(file=html_file, mode='r') as f:
             return MockResponse(http_status_code, f.read(), url)
 
+class MockResultsCache():
+    # Always invokes the loader, so that every test exercises the parsing of the mocked HTTP response
+    def __init__(self):
+        self.ttls = {}
+        self.restore_enabled = False
+
+    def get(self, key, loader, restore=None):
+        # Restoring is only exercised by the tests that enable it
+        restored = restore() if self.restore_enabled and restore is not None else None
+        return restored[0] if restored is not None else loader()
+
+    def refresh(self, key, loader):
+        return loader()
+
+    def get_keys(self):
+        return []
+
+    def get_age_seconds(self, key):
+        return None
+
+    def set_ttl(self, key, ttl_seconds):
+        self.ttls[key] = ttl_seconds
+
+class MockResultsStore():
+    def __init__(self):
+        self.pages = {}
+
+    def load(self, url):
+        return self.pages.get(url)
+
+    def save(self, url, etag, last_modified, digest, document):
+        # Documents are converted to JSON as the real store does, so that they are persisted by value
+        self.pages[url] = PersistedPage(url, 1000, etag, last_modified, digest, json.loads(json.dumps(document)))
+
+    def touch(self, url):
+        self.pages[url] = self.pages[url]._replace(fetched_at=2000)
+
+    def get_age_seconds(self, persisted_page):
+        return 2000 - persisted_page.fetched_at
+
+class MockMetrics():
+    def __init__(self):
+        self.parses = []
+
+    def observe_parse(self, page, elapsed_seconds, number_of_matches=None):
+        self.parses.append((page, number_of_matches))
+
+_results_cache = MockResultsCache()
+_results_store = MockResultsStore()
+_metrics = MockMetrics()
+
+class StreamingFootballResultsParser(FootballResultsParser):
+    # Overrides the injected extractor mode, so that the same tests can be run against the streaming extractor
+    _html_extractor_mode = 'streaming'
+
 class TestFootballResults(unittest.TestCase):
+    _parser_class = FootballResultsParser
+
     def setUp(self):
         # Allow the dependencies to be replaced so as not to affect unit tests in other test classes
         features.allowReplace = True
@@ -75,6 +175,24 @@ class TestFootballResults(unittest.TestCase):
         features.Provide('XpathGetScores', '//div[@class="score"]/text()')
         features.Provide('XpathGetMatchTimes', '//div[@class="matchtime"]/text()')
         features.Provide('XpathGetVenues', '//div[@class="venuename"]/text()')
+        features.Provide('XpathGetRoundNames', '//div[@class="roundname"]/text()')
+        features.Provide('HtmlExtractorMode', 'tree')
+        features.Provide('ResultsCache', _results_cache)
+        _results_cache.ttls = {}
+        _results_cache.restore_enabled = False
+        features.Provide('ResultsStore', _results_store)
+        _results_store.pages = {}
+        features.Provide('ConditionalRequestStore', _conditional_request_store)
+        features.Provide('SingleFlight', SingleFlight())
+        features.Provide('RoundFetchExecutor', ThreadPoolExecutor(max_workers=4))
+        features.Provide('Metrics', _metrics)
+        del _metrics.parses[:]
+        features.Provide('MaxRoundNumber', 9999)
+        _conditional_request_store.clear()
+        del _requested_urls[:]
+
+    def tearDown(self):
+        set_season_html_file(_season_without_round_names_file)
 
     def _compare_expected_and_actual_round_results(self, round_number, expecting_error_output=False):
         # When comparing dictionaries, allow unit tests to display entire contents
@@ -95,14 +213,183 @@ class TestFootballResults(unittest.TestCase):
         # will report 'ResurceWarning: unclosed file'
         with open(file=expected_data_file, mode='r') as file_reader:
             expected_data = json.load(file_reader)
-            football_results_parser = FootballResultsParser()
+            football_results_parser = self._parser_class()
             actual_data = football_results_parser.get_scores_for_round(round_number)
 
             self.assertIsNotNone(actual_data, 'An instantiated object should have been returned')
             self.assertIsInstance(actual_data, dict, 'A dictionary object should have been returned')
-            self.assertDictEqual(expected_data, actual_data, 'The retrieved dictionary does not match with expected dictionary')
+            self.assertDictEqual(expected_data, to_serializable(actual_data), 'The retrieved dictionary does not match with expected dictionary')
 
     def test_get_scores_for_season(self):
+        self._compare_expected_and_actual_season_results()
+
+    def test_get_scores_for_season_with_round_names(self):
+        set_season_html_file(_season_with_round_names_file)
+        self._compare_expected_and_actual_season_results()
+
+    def test_get_scores_for_round_served_from_season_page_with_round_names(self):
+        set_season_html_file(_season_with_round_names_file)
+        self._compare_expected_and_actual_round_results(1)
+        self._compare_expected_and_actual_round_results(2)
+        self.assertListEqual([_full_season_url, _full_season_url], _requested_urls, 'Only the season page should have been requested')
+
+    def test_get_scores_for_round_not_on_season_page_with_round_names(self):
+        set_season_html_file(_season_with_round_names_file)
+        self._compare_expected_and_actual_round_results(9999)
+        self.assertListEqual([_full_season_url, 'http://getresults.com?round=9999'], _requested_urls, \
+            'The page for the round should have been requested, as the round is not on the season page')
+
+    def test_get_scores_for_round_fetches_round_page_when_season_page_has_no_round_names(self):
+        self._compare_expected_and_actual_round_results(1)
+        self.assertListEqual([_full_season_url, 'http://getresults.com?round=1'], _requested_urls, \
+            'The page for the round should have been requested, as the season page does not identify rounds')
+
+    def test_get_scores_for_invalid_round_is_rejected_without_requesting_round_page(self):
+        parser = self._parser_class()
+
+        for round_number, invalid_round_specified in ('10000', 10000), ('0', 0), ('-1', -1), ('first', 'first'):
+            expected_results = {'invalidRoundSpecified': invalid_round_specified, 'errorMessage': 'Rounds are numbered from 1 to 9999'}
+            self.assertDictEqual(expected_results, parser.get_scores_for_round(round_number), \
+                'Round "{0}" should have been rejected'.format(round_number))
+
+        self.assertNotIn('http://getresults.com?round=10000', _requested_urls, 'No round page should have been requested')
+        self.assertTrue(all(url == _full_season_url for url in _requested_urls), 'Only the season page should have been requested')
+
+    def test_get_scores_for_rounds_rejects_invalid_round_without_requesting_round_page(self):
+        rounds_results = self._parser_class().get_scores_for_rounds([10000, 1])
+        self.assertEqual(10000, rounds_results[0]['invalidRoundSpecified'], 'Round 10000 should have been rejected')
+        self.assertIn('results', rounds_results[1], 'The results for round 1 should still have been returned')
+        self.assertNotIn('http://getresults.com?round=10000', _requested_urls, 'The page for round 10000 should not have been requested')
+
+    def test_get_scores_for_team_served_from_season_page(self):
+        team_results = self._parser_class().get_scores_for_team('team-1')
+        self.assertEqual('Team 1', team_results['team'], 'The name of the team should have been returned as it appears on the season page')
+        self.assertEqual(2, len(team_results['results']), 'The two matches of the team should have been returned')
+        self.assertListEqual([_full_season_url], _requested_urls, 'Only the season page should have been requested')
+
+    def test_get_scores_for_venue_served_from_season_page(self):
+        venue_results = self._parser_class().get_scores_for_venue('VENUE 3')
+        self.assertEqual('Venue 3', venue_results['venue'], 'The name of the venue should have been returned as it appears on the season page')
+        self.assertEqual(1, len(venue_results['results']), 'The match played at the venue should have been returned')
+
+    def test_get_scores_for_unknown_team_returns_none(self):
+        self.assertIsNone(self._parser_class().get_scores_for_team('Team 99'), 'No results should have been returned for an unknown team')
+
+    def test_get_scores_for_rounds_fetches_rounds_not_on_season_page(self):
+        set_season_html_file(_season_with_round_names_file)
+        parser = self._parser_class()
+
+        with open(file=os.path.join(_test_path, 'expected_parsing_error_round3.json'), mode='r') as file_reader:
+            expected_rounds_results = [parser.get_scores_for_round(2), json.load(file_reader), parser.get_scores_for_round(1)]
+
+        del _requested_urls[:]
+        rounds_results = parser.get_scores_for_rounds([2, 3, 1])
+        self.assertListEqual(to_serializable(expected_rounds_results), to_serializable(rounds_results), \
+            'The results for each round should have been returned in the order requested')
+        self.assertListEqual([_full_season_url, 'http://getresults.com?round=3'], _requested_urls, \
+            'Only the page for round 3 should have been requested, as the other rounds are on the season page')
+
+    def test_get_scores_for_rounds_reports_failed_request_for_round(self):
+        rounds_results = self._parser_class().get_scores_for_rounds([12, 1])
+        expected_round12_results = {'round': 12, 'urlInvoked': 'http://getresults.com?round=12', 'errorMessage': 'Unable to obtain results: Connection refused'}
+        self.assertDictEqual(expected_round12_results, rounds_results[0], 'The failure to obtain round 12 should have been reported')
+        self.assertIn('results', rounds_results[1], 'The results for round 1 should still have been returned')
+
+    def test_get_scores_for_round_reports_request_not_sent_while_circuit_is_open(self):
+        expected_round13_results = {'round': 13, 'urlInvoked': 'http://getresults.com?round=13',
+                                    'errorMessage': 'Unable to obtain results: Requests to http://getresults.com?round=13 are not being sent while the circuit breaker is open'}
+        self.assertDictEqual(expected_round13_results, self._parser_class().get_scores_for_round(13), \
+            'The request that was not sent should have been reported rather than raised')
+
+    def test_get_scores_for_round_reports_timeout_waiting_for_request_for_same_page(self):
+        expected_round14_results = {'round': 14, 'urlInvoked': 'http://getresults.com?round=14',
+                                    'errorMessage': 'Unable to obtain results: Timed out after 30 seconds waiting for http://getresults.com?round=14'}
+        self.assertDictEqual(expected_round14_results, self._parser_class().get_scores_for_round(14), \
+            'The timeout should have been reported rather than raised')
+
+    def test_fetched_results_are_persisted(self):
+        set_season_html_file(_season_with_round_names_file)
+        parser = self._parser_class()
+        snapshot = parser.get_season_snapshot()
+        round_results = parser.get_scores_for_round(3)
+
+        self.assertDictEqual(snapshot.to_document(), _results_store.load(_full_season_url).document, 'The season snapshot should have been persisted')
+        self.assertDictEqual(to_serializable(round_results), _results_store.load('http://getresults.com?round=3').document, 'The results for round 3 should have been persisted')
+
+    def test_persisted_results_are_restored_without_fetching_page(self):
+        set_season_html_file(_season_with_round_names_file)
+        parser = self._parser_class()
+        expected_season_results = parser.get_scores_for_season()
+        expected_round_results = parser.get_scores_for_round(3)
+
+        _results_cache.restore_enabled = True
+        _conditional_request_store.clear()
+        del _requested_urls[:]
+
+        self.assertDictEqual(to_serializable(expected_season_results), to_serializable(parser.get_scores_for_season()), 'The persisted season results should have been restored')
+        self.assertDictEqual(to_serializable(expected_round_results), to_serializable(parser.get_scores_for_round(3)), 'The persisted results for round 3 should have been restored')
+        self.assertListEqual([], _requested_urls, 'No pages should have been requested')
+
+    def test_refresh_of_restored_page_with_identical_content_is_not_parsed(self):
+        set_season_html_file(_season_with_round_names_file)
+        parser = self._parser_class()
+        parser.get_season_snapshot()
+
+        _results_cache.restore_enabled = True
+        _conditional_request_store.clear()
+        identical_content_responses = _conditional_request_store.get_statistics()['identicalContentResponses']
+        restored_snapshot = parser.get_season_snapshot()
+
+        self.assertIs(restored_snapshot, parser.refresh_season(), 'The restored snapshot should have been reused')
+        self.assertEqual(identical_content_responses + 1, _conditional_request_store.get_statistics()['identicalContentResponses'], \
+            'The refreshed page should have been identified as identical to the restored page')
+        self.assertEqual(2000, _results_store.load(_full_season_url).fetched_at, 'The fetch time of the persisted page should have been updated')
+
+    def test_set_refresh_intervals_sets_ttl_of_cached_results(self):
+        parser = self._parser_class()
+        parser.set_season_refresh_interval(None)
+        parser.set_round_refresh_interval(30, 60)
+        self.assertDictEqual({'season': None, '30': 60}, _results_cache.ttls, 'The TTLs of the cached season and round should have been set')
+
+    def test_refresh_round_on_season_page_refreshes_season_page(self):
+        set_season_html_file(_season_with_round_names_file)
+        round_results = self._parser_class().refresh_round(2)
+        self.assertEqual(2, round_results['round'], 'The results for round 2 should have been returned')
+        self.assertNotIn('http://getresults.com?round=2', _requested_urls, 'The page for round 2 should not have been requested')
+
+    def test_refresh_round_not_on_season_page_refreshes_round_page(self):
+        round_results = self._parser_class().refresh_round(2)
+        self.assertEqual(2, round_results['round'], 'The results for round 2 should have been returned')
+        self.assertIn('http://getresults.com?round=2', _requested_urls, 'The page for round 2 should have been requested')
+
+    def test_unchanged_page_content_is_not_parsed_again(self):
+        football_results_parser = self._parser_class()
+        identical_content_responses = _conditional_request_store.get_statistics()['identicalContentResponses']
+
+        with patch.object(football_results_parser, '_extract_page', wraps=football_results_parser._extract_page) as mock_extract_page:
+            first_results = football_results_parser.get_scores_for_round(2)
+            second_results = football_results_parser.get_scores_for_round(2)
+
+        self.assertIs(first_results, second_results, 'The results parsed from the first response should have been reused')
+        # The season page (which does not identify rounds) and the page for the round should each have been parsed once
+        self.assertEqual(2, mock_extract_page.call_count, 'Each page should only have been parsed once')
+        self.assertEqual(identical_content_responses + 2, _conditional_request_store.get_statistics()['identicalContentResponses'], \
+            'The second responses for the season and the round should have been identified as having identical content')
+
+    def test_not_modified_page_is_not_parsed_again(self):
+        football_results_parser = self._parser_class()
+        not_modified_responses = _conditional_request_store.get_statistics()['notModifiedResponses']
+
+        with patch.object(football_results_parser, '_extract_page', wraps=football_results_parser._extract_page) as mock_extract_page:
+            first_results = football_results_parser.get_scores_for_round(11)
+            second_results = football_results_parser.get_scores_for_round(11)
+
+        self.assertIs(first_results, second_results, 'The results parsed from the first response should have been reused')
+        self.assertEqual(2, mock_extract_page.call_count, 'The season page and the page for the round should each have been parsed once')
+        self.assertEqual(not_modified_responses + 1, _conditional_request_store.get_statistics()['notModifiedResponses'], \
+            'The second response should have been HTTP 304')
+
+    def _compare_expected_and_actual_season_results(self):
         # When comparing dictionaries, allow unit tests to display entire contents
         self.maxDiff = None
 
@@ -112,12 +399,19 @@ class TestFootballResults(unittest.TestCase):
         # will report 'ResurceWarning: unclosed file'
         with open(file=expected_data_file, mode='r') as file_reader:
             expected_data = json.load(file_reader)
-            football_results_parser = FootballResultsParser()
+            football_results_parser = self._parser_class()
             actual_data = football_results_parser.get_scores_for_season()
 
             self.assertIsNotNone(actual_data, 'An instantiated object should have been returned')
             self.assertIsInstance(actual_data, dict, 'A dictionary object should have been returned')
-            self.assertDictEqual(expected_data, actual_data, 'The retrieved dictionary does not match with expected dictionary')
+            self.assertDictEqual(expected_data, to_serializable(actual_data), 'The retrieved dictionary does not match with expected dictionary')
+
+    def test_parse_of_each_page_is_observed_with_its_number_of_matches(self):
+        parser = self._parser_class()
+        parser.get_scores_for_season()
+        parser.get_scores_for_round(3)
+        self.assertListEqual([('season', 6), ('round', None)], _metrics.parses, \
+            'The parse of the season page and of the page for the round (which could not be parsed) should have been observed')
 
     def test_get_scores_for_round_1(self):
         self._compare_expected_and_actual_round_results(1)
@@ -151,3 +445,14 @@ class TestFootballResults(unittest.TestCase):
 
     def test_get_scores_when_an_away_team_has_non_integer_score_value(self):
         self._compare_expected_and_actual_round_results(round_number=10, expecting_error_output=False)
+
+class TestFootballResultsWithStreamingExtractor(TestFootballResults):
+    _parser_class = StreamingFootballResultsParser
+
+    def test_streaming_extractor_is_used(self):
+        football_results_parser = self._parser_class()
+
+        with patch('app.football_results_parser.html.fromstring') as mock_fromstring:
+            football_results_parser.get_scores_for_round(1)
+
+        self.assertEqual(0, mock_fromstring.call_count, 'The full tree should not have been built')
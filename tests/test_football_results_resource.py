@@ -1,26 +1,75 @@
 import json
 import unittest
+from datetime import timedelta, timezone
 
-from app.football_results_resource import (FootballRoundResultsResource,
-                                           FootballSeasonResultsResource)
+from flask import Flask
+from werkzeug.exceptions import BadRequest, NotFound
+
+from app.football_results_resource import (FootballLeagueTableResource,
+                                           FootballMultipleRoundResultsResource,
+                                           FootballRoundResultsResource,
+                                           FootballSeasonResultsResource,
+                                           FootballTeamResultsResource,
+                                           FootballVenueResultsResource,
+                                           MetricsResource)
 from app.inversion_of_control import features
 
 _expected_json_for_season_results = '{"roundNumber": "All", "methodCalled": "get_scores_for_season"}'
 _expected_json_for_round_results = '{"roundNumber": ROUND_NUMBER, "methodCalled": "get_scores_for_round"}'
 
 class MockFootballResultsParser():
+    # Details returned instead of the season results when set, as when the season page could not be parsed
+    season_error = None
+
     def __init__(self):
         pass
 
     def get_scores_for_round(self, round_number):
         return json.loads(_expected_json_for_round_results.replace('ROUND_NUMBER', str(round_number)))
 
+    def get_scores_for_rounds(self, round_numbers):
+        return [self.get_scores_for_round(round_number) for round_number in round_numbers]
+
     def get_scores_for_season(self):
-        return json.loads(_expected_json_for_season_results)
+        if MockFootballResultsParser.season_error is not None:
+            return MockFootballResultsParser.season_error
+
+        return dict(json.loads(_expected_json_for_season_results), results=[])
+
+    def query_season(self, season_query, current_time):
+        return {'team': season_query.team, 'limit': season_query.limit, 'utcOffsetHours': current_time.utcoffset() / timedelta(hours=1)}
+
+    def get_scores_for_team(self, team_name):
+        return {'team': team_name, 'results': []} if team_name == 'Team 1' else None
+
+    def get_scores_for_venue(self, venue_name):
+        return {'venue': venue_name, 'results': []} if venue_name == 'Venue 1' else None
+
+class MockLeagueTable():
+    def get_table(self, season_results):
+        return {'table': [], 'methodCalledWith': season_results['methodCalled']}
 
-def mock_pretty_json_renderer(dictionary):
+class MockMetrics():
+    def render(self):
+        return '# TYPE football_results_requests_in_progress gauge\n'
+
+    def get_content_type(self):
+        return 'text/plain; version=0.0.4; charset=utf-8'
+
+# Single instances are used, as resources keep the instances injected into them
+_league_table = MockLeagueTable()
+_metrics = MockMetrics()
+
+# Whether each rendered dictionary was to be kept once rendered
+_rendered_cache_flags = []
+
+def mock_pretty_json_renderer(dictionary, cache=True):
+    _rendered_cache_flags.append(cache)
     return dictionary
 
+# Application used for creating the request contexts that supply query string parameters to resources
+_application = Flask(__name__)
+
 class TestFootballResultsResource(unittest.TestCase):
     def setUp(self):
         # Allow the dependencies to be replaced so as not to affect unit tests in other test classes
@@ -28,13 +77,34 @@ class TestFootballResultsResource(unittest.TestCase):
         features.Provide('FootballSeasonResultsParser', MockFootballResultsParser)
         features.Provide('FootballRoundResultsParser', MockFootballResultsParser)
         features.Provide('PrettyJson', lambda: mock_pretty_json_renderer)
+        features.Provide('LeagueTable', _league_table)
+        features.Provide('MatchTimezone', timezone(timedelta(hours=10)))
+        features.Provide('Metrics', _metrics)
+        MockFootballResultsParser.season_error = None
+
+    def _get_season_results(self, query_string=''):
+        with _application.test_request_context('/season?' + query_string):
+            return FootballSeasonResultsResource().get()
 
     def test_get_season_results(self):
-        resource = FootballSeasonResultsResource()
-        expected_dict = json.loads(_expected_json_for_season_results)
-        get_result = resource.get()
+        expected_dict = dict(json.loads(_expected_json_for_season_results), results=[])
+        get_result = self._get_season_results()
         self.assertDictEqual(expected_dict, get_result, 'JSON returned by get method of FootballSeasonResultsResource is incorrect')
 
+    def test_get_filtered_season_results(self):
+        expected_dict = {'team': 'team-1', 'limit': 20, 'utcOffsetHours': 10}
+        self.assertDictEqual(expected_dict, self._get_season_results('team=team-1&limit=20'), \
+            'The season should have been queried at the current time in the timezone of the matches')
+
+    def test_get_filtered_season_results_rejects_invalid_parameters(self):
+        for query_string in ['from=13/04/2018', 'from=2018-05-01&to=2018-04-01', 'fromRound=one', 'status=abandoned', 'limit=0', 'cursor=invalid']:
+            with self.assertRaises(BadRequest, msg='The parameters "{0}" should have been rejected'.format(query_string)):
+                self._get_season_results(query_string)
+
+    def test_season_results_returned_for_unrelated_parameters(self):
+        expected_dict = dict(json.loads(_expected_json_for_season_results), results=[])
+        self.assertDictEqual(expected_dict, self._get_season_results('format=compact'), 'The full season results should have been returned')
+
     def test_get_round_results(self):
         resource = FootballRoundResultsResource()
         round_number = 1
@@ -47,3 +117,56 @@ class TestFootballResultsResource(unittest.TestCase):
                 'JSON returned by get method of FootballRoundResultsResource for round {0} is incorrect'.format(round_number))
 
             round_number += 1
+
+    def _get_multiple_round_results(self, query_string):
+        with _application.test_request_context('/rounds?' + query_string):
+            return FootballMultipleRoundResultsResource().get()
+
+    def test_get_multiple_round_results_for_list_of_rounds(self):
+        round_numbers = [result['roundNumber'] for result in self._get_multiple_round_results('numbers=1,4,7')['rounds']]
+        self.assertListEqual([1, 4, 7], round_numbers, 'The results for rounds 1, 4 and 7 should have been returned')
+
+    def test_get_multiple_round_results_for_range_of_rounds(self):
+        round_numbers = [result['roundNumber'] for result in self._get_multiple_round_results('from=2&to=5')['rounds']]
+        self.assertListEqual([2, 3, 4, 5], round_numbers, 'The results for rounds 2 to 5 should have been returned')
+
+    def test_get_multiple_round_results_rejects_invalid_rounds(self):
+        for query_string in ['', 'numbers=1,two', 'from=1', 'from=5&to=1', 'from=1&to=100', 'from=1&to=20000000000']:
+            with self.assertRaises(BadRequest, msg='The rounds specified by "{0}" should have been rejected'.format(query_string)):
+                self._get_multiple_round_results(query_string)
+
+    def test_only_results_that_outlive_the_request_are_kept_once_rendered(self):
+        del _rendered_cache_flags[:]
+        self._get_season_results()
+        self._get_season_results('team=team-1&limit=20')
+        self._get_multiple_round_results('numbers=1,4,7')
+        self.assertListEqual([True, False, False], _rendered_cache_flags, \
+            'Only the season results should have been kept, as queries and multiple rounds are built for each request')
+
+    def test_get_league_table_for_season_results(self):
+        expected_dict = {'table': [], 'methodCalledWith': 'get_scores_for_season'}
+        self.assertDictEqual(expected_dict, FootballLeagueTableResource().get(), 'The table for the season results should have been returned')
+
+    def test_get_league_table_returns_details_of_season_page_that_could_not_be_parsed(self):
+        MockFootballResultsParser.season_error = {'urlInvoked': 'http://season.com', 'errorMessage': 'Unexpected error'}
+        self.assertDictEqual(MockFootballResultsParser.season_error, FootballLeagueTableResource().get(), \
+            'The details of the season page should have been returned')
+
+    def test_get_team_results(self):
+        self.assertDictEqual({'team': 'Team 1', 'results': []}, FootballTeamResultsResource().get('Team 1'), 'The results for the team should have been returned')
+
+    def test_get_results_for_unknown_team_returns_not_found(self):
+        with self.assertRaises(NotFound, msg='HTTP 404 should have been returned for an unknown team'):
+            FootballTeamResultsResource().get('Team 99')
+
+    def test_get_venue_results(self):
+        self.assertDictEqual({'venue': 'Venue 1', 'results': []}, FootballVenueResultsResource().get('Venue 1'), 'The results for the venue should have been returned')
+
+    def test_get_results_for_unknown_venue_returns_not_found(self):
+        with self.assertRaises(NotFound, msg='HTTP 404 should have been returned for an unknown venue'):
+            FootballVenueResultsResource().get('Venue 99')
+
+    def test_get_metrics_returns_rendered_metrics_as_text(self):
+        response = MetricsResource().get()
+        self.assertEqual('text/plain; version=0.0.4; charset=utf-8', response.content_type, 'The metrics should have been returned in the text format')
+        self.assertEqual(b'# TYPE football_results_requests_in_progress gauge\n', response.get_data(), 'The rendered metrics should have been returned')
@@ -0,0 +1,139 @@
+import threading
+import unittest
+
+from app.inversion_of_control import (FeatureBroker, HasMethods, PerRequest,
+                                      PerThread, RequiredFeature, Singleton,
+                                      Transient, features)
+
+class Counter():
+    # Counts the instances built, so that tests can tell when a feature was built again
+    instances_built = 0
+
+    def __init__(self, name='counter'):
+        Counter.instances_built += 1
+        self.name = name
+
+    def increment(self):
+        pass
+
+class Consumer():
+    _singleton = RequiredFeature('TestSingletonCounter', HasMethods('increment'))
+    _per_thread = RequiredFeature('TestPerThreadCounter', HasMethods('increment'))
+    _legacy = RequiredFeature('TestLegacyCounter', HasMethods('increment'))
+
+class TestFeatureBroker(unittest.TestCase):
+    def setUp(self):
+        self._broker = FeatureBroker()
+        Counter.instances_built = 0
+
+    def test_callable_provider_is_called_on_every_lookup(self):
+        self._broker.Provide('Counter', Counter, name='legacy')
+        self.assertIsNot(self._broker['Counter'], self._broker['Counter'], 'A new instance should have been built for each lookup')
+        self.assertEqual('legacy', self._broker['Counter'].name, 'The arguments should have been supplied to the provider')
+
+    def test_singleton_is_built_once_across_threads(self):
+        self._broker.ProvideScoped('Counter', Singleton, Counter)
+        instances = []
+        threads = [threading.Thread(target=lambda: instances.append(self._broker['Counter'])) for _ in range(8)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, Counter.instances_built, 'The singleton should only have been built once')
+        self.assertTrue(all(instance is instances[0] for instance in instances), 'Every thread should have received the same instance')
+
+    def test_singleton_is_not_built_until_used(self):
+        self._broker.ProvideScoped('Counter', Singleton, Counter)
+        self.assertEqual(0, Counter.instances_built, 'The singleton should not have been built when provided')
+
+    def test_refreshed_singleton_is_built_again(self):
+        self._broker.ProvideScoped('Counter', Singleton, Counter)
+        first_instance = self._broker['Counter']
+        self._broker.Refresh('Counter')
+        self.assertIsNot(first_instance, self._broker['Counter'], 'The singleton should have been built again after being refreshed')
+
+    def test_per_thread_feature_is_built_for_each_thread(self):
+        self._broker.ProvideScoped('Counter', PerThread, Counter)
+        main_thread_instance = self._broker['Counter']
+        other_thread_instances = []
+        thread = threading.Thread(target=lambda: other_thread_instances.extend([self._broker['Counter'], self._broker['Counter']]))
+        thread.start()
+        thread.join()
+
+        self.assertIs(main_thread_instance, self._broker['Counter'], 'The same instance should have been returned within a thread')
+        self.assertIs(other_thread_instances[0], other_thread_instances[1], 'The same instance should have been returned within the other thread')
+        self.assertIsNot(main_thread_instance, other_thread_instances[0], 'Each thread should have received its own instance')
+
+    def test_per_request_feature_is_built_for_each_request(self):
+        self._broker.ProvideScoped('Counter', PerRequest, Counter)
+        self._broker.BeginRequest()
+        first_request_instance = self._broker['Counter']
+        self.assertIs(first_request_instance, self._broker['Counter'], 'The same instance should have been returned within a request')
+        self._broker.EndRequest()
+
+        self._broker.BeginRequest()
+        self.assertIsNot(first_request_instance, self._broker['Counter'], 'A new instance should have been built for the next request')
+        self._broker.EndRequest()
+
+    def test_per_request_feature_cannot_be_used_outside_request(self):
+        self._broker.ProvideScoped('Counter', PerRequest, Counter)
+
+        with self.assertRaises(AssertionError):
+            self._broker['Counter']
+
+    def test_transient_feature_is_built_every_time(self):
+        self._broker.ProvideScoped('Counter', Transient, Counter)
+        self._broker['Counter']
+        self._broker['Counter']
+        self.assertEqual(2, Counter.instances_built, 'The feature should have been built for each lookup')
+
+    def test_unknown_lifetime_is_rejected(self):
+        with self.assertRaises(AssertionError):
+            self._broker.ProvideScoped('Counter', 'forever', Counter)
+
+    def test_resolution_report_records_builds(self):
+        self._broker.ProvideScoped('Counter', Singleton, Counter)
+        self._broker.Provide('LegacyCounter', Counter)
+        self._broker.Provide('Value', 'not built')
+
+        for _ in range(3):
+            self._broker['Counter']
+            self._broker['LegacyCounter']
+            self._broker['Value']
+
+        report = self._broker.GetResolutionReport()
+        self.assertListEqual(['Counter', 'LegacyCounter'], sorted(report), 'Only the features with a callable provider should have been reported')
+        self.assertEqual(1, report['Counter']['builds'], 'The singleton should have been built once')
+        self.assertEqual(Singleton, report['Counter']['lifetime'], 'The lifetime of the singleton should have been reported')
+        self.assertEqual(3, report['LegacyCounter']['builds'], 'The feature provided without a lifetime should have been built for each lookup')
+        self.assertGreaterEqual(report['Counter']['totalMilliseconds'], report['Counter']['maxMilliseconds'], \
+            'The total time should have included the longest build')
+
+class TestRequiredFeature(unittest.TestCase):
+    def setUp(self):
+        # Allow the dependencies to be replaced so as not to affect unit tests in other test classes
+        features.allowReplace = True
+        features.ProvideScoped('TestSingletonCounter', Singleton, Counter)
+        features.ProvideScoped('TestPerThreadCounter', PerThread, Counter)
+        features.Provide('TestLegacyCounter', Counter)
+
+    def test_scoped_feature_is_requested_on_every_use(self):
+        consumer = Consumer()
+        first_instance = consumer._singleton
+        features.Refresh('TestSingletonCounter')
+        self.assertIsNot(first_instance, consumer._singleton, 'The refreshed singleton should have been returned')
+
+    def test_per_thread_feature_differs_between_threads(self):
+        consumer = Consumer()
+        other_thread_instances = []
+        thread = threading.Thread(target=lambda: other_thread_instances.append(consumer._per_thread))
+        thread.start()
+        thread.join()
+        self.assertIsNot(consumer._per_thread, other_thread_instances[0], 'Each thread should have received its own instance')
+
+    def test_feature_without_lifetime_keeps_first_value(self):
+        consumer = Consumer()
+        self.assertIs(consumer._legacy, consumer._legacy, 'The first value should have been kept')
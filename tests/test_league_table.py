@@ -0,0 +1,101 @@
+import unittest
+
+from app.league_table import LeagueTable
+from app.match_record import MatchRecord
+
+def create_match(time_of_match, home_team, home_score, away_team, away_score):
+    return MatchRecord('Kingston Heath Soccer Complex', time_of_match, home_team, home_score, away_team, away_score)
+
+def create_season(*matches):
+    return {'round': 'All', 'results': list(matches)}
+
+_round_1 = [
+    create_match('Friday 6 April 2018, 7:30 PM', 'Bentleigh Greens', 2, 'Heidelberg United', 1),
+    create_match('Saturday 7 April 2018, 3:00 PM', 'Avondale FC', 1, 'Oakleigh Cannons', 1)
+]
+
+_round_2 = [
+    create_match('Friday 13 April 2018, 7:30 PM', 'Heidelberg United', 3, 'Avondale FC', 0),
+    create_match('Saturday 14 April 2018, 3:00 PM', 'Oakleigh Cannons', None, 'Bentleigh Greens', None)
+]
+
+class TestLeagueTable(unittest.TestCase):
+    def setUp(self):
+        self._league_table = LeagueTable(points_for_win=3, points_for_draw=1, form_length=5)
+
+    def _get_rows_by_team(self, season_results):
+        return {row['team']: row for row in self._league_table.get_table(season_results)['table']}
+
+    def test_table_is_ordered_by_points_goal_difference_and_goals_scored(self):
+        table = self._league_table.get_table(create_season(*(_round_1 + _round_2)))['table']
+        self.assertListEqual(['Heidelberg United', 'Bentleigh Greens', 'Oakleigh Cannons', 'Avondale FC'], [row['team'] for row in table],
+                             'The teams should have been ordered by points, then goal difference')
+        self.assertListEqual([1, 2, 3, 4], [row['position'] for row in table], 'Each team should have had its position')
+
+    def test_row_contains_record_of_team(self):
+        row = self._get_rows_by_team(create_season(*(_round_1 + _round_2)))['Heidelberg United']
+        expected_row = {'position': 1, 'team': 'Heidelberg United', 'played': 2, 'won': 1, 'drawn': 0, 'lost': 1,
+                        'goalsFor': 4, 'goalsAgainst': 2, 'goalDifference': 2, 'points': 3, 'form': 'LW'}
+        self.assertDictEqual(expected_row, row, 'The record of the team should have been returned')
+
+    def test_matches_without_score_are_not_counted(self):
+        row = self._get_rows_by_team(create_season(*(_round_1 + _round_2)))['Oakleigh Cannons']
+        self.assertEqual(1, row['played'], 'The match without a score should not have been counted as played')
+        self.assertEqual('D', row['form'], 'The match without a score should not have been included in the form')
+
+    def test_form_is_limited_to_most_recent_matches_in_order_of_kickoff(self):
+        matches = [create_match('Friday {0} April 2018, 7:30 PM'.format(day), 'Bentleigh Greens', 1, 'Heidelberg United', 0) for day in [6, 13, 20]]
+        matches.append(create_match('Friday 27 April 2018, 7:30 PM', 'Bentleigh Greens', 0, 'Heidelberg United', 0))
+        matches.append(create_match('Friday 4 May 2018, 7:30 PM', 'Bentleigh Greens', 0, 'Heidelberg United', 1))
+
+        # The matches are supplied out of order, with the oldest match expected to be excluded from the form
+        matches.insert(0, create_match('Friday 30 March 2018, 7:30 PM', 'Bentleigh Greens', 0, 'Heidelberg United', 3))
+        matches.reverse()
+
+        self.assertEqual('WWWDL', self._get_rows_by_team(create_season(*matches))['Bentleigh Greens']['form'], \
+            'The form should have contained the five most recent results, from oldest to most recent')
+
+    def test_same_results_are_not_applied_again(self):
+        season_results = create_season(*_round_1)
+        first_table = self._league_table.get_table(season_results)
+        second_table = self._league_table.get_table(season_results)
+        self.assertIs(first_table, second_table, 'The same table should have been returned')
+        self.assertEqual(1, self._league_table.get_statistics()['updates'], 'The results should only have been applied once')
+
+    def test_unchanged_matches_in_new_results_do_not_change_table(self):
+        first_table = self._league_table.get_table(create_season(*_round_1))
+        second_table = self._league_table.get_table(create_season(*_round_1))
+        self.assertIs(first_table, second_table, 'The table should not have been built again')
+        self.assertEqual(2, self._league_table.get_statistics()['matchesApplied'], 'Only the first version of each match should have been applied')
+
+    def test_corrected_score_only_updates_rows_of_its_teams(self):
+        self._league_table.get_table(create_season(*(_round_1 + _round_2)))
+        statistics = self._league_table.get_statistics()
+
+        corrected_match = create_match('Friday 13 April 2018, 7:30 PM', 'Heidelberg United', 0, 'Avondale FC', 0)
+        rows = self._get_rows_by_team(create_season(_round_1[0], _round_1[1], corrected_match, _round_2[1]))
+
+        self.assertEqual(statistics['matchesApplied'] + 2, self._league_table.get_statistics()['matchesApplied'], \
+            'Only the corrected match should have been removed and applied again')
+        self.assertEqual(statistics['rowsUpdated'] + 2, self._league_table.get_statistics()['rowsUpdated'], \
+            'Only the rows of the two teams in the corrected match should have been updated')
+        self.assertEqual(1, rows['Heidelberg United']['points'], 'The corrected score should have been applied to the home team')
+        self.assertEqual(2, rows['Avondale FC']['points'], 'The corrected score should have been applied to the away team')
+        self.assertEqual(1, rows['Avondale FC']['goalsAgainst'], 'The original score should have been removed from the away team')
+
+    def test_score_added_to_match_is_applied(self):
+        self._league_table.get_table(create_season(*(_round_1 + _round_2)))
+        finished_match = create_match('Saturday 14 April 2018, 3:00 PM', 'Oakleigh Cannons', 2, 'Bentleigh Greens', 2)
+        rows = self._get_rows_by_team(create_season(_round_1[0], _round_1[1], _round_2[0], finished_match))
+        self.assertEqual(2, rows['Oakleigh Cannons']['played'], 'The match should have been counted once it had a score')
+        self.assertEqual('WD', rows['Bentleigh Greens']['form'], 'The draw should have been added to the form')
+
+    def test_removed_match_is_removed_from_table(self):
+        self._league_table.get_table(create_season(*_round_1))
+        rows = self._get_rows_by_team(create_season(_round_1[0]))
+        self.assertListEqual(['Bentleigh Greens', 'Heidelberg United'], sorted(rows), 'Teams without matches should have been removed')
+
+    def test_results_that_could_not_be_parsed_leave_table_unchanged(self):
+        table = self._league_table.get_table(create_season(*_round_1))
+        self.assertIs(table, self._league_table.get_table({'round': 'All', 'errorMessage': 'Unexpected error'}), \
+            'The table should not have changed')
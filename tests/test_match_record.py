@@ -0,0 +1,54 @@
+import unittest
+
+from lxml import html
+
+from app.match_record import MatchRecord, Outcome, from_serializable, normalize_name, to_serializable
+
+class TestMatchRecord(unittest.TestCase):
+    def test_outcome_is_identified_from_scores(self):
+        self.assertEqual(Outcome.HOME_WIN, MatchRecord('Venue 1', None, 'Team 1', 2, 'Team 2', 1).outcome, 'The home team should have won')
+        self.assertEqual(Outcome.AWAY_WIN, MatchRecord('Venue 1', None, 'Team 1', 0, 'Team 2', 1).outcome, 'The away team should have won')
+        self.assertEqual(Outcome.DRAW, MatchRecord('Venue 1', None, 'Team 1', 1, 'Team 2', 1).outcome, 'The match should have been a draw')
+        self.assertEqual(Outcome.UNKNOWN, MatchRecord('Venue 1', None, 'Team 1', None, 'Team 2', 1).outcome, 'The outcome should not be known')
+
+    def test_record_is_converted_to_dictionary_returned_by_api(self):
+        expected_dict = {
+            'venue': 'Venue 1',
+            'timeOfMatch': 'Friday 13 April 2018, 7:30 PM',
+            'homeTeam': 'Team 1',
+            'homeScore': 0,
+            'awayTeam': 'Team 2',
+            'awayScore': 1,
+            'result': 'Winner: Team 2'
+        }
+
+        self.assertDictEqual(expected_dict, MatchRecord.from_dict(expected_dict).to_dict(), 'The record should have been converted to the same dictionary')
+
+    def test_result_text_for_draw_and_unknown_outcome(self):
+        self.assertEqual('Draw', MatchRecord('Venue 1', None, 'Team 1', 2, 'Team 2', 2).to_dict()['result'], 'The result should have been a draw')
+        self.assertIsNone(MatchRecord('Venue 1', None, 'Team 1', 2, 'Team 2', None).to_dict()['result'], 'The result should not have been set')
+
+    def test_names_are_interned_plain_strings(self):
+        # Strings returned by lxml refer to the parsed tree, which the record should not keep alive
+        team_names = html.fromstring('<div><a>Team 1</a><a>Team 2</a></div>').xpath('//a/text()')
+        first_record = MatchRecord('Venue 1', None, team_names[0], 1, team_names[1], 0)
+        second_record = MatchRecord('Venue 1', None, 'Team ' + str(1), 1, 'Team 2', 0)
+
+        self.assertIs(str, type(first_record.home_team), 'The team name should have been converted to a plain string')
+        self.assertIs(first_record.home_team, second_record.home_team, 'The team name should have been interned')
+
+    def test_results_are_converted_to_and_from_serializable_form(self):
+        results = {'round': 1, 'results': [MatchRecord('Venue 1', None, 'Team 1', 2, 'Team 2', 1)]}
+        serializable_results = to_serializable(results)
+
+        self.assertIsInstance(serializable_results['results'][0], dict, 'The match record should have been converted to a dictionary')
+        self.assertIsInstance(from_serializable(serializable_results)['results'][0], MatchRecord, 'The dictionary should have been converted to a match record')
+
+    def test_error_details_are_unchanged_by_conversion(self):
+        error_details = {'round': 3, 'urlInvoked': 'http://getresults.com?round=3', 'errorMessage': 'More teams than scores'}
+        self.assertDictEqual(error_details, from_serializable(to_serializable(error_details)), 'The error details should have been unchanged')
+
+    def test_normalized_name_ignores_case_accents_spacing_and_punctuation(self):
+        self.assertEqual('bentleigh-greens', normalize_name('  Bentleigh   Greens '), 'Spacing should have been ignored')
+        self.assertEqual('st-albans-saints', normalize_name("St. Albans' Saints"), 'Punctuation should have been ignored')
+        self.assertEqual('jose-mourinho-oval', normalize_name('JOSÉ Mourinho Oval'), 'Case and accents should have been ignored')
@@ -0,0 +1,176 @@
+import glob
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.metrics import Metrics
+
+# Process ID given to the files of other workers, which is not the ID of this process
+_other_process_id = 4000000
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 1000.0
+
+    def __call__(self):
+        return self.current_time
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._clock = MockClock()
+        self._running_process_ids = set()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _create_metrics(self, directory=None):
+        return Metrics(directory=directory, flush_interval_seconds=5, clock=self._clock,
+                       is_process_running=lambda process_id: process_id in self._running_process_ids)
+
+    def _write_other_worker_metrics(self, parent_process_id=None):
+        # Totals written by another worker of the same parent, which served one request to /season in 20 milliseconds
+        other_metrics = self._create_metrics()
+        other_metrics.observe_request('/season', 'GET', 200, 0.02)
+        other_metrics.request_started('/season')
+        document = other_metrics._get_document()
+        document['processId'] = _other_process_id
+        document['parentProcessId'] = parent_process_id if parent_process_id is not None else os.getppid()
+        path = os.path.join(self._directory, 'metrics_{0}_{1}.json'.format(document['parentProcessId'], _other_process_id))
+
+        with open(path, mode='w') as metrics_file:
+            json.dump(document, metrics_file)
+
+    def test_request_latency_is_rendered_as_histogram(self):
+        metrics = self._create_metrics()
+        metrics.observe_request('/round/<round_number>', 'GET', 200, 0.003)
+        metrics.observe_request('/round/<round_number>', 'GET', 200, 0.2)
+        lines = metrics.render().splitlines()
+        labels = 'endpoint="/round/<round_number>",method="GET",status="200"'
+        self.assertIn('# TYPE football_results_request_duration_seconds histogram', lines, 'The type of the histogram should have been rendered')
+        self.assertIn('football_results_request_duration_seconds_bucket{%s,le="0.001"} 0' % labels, lines, 'No request should have been within 1 ms')
+        self.assertIn('football_results_request_duration_seconds_bucket{%s,le="0.005"} 1' % labels, lines, 'One request should have been within 5 ms')
+        self.assertIn('football_results_request_duration_seconds_bucket{%s,le="+Inf"} 2' % labels, lines, 'Every request should have been in +Inf')
+        self.assertIn('football_results_request_duration_seconds_sum{%s} 0.203' % labels, lines, 'The total latency should have been rendered')
+        self.assertIn('football_results_request_duration_seconds_count{%s} 2' % labels, lines, 'The number of requests should have been rendered')
+
+    def test_requests_in_progress_are_rendered_as_gauge(self):
+        metrics = self._create_metrics()
+        metrics.request_started('/season')
+        metrics.request_started('/season')
+        metrics.request_finished('/season')
+        self.assertIn('football_results_requests_in_progress{endpoint="/season"} 1', metrics.render().splitlines(), \
+            'One request should have been in progress')
+
+    def test_upstream_request_without_response_is_rendered_with_error_status(self):
+        metrics = self._create_metrics()
+        metrics.observe_upstream_request('GET', None, 3050)
+        metrics.observe_upstream_request('GET', 200, 120)
+        lines = metrics.render().splitlines()
+        self.assertIn('football_results_upstream_request_duration_seconds_count{method="GET",status="error"} 1', lines, \
+            'The request without a response should have been rendered with an error status')
+        self.assertIn('football_results_upstream_request_duration_seconds_count{method="GET",status="200"} 1', lines, \
+            'The successful request should have been rendered with its status code')
+
+    def test_parse_of_page_that_could_not_be_parsed_has_no_number_of_matches(self):
+        metrics = self._create_metrics()
+        metrics.observe_parse('season', 0.04, 180)
+        metrics.observe_parse('round', 0.002)
+        lines = metrics.render().splitlines()
+        self.assertIn('football_results_parse_duration_seconds_count{outcome="parsed",page="season"} 1', lines, 'The parse of the season should have been rendered')
+        self.assertIn('football_results_parse_duration_seconds_count{outcome="error",page="round"} 1', lines, 'The failed parse should have been rendered')
+        self.assertIn('football_results_parsed_matches_bucket{page="season",le="250"} 1', lines, 'The number of matches should have been rendered')
+        self.assertNotIn('football_results_parsed_matches_count{page="round"} 1', lines, 'No number of matches should have been rendered for the round')
+
+    def test_collected_samples_are_rendered_as_counters(self):
+        metrics = self._create_metrics()
+        metrics.add_collector(lambda: [('football_results_cache_lookups_total', {'cache': 'results', 'outcome': 'hit'}, 12)])
+        self.assertIn('football_results_cache_lookups_total{cache="results",outcome="hit"} 12', metrics.render().splitlines(), \
+            'The collected sample should have been rendered')
+
+    def test_failing_collector_does_not_prevent_rendering(self):
+        metrics = self._create_metrics()
+        metrics.add_collector(lambda: 1 / 0)
+        metrics.request_started('/')
+        self.assertIn('football_results_requests_in_progress{endpoint="/"} 1', metrics.render().splitlines(), 'The other metrics should have been rendered')
+
+    def test_label_values_are_escaped(self):
+        metrics = self._create_metrics()
+        metrics.request_started('/team/"a\\b"')
+        self.assertIn('football_results_requests_in_progress{endpoint="/team/\\"a\\\\b\\""} 1', metrics.render().splitlines(), \
+            'Quotes and backslashes in label values should have been escaped')
+
+    def test_totals_of_other_workers_are_aggregated(self):
+        self._running_process_ids.add(_other_process_id)
+        self._write_other_worker_metrics()
+        metrics = self._create_metrics(self._directory)
+        metrics.observe_request('/season', 'GET', 200, 0.03)
+        metrics.request_started('/season')
+        lines = metrics.render().splitlines()
+        self.assertIn('football_results_request_duration_seconds_count{endpoint="/season",method="GET",status="200"} 2', lines, \
+            'The requests of both workers should have been counted')
+        self.assertIn('football_results_request_duration_seconds_sum{endpoint="/season",method="GET",status="200"} 0.05', lines, \
+            'The latency of both workers should have been added')
+        self.assertIn('football_results_requests_in_progress{endpoint="/season"} 2', lines, 'The requests in progress of both workers should have been added')
+
+    def test_gauges_of_workers_that_have_exited_are_not_aggregated(self):
+        self._write_other_worker_metrics()
+        lines = self._create_metrics(self._directory).render().splitlines()
+        self.assertIn('football_results_request_duration_seconds_count{endpoint="/season",method="GET",status="200"} 1', lines, \
+            'The requests of the worker that exited should still have been counted')
+        self.assertNotIn('football_results_requests_in_progress{endpoint="/season"} 1', lines, \
+            'The requests in progress of the worker that exited should not have been included')
+
+    def test_totals_of_earlier_servers_are_not_aggregated(self):
+        self._running_process_ids.add(_other_process_id)
+        self._write_other_worker_metrics(parent_process_id=os.getppid() + 1)
+        lines = self._create_metrics(self._directory).render().splitlines()
+        self.assertNotIn('football_results_request_duration_seconds_count{endpoint="/season",method="GET",status="200"} 1', lines, \
+            'The requests of a worker with a different parent should not have been counted')
+
+    def test_totals_are_written_at_most_once_per_flush_interval(self):
+        metrics = self._create_metrics(self._directory)
+        path = os.path.join(self._directory, 'metrics_{0}_{1}.json'.format(os.getppid(), os.getpid()))
+        metrics.observe_request('/', 'GET', 200, 0.001)
+        metrics.observe_request('/', 'GET', 200, 0.001)
+
+        with open(path, mode='r') as metrics_file:
+            self.assertEqual(1, json.load(metrics_file)['histograms'][0][4], 'Only the first request should have been written')
+
+        self._clock.current_time += 5
+        metrics.observe_request('/', 'GET', 200, 0.001)
+
+        with open(path, mode='r') as metrics_file:
+            self.assertEqual(3, json.load(metrics_file)['histograms'][0][4], 'Every request should have been written once the interval elapsed')
+
+    def test_totals_of_workers_that_have_exited_are_archived_and_their_files_removed(self):
+        self._write_other_worker_metrics()
+        other_path = os.path.join(self._directory, 'metrics_{0}_{1}.json'.format(os.getppid(), _other_process_id))
+        archive_path = os.path.join(self._directory, 'metrics_{0}_archive.json'.format(os.getppid()))
+        metrics = self._create_metrics(self._directory)
+        metrics.render()
+        self.assertFalse(os.path.exists(other_path), 'The file of the worker that exited should have been removed')
+        self.assertTrue(os.path.exists(archive_path), 'The totals of the worker that exited should have been archived')
+
+        # A later worker with the same process ID exits as well, with its totals added to those already archived
+        self._write_other_worker_metrics()
+        lines = metrics.render().splitlines()
+        self.assertIn('football_results_request_duration_seconds_count{endpoint="/season",method="GET",status="200"} 2', lines, \
+            'The requests of both workers that exited should have been counted')
+        self.assertIn('football_results_request_duration_seconds_sum{endpoint="/season",method="GET",status="200"} 0.04', lines, \
+            'The latency of both workers that exited should have been added')
+        self.assertNotIn('football_results_requests_in_progress{endpoint="/season"} 1', lines, \
+            'The requests in progress of the workers that exited should not have been archived')
+        self.assertListEqual(sorted([archive_path, os.path.join(self._directory, 'metrics_{0}_{1}.json'.format(os.getppid(), os.getpid()))]), \
+            sorted(path for path in glob.glob(os.path.join(self._directory, '*.json'))), 'Only this worker and the archive should have files')
+
+    def test_totals_of_running_workers_are_not_archived(self):
+        self._running_process_ids.add(_other_process_id)
+        self._write_other_worker_metrics()
+        self._create_metrics(self._directory).render()
+        self.assertTrue(os.path.exists(os.path.join(self._directory, 'metrics_{0}_{1}.json'.format(os.getppid(), _other_process_id))), \
+            'The file of the running worker should have been kept')
+        self.assertFalse(os.path.exists(os.path.join(self._directory, 'metrics_{0}_archive.json'.format(os.getppid()))), \
+            'Nothing should have been archived')
@@ -0,0 +1,98 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.match_record import MatchRecord
+from app.refresh_policy import KickoffAwareRefreshPolicy, MelbourneTimezone, parse_match_time
+
+_melbourne_standard_time = timezone(timedelta(hours=10))
+
+class MockWallClock():
+    def __init__(self, current_time):
+        self.current_time = current_time
+
+    def __call__(self):
+        return self.current_time
+
+def create_match(time_of_match, home_score=None, away_score=None):
+    return MatchRecord('Kingston Heath Soccer Complex', time_of_match, 'Bentleigh Greens', home_score, 'Heidelberg United', away_score)
+
+class TestParseMatchTime(unittest.TestCase):
+    def test_match_time_is_parsed_in_match_timezone(self):
+        kickoff = parse_match_time('Friday 13 April 2018, 7:30 PM', _melbourne_standard_time)
+        self.assertEqual(datetime(2018, 4, 13, 9, 30, tzinfo=timezone.utc), kickoff, 'The kick-off should have been 9:30 AM UTC')
+
+    def test_unrecognised_match_time_is_not_parsed(self):
+        self.assertIsNone(parse_match_time('TBA', _melbourne_standard_time), 'An unrecognised match time should not have been parsed')
+        self.assertIsNone(parse_match_time(None, _melbourne_standard_time), 'A missing match time should not have been parsed')
+
+class TestMelbourneTimezone(unittest.TestCase):
+    def test_match_time_during_daylight_saving_is_parsed_as_utc_plus_11(self):
+        kickoff = parse_match_time('Friday 16 March 2018, 7:30 PM', MelbourneTimezone())
+        self.assertEqual(datetime(2018, 3, 16, 8, 30, tzinfo=timezone.utc), kickoff, 'The kick-off should have been 8:30 AM UTC')
+
+    def test_match_time_outside_daylight_saving_is_parsed_as_utc_plus_10(self):
+        kickoff = parse_match_time('Friday 13 April 2018, 7:30 PM', MelbourneTimezone())
+        self.assertEqual(datetime(2018, 4, 13, 9, 30, tzinfo=timezone.utc), kickoff, 'The kick-off should have been 9:30 AM UTC')
+
+    def test_daylight_saving_starts_at_2_am_on_first_sunday_in_october(self):
+        melbourne_timezone = MelbourneTimezone()
+        self.assertEqual(datetime(2018, 10, 7, 1, 59, tzinfo=melbourne_timezone),
+                         datetime(2018, 10, 6, 15, 59, tzinfo=timezone.utc).astimezone(melbourne_timezone), 'Standard time should have applied')
+        self.assertEqual(datetime(2018, 10, 7, 3, 0, tzinfo=melbourne_timezone),
+                         datetime(2018, 10, 6, 16, 0, tzinfo=timezone.utc).astimezone(melbourne_timezone), 'The clocks should have gone forward')
+        self.assertEqual('AEDT', datetime(2018, 10, 7, 3, 0, tzinfo=melbourne_timezone).tzname(), 'Daylight saving time should have applied')
+
+    def test_hour_is_repeated_when_daylight_saving_ends_on_first_sunday_in_april(self):
+        melbourne_timezone = MelbourneTimezone()
+        first_time = datetime(2018, 3, 31, 15, 30, tzinfo=timezone.utc).astimezone(melbourne_timezone)
+        repeated_time = datetime(2018, 3, 31, 16, 30, tzinfo=timezone.utc).astimezone(melbourne_timezone)
+        self.assertEqual((2, 30, 'AEDT'), (first_time.hour, first_time.minute, first_time.tzname()), 'Daylight saving time should have applied')
+        self.assertEqual((2, 30, 'AEST'), (repeated_time.hour, repeated_time.minute, repeated_time.tzname()), 'The hour should have been repeated')
+        self.assertEqual(timedelta(hours=10), datetime(2018, 4, 1, 3, 0, tzinfo=melbourne_timezone).utcoffset(), 'Standard time should have applied')
+
+class TestKickoffAwareRefreshPolicy(unittest.TestCase):
+    def setUp(self):
+        # Saturday 14 April 2018, 5:00 PM in Melbourne
+        self._wall_clock = MockWallClock(datetime(2018, 4, 14, 7, 0, tzinfo=timezone.utc))
+        self._policy = KickoffAwareRefreshPolicy(_melbourne_standard_time, live_interval_seconds=60, postponed_interval_seconds=3600,
+                                                 future_interval_seconds=21600, live_window_seconds=3 * 3600, wall_clock=self._wall_clock)
+
+    def test_match_in_play_is_refreshed_at_live_interval(self):
+        matches = [create_match('Friday 13 April 2018, 7:30 PM', 2, 1), create_match('Saturday 14 April 2018, 4:00 PM')]
+        self.assertEqual(60, self._policy.get_refresh_interval(matches), 'A match in play should have been refreshed every minute')
+
+    def test_match_just_finished_is_refreshed_at_live_interval(self):
+        matches = [create_match('Saturday 14 April 2018, 3:00 PM', 1, 1)]
+        self.assertEqual(60, self._policy.get_refresh_interval(matches), 'A match that just finished should have been refreshed every minute')
+
+    def test_completed_matches_are_not_refreshed(self):
+        matches = [create_match('Friday 13 April 2018, 7:30 PM', 2, 1), create_match('Saturday 14 April 2018, 1:00 PM', 0, 0)]
+        self.assertIsNone(self._policy.get_refresh_interval(matches), 'Completed matches should not have been refreshed again')
+
+    def test_completed_match_without_kickoff_time_is_not_refreshed(self):
+        self.assertIsNone(self._policy.get_refresh_interval([create_match('TBA', 3, 0)]), 'A match with a score should not have been refreshed again')
+
+    def test_match_without_score_after_it_finished_is_refreshed_at_postponed_interval(self):
+        matches = [create_match('Friday 13 April 2018, 7:30 PM', 2, 1), create_match('Saturday 14 April 2018, 1:00 PM')]
+        self.assertEqual(3600, self._policy.get_refresh_interval(matches), 'A postponed match should have been refreshed hourly')
+
+    def test_future_matches_are_refreshed_at_future_interval(self):
+        matches = [create_match('Friday 27 April 2018, 7:30 PM'), create_match('Saturday 28 April 2018, 3:00 PM')]
+        self.assertEqual(21600, self._policy.get_refresh_interval(matches), 'Future matches should have been refreshed rarely')
+
+    def test_refresh_is_due_at_next_kickoff(self):
+        matches = [create_match('Saturday 14 April 2018, 1:00 PM', 1, 0), create_match('Saturday 14 April 2018, 7:00 PM')]
+        self.assertEqual(7200, self._policy.get_refresh_interval(matches), 'The next refresh should have been due at the next kick-off')
+
+    def test_refresh_before_imminent_kickoff_is_not_sooner_than_live_interval(self):
+        self._wall_clock.current_time = datetime(2018, 4, 14, 8, 59, 30, tzinfo=timezone.utc)
+        matches = [create_match('Saturday 14 April 2018, 7:00 PM')]
+        self.assertEqual(60, self._policy.get_refresh_interval(matches), 'The next refresh should not have been sooner than the live interval')
+
+    def test_match_in_play_during_daylight_saving_is_refreshed_at_live_interval(self):
+        # 20 minutes after a 7:30 PM kick-off on Friday 16 March 2018, when Melbourne is on daylight saving time
+        wall_clock = MockWallClock(datetime(2018, 3, 16, 8, 50, tzinfo=timezone.utc))
+        policy = KickoffAwareRefreshPolicy(MelbourneTimezone(), live_interval_seconds=60, postponed_interval_seconds=3600,
+                                           future_interval_seconds=21600, live_window_seconds=3 * 3600, wall_clock=wall_clock)
+        self.assertEqual(60, policy.get_refresh_interval([create_match('Friday 16 March 2018, 7:30 PM')]), \
+            'The match in play should have been refreshed every minute')
@@ -0,0 +1,144 @@
+import threading
+import unittest
+from concurrent.futures import Future
+
+from app.inversion_of_control import features
+from app.match_record import MatchRecord
+from app.refresh_scheduler import RefreshScheduler
+from app.season_snapshot import SeasonSnapshot
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 0
+
+    def __call__(self):
+        return self.current_time
+
+def create_match(time_of_match):
+    return MatchRecord('Venue 1', time_of_match, 'Team 1', None, 'Team 2', None)
+
+class MockFootballResultsParser():
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.refreshed = []
+        self.round_numbers_fetched_individually = []
+        self.refresh_intervals = {}
+        self.season_results = {'results': [create_match('future')]}
+        self.error = None
+
+    def refresh_season(self):
+        if self.error is not None:
+            raise self.error
+
+        self.refreshed.append('season')
+        return SeasonSnapshot(self.season_results)
+
+    def refresh_round(self, round_number):
+        self.refreshed.append(round_number)
+        return {'round': round_number, 'results': [create_match('live')]}
+
+    def get_round_numbers_fetched_individually(self):
+        return self.round_numbers_fetched_individually
+
+    def set_season_refresh_interval(self, interval_seconds):
+        self.refresh_intervals['season'] = interval_seconds
+
+    def set_round_refresh_interval(self, round_number, interval_seconds):
+        self.refresh_intervals[round_number] = interval_seconds
+
+class MockRefreshPolicy():
+    # Chooses the interval from the match time alone, so that tests do not depend on the current date
+    _intervals = {'live': 60, 'future': 21600, 'complete': None}
+
+    def get_refresh_interval(self, matches):
+        intervals = [self._intervals[match.time_of_match] for match in matches]
+        intervals = [interval_seconds for interval_seconds in intervals if interval_seconds is not None]
+        return min(intervals) if len(intervals) > 0 else None
+
+class SynchronousExecutor():
+    # Runs each refresh as soon as it is submitted, so that tests do not depend on thread scheduling
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+_parser = MockFootballResultsParser()
+
+class TestRefreshScheduler(unittest.TestCase):
+    def setUp(self):
+        # Allow the dependencies to be replaced so as not to affect unit tests in other test classes
+        features.allowReplace = True
+        features.Provide('FootballSeasonResultsParser', lambda: _parser)
+        features.Provide('RefreshPolicy', MockRefreshPolicy)
+        _parser.reset()
+        self._clock = MockClock()
+        self._scheduler = RefreshScheduler(retry_interval_seconds=60, jitter_ratio=0, clock=self._clock, executor_factory=SynchronousExecutor)
+
+    def test_season_refreshed_when_first_run(self):
+        next_refresh = self._scheduler.run_due_refreshes()
+        self.assertListEqual(['season'], _parser.refreshed, 'The season should have been refreshed')
+        self.assertEqual(21600, next_refresh, 'The next refresh should be due at the interval chosen by the refresh policy')
+        self.assertDictEqual({'season': 21600}, _parser.refresh_intervals, 'The cached season should expire when it is next due')
+
+    def test_rounds_fetched_individually_refreshed_at_their_own_intervals(self):
+        _parser.round_numbers_fetched_individually = [30]
+        self.assertEqual(60, self._scheduler.run_due_refreshes(), 'The next refresh should be due when the live round is next refreshed')
+        self.assertListEqual(['season', 30], _parser.refreshed, 'The season and round 30 should have been refreshed')
+
+        _parser.refreshed = []
+        self._clock.current_time = 60
+        self._scheduler.run_due_refreshes()
+        self.assertListEqual([30], _parser.refreshed, 'Only round 30 should have been refreshed')
+
+    def test_nothing_refreshed_before_due(self):
+        self._scheduler.run_due_refreshes()
+        _parser.refreshed = []
+        self._clock.current_time = 21599
+        self._scheduler.run_due_refreshes()
+        self.assertListEqual([], _parser.refreshed, 'Nothing should have been refreshed')
+
+    def test_completed_season_is_not_refreshed_again(self):
+        _parser.season_results = {'results': [create_match('complete')]}
+        self.assertIsNone(self._scheduler.run_due_refreshes(), 'No further refreshes should be due')
+        self.assertDictEqual({'season': None}, _parser.refresh_intervals, 'The cached season should not expire')
+
+        _parser.refreshed = []
+        self._clock.current_time = 86400
+        self._scheduler.run_due_refreshes()
+        self.assertListEqual([], _parser.refreshed, 'The completed season should not have been refreshed again')
+        self.assertEqual(1, self._scheduler.get_statistics()['frozenPages'], 'The season should have been counted as frozen')
+
+    def test_season_with_parsing_error_is_retried(self):
+        _parser.season_results = {'errorMessage': 'Unable to parse'}
+        self.assertEqual(60, self._scheduler.run_due_refreshes(), 'The season should be retried after the retry interval')
+
+    def test_failed_refresh_is_counted_and_retried(self):
+        _parser.error = IOError('Upstream unavailable')
+        self.assertEqual(60, self._scheduler.run_due_refreshes(), 'The season should be retried after the retry interval')
+        statistics = self._scheduler.get_statistics()
+        self.assertEqual(1, statistics['refreshFailures'], 'The failed season refresh should have been counted')
+        self.assertEqual(0, statistics['pendingRefreshes'], 'No refreshes should remain pending')
+
+    def test_start_and_stop(self):
+        scheduler = RefreshScheduler(executor_factory=SynchronousExecutor)
+        scheduler.start()
+        self.assertTrue(scheduler.is_running(), 'The scheduler should be running once started')
+
+        # The first refresh is due immediately
+        for _ in range(500):
+            if scheduler.get_statistics()['refreshesCompleted'] >= 1:
+                break
+
+            threading.Event().wait(0.01)
+
+        scheduler.stop()
+        self.assertFalse(scheduler.is_running(), 'The scheduler should not be running once stopped')
+        self.assertListEqual(['season'], _parser.refreshed, 'The season should have been refreshed')
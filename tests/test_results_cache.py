@@ -0,0 +1,188 @@
+import threading
+import unittest
+
+from app.results_cache import ResultsCache
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 0
+
+    def __call__(self):
+        return self.current_time
+
+class MockLoader():
+    def __init__(self, values):
+        self._values = list(values)
+        self.invocation_count = 0
+
+    def __call__(self):
+        value = self._values[self.invocation_count]
+        self.invocation_count += 1
+        return value
+
+class BlockingLoader():
+    def __init__(self, value):
+        self._value = value
+        self.invocation_count = 0
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def __call__(self):
+        self.invocation_count += 1
+        self.release.wait(5)
+        self.finished.set()
+        return self._value
+
+class FailingLoader():
+    def __init__(self):
+        self.finished = threading.Event()
+
+    def __call__(self):
+        self.finished.set()
+        raise IOError('Upstream unavailable')
+
+class TestResultsCache(unittest.TestCase):
+    def setUp(self):
+        self._clock = MockClock()
+        self._cache = ResultsCache(ttl_seconds=60, clock=self._clock)
+
+    def _wait_for_refresh_to_be_stored(self, expected_refreshes):
+        # The refresh thread stores its value after the loader returns, so poll briefly for the statistics to update
+        for _ in range(500):
+            statistics = self._cache.get_statistics()
+
+            if statistics['refreshes'] + statistics['refreshFailures'] >= expected_refreshes:
+                return
+
+            threading.Event().wait(0.01)
+
+    def test_first_request_invokes_loader_and_counts_a_miss(self):
+        loader = MockLoader([{'round': 1}])
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader), 'The value returned by the loader should have been returned')
+        self.assertEqual(1, loader.invocation_count, 'The loader should have been invoked once')
+        self.assertEqual(1, self._cache.get_statistics()['misses'], 'A cache miss should have been counted')
+
+    def test_request_within_ttl_is_served_from_cache(self):
+        loader = MockLoader([{'round': 1}])
+        self._cache.get('1', loader)
+        self._clock.current_time = 59
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader), 'The cached value should have been returned')
+        self.assertEqual(1, loader.invocation_count, 'The loader should not have been invoked again')
+        self.assertEqual(1, self._cache.get_statistics()['hits'], 'A cache hit should have been counted')
+
+    def test_keys_are_cached_independently(self):
+        self._cache.get('1', MockLoader([{'round': 1}]))
+        self.assertDictEqual({'round': 2}, self._cache.get('2', MockLoader([{'round': 2}])), 'Each round should have its own entry')
+        self.assertEqual(2, self._cache.get_statistics()['entries'], 'Two entries should have been cached')
+
+    def test_expired_entry_is_served_stale_while_a_single_refresh_runs(self):
+        self._cache.get('1', MockLoader([{'round': 1, 'version': 1}]))
+        self._clock.current_time = 61
+        loader = BlockingLoader({'round': 1, 'version': 2})
+
+        # Both requests should be answered from the stale entry, with only one refresh started
+        self.assertEqual(1, self._cache.get('1', loader)['version'], 'The stale value should have been returned')
+        self.assertEqual(1, self._cache.get('1', loader)['version'], 'The stale value should have been returned')
+
+        loader.release.set()
+        loader.finished.wait(5)
+        self._wait_for_refresh_to_be_stored(1)
+
+        self.assertEqual(1, loader.invocation_count, 'Only one background refresh should have been started')
+        self.assertEqual(2, self._cache.get('1', loader)['version'], 'The refreshed value should have been returned')
+
+        statistics = self._cache.get_statistics()
+        self.assertEqual(2, statistics['staleHits'], 'Two stale hits should have been counted')
+        self.assertEqual(1, statistics['refreshes'], 'One refresh should have been counted')
+        self.assertEqual(1, statistics['hits'], 'One cache hit should have been counted')
+
+    def test_failed_refresh_keeps_serving_stale_entry(self):
+        self._cache.get('1', MockLoader([{'round': 1}]))
+        self._clock.current_time = 61
+        loader = FailingLoader()
+
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader), 'The stale value should have been returned')
+        loader.finished.wait(5)
+        self._wait_for_refresh_to_be_stored(1)
+
+        self.assertDictEqual({'round': 1}, self._cache.get('1', MockLoader([{'round': 1, 'version': 2}])), \
+            'The stale value should still be returned while the next refresh runs')
+        self.assertEqual(1, self._cache.get_statistics()['refreshFailures'], 'A refresh failure should have been counted')
+
+    def test_entry_with_ttl_set_to_none_never_goes_stale(self):
+        loader = MockLoader([{'round': 1}])
+        self._cache.get('1', loader)
+        self._cache.set_ttl('1', None)
+        self._clock.current_time = 86400
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader), 'The cached value should have been returned')
+        self.assertEqual(1, self._cache.get_statistics()['hits'], 'A cache hit should have been counted')
+
+    def test_ttl_set_for_entry_is_reset_when_entry_is_stored_again(self):
+        loader = MockLoader([{'round': 1}, {'round': 1, 'version': 2}])
+        self._cache.get('1', loader)
+        self._cache.set_ttl('1', 3600)
+        self._clock.current_time = 61
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader), 'The cached value should not have gone stale')
+
+        self._cache.refresh('1', loader)
+        self._clock.current_time = 122
+        self._cache.get('1', MockLoader([]))
+        self.assertEqual(1, self._cache.get_statistics()['staleHits'], 'The refreshed entry should have had the default TTL')
+
+    def test_restored_value_within_ttl_is_served_without_invoking_loader(self):
+        loader = MockLoader([])
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader, lambda: ({'round': 1}, 30)), 'The restored value should have been returned')
+        self._clock.current_time = 29
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader), 'The restored value should have been cached')
+        self.assertEqual(1, self._cache.get_statistics()['restores'], 'A restore should have been counted')
+
+    def test_stale_restored_value_is_served_while_a_refresh_runs(self):
+        loader = BlockingLoader({'round': 1, 'version': 2})
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader, lambda: ({'round': 1}, 3600)), 'The restored value should have been returned')
+
+        loader.release.set()
+        loader.finished.wait(5)
+        self._wait_for_refresh_to_be_stored(1)
+        self.assertEqual(2, self._cache.get('1', loader)['version'], 'The refreshed value should have been returned')
+
+    def test_loader_invoked_when_nothing_is_restored(self):
+        loader = MockLoader([{'round': 1}])
+        self.assertDictEqual({'round': 1}, self._cache.get('1', loader, lambda: None), 'The value returned by the loader should have been returned')
+
+    def test_age_includes_age_of_restored_value(self):
+        self.assertIsNone(self._cache.get_age_seconds('1'), 'No age should have been returned without an entry')
+        self._cache.get('1', MockLoader([]), lambda: ({'round': 1}, 30))
+        self._clock.current_time += 15
+        self.assertEqual(45, self._cache.get_age_seconds('1'), 'The age should have included the age the value was restored with')
+
+    def test_invalidated_entry_is_reloaded(self):
+        self._cache.get('1', MockLoader([{'round': 1}]))
+        self._cache.invalidate('1')
+        loader = MockLoader([{'round': 1, 'version': 2}])
+        self.assertDictEqual({'round': 1, 'version': 2}, self._cache.get('1', loader), 'The loader should have been invoked again')
+        self.assertEqual(2, self._cache.get_statistics()['misses'], 'Two cache misses should have been counted')
+
+    def test_least_recently_used_entry_is_forgotten_once_there_are_too_many_entries(self):
+        self._cache = ResultsCache(ttl_seconds=60, clock=self._clock, max_entries=2)
+        self._cache.get('1', MockLoader([{'round': 1}]))
+        self._cache.get('2', MockLoader([{'round': 2}]))
+        self._cache.get('1', MockLoader([]))
+        self._cache.get('3', MockLoader([{'round': 3}]))
+        self.assertListEqual(['1', '3'], self._cache.get_keys(), 'The least recently used entry should have been forgotten')
+        self.assertEqual(1, self._cache.get_statistics()['evictions'], 'An eviction should have been counted')
+
+    def test_error_is_fetched_again_once_its_shorter_ttl_has_elapsed(self):
+        self._cache = ResultsCache(ttl_seconds=60, clock=self._clock, error_ttl_seconds=5, is_error=lambda value: 'results' not in value)
+        self._cache.get('1', MockLoader([{'round': 1, 'errorMessage': 'No page exists for round specified'}]))
+        self._cache.get('2', MockLoader([{'round': 2, 'results': []}]))
+        self._clock.current_time = 5
+        self._cache.get('2', MockLoader([]))
+        self.assertEqual(1, self._cache.get_statistics()['hits'], 'The results should still have been within their TTL')
+
+        loader = BlockingLoader({'round': 1, 'results': []})
+        self._cache.get('1', loader)
+        loader.release.set()
+        loader.finished.wait(5)
+        self._wait_for_refresh_to_be_stored(1)
+        self.assertEqual(1, loader.invocation_count, 'The error should have been fetched again once its TTL elapsed')
+        self.assertIn('results', self._cache.get('1', MockLoader([])), 'The results should have replaced the error')
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import shutil
+import tempfile
+import unittest
+
+from app.results_store import ResultsStore
+
+_url = 'http://getresults.com?round=1'
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 1523685600
+
+    def __call__(self):
+        return self.current_time
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._database_path = os.path.join(self._directory, 'results.sqlite3')
+        self._clock = MockClock()
+        self._store = ResultsStore(self._database_path, clock=self._clock)
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_page_not_saved_is_not_loaded(self):
+        self.assertIsNone(self._store.load(_url), 'No page should have been loaded')
+
+    def test_saved_page_is_loaded_by_another_store(self):
+        self._store.save(_url, '"v1"', 'Sat, 14 Apr 2018 06:00:00 GMT', 'digest', {'round': 1, 'results': []})
+        persisted_page = ResultsStore(self._database_path).load(_url)
+
+        self.assertEqual(_url, persisted_page.url, 'The URL of the page should have been loaded')
+        self.assertEqual(1523685600, persisted_page.fetched_at, 'The time the page was fetched should have been loaded')
+        self.assertEqual('"v1"', persisted_page.etag, 'The ETag of the page should have been loaded')
+        self.assertEqual('Sat, 14 Apr 2018 06:00:00 GMT', persisted_page.last_modified, 'The Last-Modified date should have been loaded')
+        self.assertEqual('digest', persisted_page.digest, 'The digest of the page should have been loaded')
+        self.assertDictEqual({'round': 1, 'results': []}, persisted_page.document, 'The results of the page should have been loaded')
+
+    def test_saving_page_again_replaces_it(self):
+        self._store.save(_url, None, None, 'digest1', {'round': 1, 'version': 1})
+        self._store.save(_url, None, None, 'digest2', {'round': 1, 'version': 2})
+        self.assertEqual(2, self._store.load(_url).document['version'], 'The latest results should have been loaded')
+
+    def test_touched_page_has_new_fetch_time(self):
+        self._store.save(_url, None, None, 'digest', {'round': 1})
+        self._clock.current_time += 600
+        self.assertEqual(600, self._store.get_age_seconds(self._store.load(_url)), 'The page should have been 10 minutes old')
+
+        self._store.touch(_url)
+        self.assertEqual(0, self._store.get_age_seconds(self._store.load(_url)), 'The page should have been fetched just now')
+
+    def test_failures_are_counted_and_not_raised(self):
+        store = ResultsStore(os.path.join(self._directory, 'missing', 'results.sqlite3'))
+        store.save(_url, None, None, 'digest', {'round': 1})
+        self.assertIsNone(store.load(_url), 'No page should have been loaded')
+        self.assertEqual(2, store.get_statistics()['failures'], 'Both failures should have been counted')
+
+    def test_corrupt_page_is_counted_as_failure_and_not_loaded(self):
+        self._store.save(_url, None, None, 'digest', {'round': 1, 'results': []})
+
+        connection = sqlite3.connect(self._database_path)
+
+        with connection:
+            connection.execute('UPDATE pages SET document = ? WHERE url = ?', ('{"round": 1, "resu', _url))
+
+        connection.close()
+
+        self.assertIsNone(self._store.load(_url), 'The truncated page should not have been loaded')
+        self.assertEqual(1, self._store.get_statistics()['failures'], 'The failure to decode the page should have been counted')
+        self.assertEqual(0, self._store.get_statistics()['pagesRestored'], 'No page should have been restored')
+
+    def test_statistics_count_reads_and_writes(self):
+        self._store.save(_url, None, None, 'digest', {'round': 1})
+        self._store.load(_url)
+        self._store.load('http://getresults.com?round=2')
+        statistics = self._store.get_statistics()
+        self.assertEqual(2, statistics['reads'], 'Two reads should have been counted')
+        self.assertEqual(1, statistics['pagesRestored'], 'One page should have been restored')
+        self.assertEqual(1, statistics['writes'], 'One write should have been counted')
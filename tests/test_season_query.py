@@ -0,0 +1,112 @@
+import unittest
+from datetime import date, datetime
+
+from app.match_record import MatchRecord
+from app.season_query import SeasonQuery, SeasonQueryIndex, decode_cursor, encode_cursor
+
+# Saturday 21 April 2018, 6:00 PM in Melbourne
+_current_time = datetime(2018, 4, 21, 18, 0)
+
+_matches = [
+    MatchRecord('Venue 1', 'Friday 13 April 2018, 7:30 PM', 'Team 1', 0, 'Team 2', 1),
+    MatchRecord('Venue 2', 'Saturday 14 April 2018, 4:00 PM', 'Team 3', 6, 'Team 4', 2),
+    MatchRecord('Venue 1', 'Friday 20 April 2018, 8:45 PM', 'Team 2', None, 'Team 3', None),
+    MatchRecord('Venue 2', 'Saturday 21 April 2018, 7:30 PM', 'Team 4', None, 'Team 1', None),
+    MatchRecord('Venue 1', 'Friday 27 April 2018, 7:30 PM', 'Team 1', None, 'Team 3', None),
+    MatchRecord('Venue 2', 'Saturday 28 April 2018, 3:00 PM', 'Team 2', None, 'Team 4', None)
+]
+
+_match_rounds = [1, 1, 2, 2, 3, 3]
+
+class TestSeasonQuery(unittest.TestCase):
+    def test_no_query_for_arguments_without_filters(self):
+        self.assertIsNone(SeasonQuery.from_arguments({'format': 'compact'}), 'No query should have been created')
+
+    def test_query_created_from_arguments(self):
+        season_query = SeasonQuery.from_arguments({'from': '2018-04-14', 'to': '2018-04-21', 'fromRound': '2', 'team': 'Team 1',
+                                                   'status': 'played', 'limit': '10'})
+        self.assertEqual(date(2018, 4, 14), season_query.start_date, 'The start date should have been parsed')
+        self.assertEqual(date(2018, 4, 21), season_query.end_date, 'The end date should have been parsed')
+        self.assertEqual(2, season_query.first_round, 'The first round should have been parsed')
+        self.assertIsNone(season_query.last_round, 'No last round should have been specified')
+        self.assertEqual('Team 1', season_query.team, 'The team should have been supplied')
+        self.assertEqual('played', season_query.status, 'The status should have been supplied')
+        self.assertEqual(10, season_query.limit, 'The limit should have been parsed')
+
+    def test_invalid_arguments_are_rejected(self):
+        for arguments in [{'from': 'yesterday'}, {'toRound': '1.5'}, {'fromRound': '3', 'toRound': '2'}, {'status': 'abandoned'},
+                          {'limit': '501'}, {'cursor': 'bm90IGEgY3Vyc29y'}]:
+            with self.assertRaises(ValueError, msg='The arguments {0} should have been rejected'.format(arguments)):
+                SeasonQuery.from_arguments(arguments)
+
+    def test_cursor_is_decoded_to_sort_key(self):
+        sort_key = ('2018-04-13T19:30', 'Team 1', 'Team 2')
+        self.assertEqual(sort_key, decode_cursor(encode_cursor(sort_key)), 'The sort key should have been decoded from the cursor')
+
+class TestSeasonQueryIndex(unittest.TestCase):
+    def setUp(self):
+        # The matches are supplied out of order, as they are sorted by kick-off when indexed
+        self._index = SeasonQueryIndex(list(reversed(_matches)), list(reversed(_match_rounds)))
+
+    def _query(self, **filters):
+        return self._index.query(SeasonQuery(**filters), _current_time)
+
+    def test_all_matches_returned_in_order_of_kickoff(self):
+        self.assertListEqual(_matches, self._query()['results'], 'Every match should have been returned in order of kick-off')
+
+    def test_matches_filtered_by_inclusive_date_range(self):
+        results = self._query(start_date=date(2018, 4, 14), end_date=date(2018, 4, 21))['results']
+        self.assertListEqual(_matches[1:4], results, 'The matches from 14 to 21 April should have been returned')
+
+    def test_matches_filtered_by_round_range(self):
+        self.assertListEqual(_matches[2:], self._query(first_round=2)['results'], 'The matches from round 2 should have been returned')
+        self.assertListEqual(_matches[2:4], self._query(first_round=2, last_round=2)['results'], 'The matches of round 2 should have been returned')
+
+    def test_matches_filtered_by_normalized_team_name(self):
+        self.assertListEqual([_matches[0], _matches[3], _matches[4]], self._query(team='team-1')['results'], \
+            'The matches of Team 1 should have been returned')
+
+    def test_matches_filtered_by_status(self):
+        self.assertListEqual(_matches[:2], self._query(status='played')['results'], 'The matches with a score should have been returned')
+        self.assertListEqual([_matches[2]], self._query(status='postponed')['results'], \
+            'The match without a score that kicked off before the current time should have been returned')
+        self.assertListEqual(_matches[3:], self._query(status='unplayed')['results'], 'The matches yet to kick off should have been returned')
+
+    def test_filters_are_combined(self):
+        results = self._query(team='Team 3', first_round=2, status='unplayed')['results']
+        self.assertListEqual([_matches[4]], results, 'Only the unplayed matches of Team 3 from round 2 should have been returned')
+
+    def test_unknown_team_returns_no_matches(self):
+        self.assertListEqual([], self._query(team='Team 99')['results'], 'No matches should have been returned')
+
+    def test_matches_returned_a_page_at_a_time(self):
+        first_page = self._query(limit=4)
+        second_page = self._query(limit=4, after=decode_cursor(first_page['nextCursor']))
+        self.assertListEqual(_matches[:4], first_page['results'], 'The first four matches should have been returned')
+        self.assertListEqual(_matches[4:], second_page['results'], 'The remaining matches should have been returned')
+        self.assertIsNone(second_page['nextCursor'], 'No cursor should have been returned for the last page')
+
+    def test_last_page_without_further_matches_has_no_cursor(self):
+        self.assertIsNone(self._query(limit=6)['nextCursor'], 'No cursor should have been returned when every match fits on the page')
+
+    def test_cursor_remains_valid_after_refresh(self):
+        cursor = self._query(limit=2)['nextCursor']
+
+        # A refresh adds a match before the cursor and corrects the score of a match after it
+        refreshed_matches = [MatchRecord('Venue 3', 'Thursday 12 April 2018, 7:30 PM', 'Team 5', 1, 'Team 6', 1)] + _matches[:2] + \
+                            [MatchRecord('Venue 1', 'Friday 20 April 2018, 8:45 PM', 'Team 2', 2, 'Team 3', 2)] + _matches[3:]
+        refreshed_index = SeasonQueryIndex(refreshed_matches, [1] + _match_rounds)
+        results = refreshed_index.query(SeasonQuery(limit=2, after=decode_cursor(cursor)), _current_time)['results']
+
+        self.assertListEqual([refreshed_matches[3], refreshed_matches[4]], results, 'The next page should have started after the last match returned')
+
+    def test_repeated_query_returns_same_results(self):
+        self.assertIs(self._query(team='Team 1'), self._query(team='Team 1'), 'The results of the query should have been reused')
+
+    def test_matches_without_recognised_kickoff_are_sorted_last(self):
+        match_without_kickoff = MatchRecord('Venue 1', 'TBA', 'Team 1', None, 'Team 2', None)
+        index = SeasonQueryIndex([match_without_kickoff] + _matches)
+        results = index.query(SeasonQuery(), _current_time)['results']
+        self.assertIs(match_without_kickoff, results[-1], 'The match without a kick-off time should have been sorted last')
+        self.assertNotIn(match_without_kickoff, index.query(SeasonQuery(end_date=date(2018, 12, 31)), _current_time)['results'], \
+            'The match without a kick-off time should not have been within a date range')
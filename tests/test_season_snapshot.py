@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime
+
+from app.match_record import MatchRecord, to_serializable
+from app.season_query import SeasonQuery
+from app.season_snapshot import SeasonSnapshot
+
+_season_results = {
+    'round': 'All',
+    'results': [
+        MatchRecord('Venue 1', 'Friday 13 April 2018, 7:30 PM', 'Team 1', 0, 'Team 2', 1),
+        MatchRecord('Venue 2', 'Saturday 14 April 2018, 4:00 PM', 'Team 3', 6, 'Team 4', 2),
+        MatchRecord('Venue 1', 'Friday 20 April 2018, 8:45 PM', 'Team 2', None, 'Team 3', 1),
+        MatchRecord('Venue 2', 'Saturday 21 April 2018, 7:30 PM', 'Team 4', 0, 'Team 1', 3)
+    ]
+}
+
+class TestSeasonSnapshot(unittest.TestCase):
+    def test_season_results_are_returned_unchanged(self):
+        snapshot = SeasonSnapshot(_season_results, [1, 1, 2, 2])
+        self.assertIs(_season_results, snapshot.get_season_results(), 'The season results should have been returned as supplied')
+
+    def test_matches_are_indexed_by_round(self):
+        snapshot = SeasonSnapshot(_season_results, [1, 1, 2, 2])
+        expected_round = {'round': 2, 'results': _season_results['results'][2:]}
+        self.assertListEqual([1, 2], snapshot.get_round_numbers(), 'Rounds 1 and 2 should have been indexed')
+        self.assertDictEqual(expected_round, snapshot.get_results_for_round(2), 'The matches for round 2 are incorrect')
+
+    def test_snapshot_is_recreated_from_document(self):
+        snapshot = SeasonSnapshot.from_document(SeasonSnapshot(_season_results, [1, 1, 2, 2]).to_document())
+        self.assertDictEqual(to_serializable(_season_results), to_serializable(snapshot.get_season_results()), 'The season results should have been recreated')
+        self.assertListEqual([1, 2], snapshot.get_round_numbers(), 'Rounds 1 and 2 should have been indexed')
+
+    def test_matches_without_a_round_are_not_indexed(self):
+        snapshot = SeasonSnapshot(_season_results, [None, None, 2, 2])
+        self.assertListEqual([2], snapshot.get_round_numbers(), 'Only round 2 should have been indexed')
+        self.assertIsNone(snapshot.get_results_for_round(1), 'No results should have been returned for round 1')
+
+    def test_no_rounds_are_indexed_for_error_details(self):
+        error_details = {'invalidRoundSpecified': 'All', 'httpCode': 500, 'errorMessage': 'Unexpected error'}
+        snapshot = SeasonSnapshot(error_details)
+        self.assertListEqual([], snapshot.get_round_numbers(), 'No rounds should have been indexed')
+        self.assertIs(error_details, snapshot.get_season_results(), 'The error details should have been returned')
+
+    def test_matches_are_indexed_by_team(self):
+        snapshot = SeasonSnapshot(_season_results, [1, 1, 2, 2])
+        expected_team = {'team': 'Team 1', 'results': [_season_results['results'][0], _season_results['results'][3]]}
+        self.assertDictEqual(expected_team, snapshot.get_results_for_team('Team 1'), 'The home and away matches of Team 1 are incorrect')
+
+    def test_matches_are_indexed_by_venue(self):
+        snapshot = SeasonSnapshot(_season_results)
+        expected_venue = {'venue': 'Venue 2', 'results': [_season_results['results'][1], _season_results['results'][3]]}
+        self.assertDictEqual(expected_venue, snapshot.get_results_for_venue('Venue 2'), 'The matches played at Venue 2 are incorrect')
+
+    def test_team_and_venue_are_found_by_normalized_name(self):
+        snapshot = SeasonSnapshot(_season_results)
+        self.assertIs(snapshot.get_results_for_team('Team 3'), snapshot.get_results_for_team('team-3'), 'The same results should have been returned')
+        self.assertIs(snapshot.get_results_for_venue('Venue 1'), snapshot.get_results_for_venue(' VENUE_1 '), 'The same results should have been returned')
+
+    def test_unknown_team_and_venue_are_not_found(self):
+        snapshot = SeasonSnapshot(_season_results)
+        self.assertIsNone(snapshot.get_results_for_team('Team 99'), 'No results should have been returned for an unknown team')
+        self.assertIsNone(snapshot.get_results_for_venue('Venue 99'), 'No results should have been returned for an unknown venue')
+
+    def test_season_is_queried_through_index(self):
+        snapshot = SeasonSnapshot(_season_results, [1, 1, 2, 2])
+        query_results = snapshot.query(SeasonQuery(first_round=2, status='played'), datetime(2018, 5, 1))
+        self.assertListEqual([_season_results['results'][3]], query_results['results'], 'Only the played match of round 2 should have been returned')
+
+    def test_error_details_are_not_queried(self):
+        snapshot = SeasonSnapshot({'invalidRoundSpecified': 'All', 'httpCode': 500, 'errorMessage': 'Unexpected error'})
+        self.assertIsNone(snapshot.query(SeasonQuery(status='played'), datetime(2018, 5, 1)), 'No results should have been returned')
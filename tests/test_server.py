@@ -17,6 +17,7 @@ _expected_url_to_check = 'https://system-status.com'
 _server = None
 _application = None
 _injected_system_status = None
+_injected_refresh_scheduler = None
 
 def get_server():
     global _server
@@ -45,9 +46,24 @@ def get_application(test_case):
         features.Provide('SeasonResultsEndpoint', '/season')
         features.Provide('RoundResultsResource', lambda: MockFootballRoundResultsResource)
         features.Provide('RoundResultsEndpoint', '/round/<round_number>')
+        features.Provide('MultipleRoundResultsResource', lambda: MockFootballMultipleRoundResultsResource)
+        features.Provide('MultipleRoundResultsEndpoint', '/rounds')
+        features.Provide('TeamResultsResource', lambda: MockFootballTeamResultsResource)
+        features.Provide('TeamResultsEndpoint', '/team/<team_name>')
+        features.Provide('VenueResultsResource', lambda: MockFootballVenueResultsResource)
+        features.Provide('VenueResultsEndpoint', '/venue/<venue_name>')
+        features.Provide('LeagueTableResource', lambda: MockFootballLeagueTableResource)
+        features.Provide('LeagueTableEndpoint', '/table')
         features.Provide('SystemStatus', MockSystemStatus, _expected_url_to_check),
+        features.Provide('RefreshScheduler', MockRefreshScheduler)
         features.Provide('RootResource', lambda: MockRootEndpointResource)
         features.Provide('RootEndpoint', '/')
+        features.Provide('MetricsResource', lambda: MockMetricsResource)
+        features.Provide('MetricsEndpoint', '/metrics')
+        features.Provide('Metrics', _metrics)
+        features.Provide('UpstreamCircuitBreaker', _circuit_breaker)
+        features.Provide('FootballSeasonResultsParser', lambda: _football_results_parser)
+        features.Provide('FeatureBroker', _feature_broker)
 
     return _application
 
@@ -55,6 +71,10 @@ def set_injected_system_status(system_status):
     global _injected_system_status
     _injected_system_status = system_status
 
+def set_injected_refresh_scheduler(refresh_scheduler):
+    global _injected_refresh_scheduler
+    _injected_refresh_scheduler = refresh_scheduler
+
 class MockFootballSeasonResultsResource(Resource):
     def __init__(self):
         pass
@@ -69,6 +89,34 @@ class MockFootballRoundResultsResource(Resource):
     def get(self, round_number):
         return {'className': self.__class__.__name__, 'roundNumber': int(round_number)}
 
+class MockFootballMultipleRoundResultsResource(Resource):
+    def __init__(self):
+        pass
+
+    def get(self):
+        return {'className': self.__class__.__name__}
+
+class MockFootballTeamResultsResource(Resource):
+    def __init__(self):
+        pass
+
+    def get(self, team_name):
+        return {'className': self.__class__.__name__, 'teamName': team_name}
+
+class MockFootballVenueResultsResource(Resource):
+    def __init__(self):
+        pass
+
+    def get(self, venue_name):
+        return {'className': self.__class__.__name__, 'venueName': venue_name}
+
+class MockFootballLeagueTableResource(Resource):
+    def __init__(self):
+        pass
+
+    def get(self):
+        return {'className': self.__class__.__name__}
+
 class MockRootEndpointResource(Resource):
     def __init__(self):
         pass
@@ -76,6 +124,13 @@ class MockRootEndpointResource(Resource):
     def get(self):
         return {'mockingRootEndpoint': 'true'}
 
+class MockMetricsResource(Resource):
+    def __init__(self):
+        pass
+
+    def get(self):
+        return {'className': self.__class__.__name__}
+
 class MockSystemStatus(Resource):
     def __init__(self, url_to_check):
         self._url_to_check = url_to_check
@@ -84,6 +139,62 @@ class MockSystemStatus(Resource):
     def get_url_to_check(self):
         return self._url_to_check
 
+class MockRefreshScheduler():
+    def __init__(self):
+        self.start_count = 0
+        set_injected_refresh_scheduler(self)
+
+    def start(self):
+        self.start_count += 1
+
+class MockCircuitBreaker():
+    def __init__(self):
+        self.state = 'closed'
+
+    def get_state(self):
+        return self.state
+
+class MockFootballResultsParser():
+    # Rounds 1 and 2 are on the season page, with other rounds cached on their own
+    _round_ages_seconds = {'1': 125.7, '2': 125.7, '9999': 40.2, '10000': 3600.9}
+
+    def get_season_age_seconds(self):
+        return 125.7
+
+    def get_rounds_age_seconds(self, round_numbers):
+        return max(self._round_ages_seconds[round_number] for round_number in round_numbers)
+
+class MockFeatureBroker():
+    def __init__(self):
+        self.requests_begun = 0
+        self.requests_ended = 0
+
+    def BeginRequest(self):
+        self.requests_begun += 1
+
+    def EndRequest(self):
+        self.requests_ended += 1
+
+class MockMetrics():
+    def __init__(self):
+        self.requests_observed = []
+        self.requests_in_progress = {}
+
+    def observe_request(self, endpoint, method, status_code, elapsed_seconds):
+        self.requests_observed.append((endpoint, method, status_code))
+
+    def request_started(self, endpoint):
+        self.requests_in_progress[endpoint] = self.requests_in_progress.get(endpoint, 0) + 1
+
+    def request_finished(self, endpoint):
+        self.requests_in_progress[endpoint] -= 1
+
+# Single instances are used, as the server keeps the instances injected into it
+_circuit_breaker = MockCircuitBreaker()
+_football_results_parser = MockFootballResultsParser()
+_feature_broker = MockFeatureBroker()
+_metrics = MockMetrics()
+
 class TestFootballResultsServer(TestCase):
     _application = None
 
@@ -92,7 +203,8 @@ class TestFootballResultsServer(TestCase):
         return self._application
 
     def setUp(self):
-        pass
+        _circuit_breaker.state = 'closed'
+        del _metrics.requests_observed[:]
 
     @patch('flask.Flask')
     def test_get_application_returns_expected_flask_application(self, mock_flask):
@@ -126,3 +238,90 @@ class TestFootballResultsServer(TestCase):
             response = self.client.get('/round/{0}'.format(round_number))
             self.assert200(response, 'HTTP 200 should have been returned for the round endpoint')
             self.assertDictEqual(expected_dict, response.json, 'The retrieved dictionary does not match with what was expected')
+
+    def test_rounds_endpoint_returns_expected_data(self):
+        get_server()
+        expected_dict = dict(className='MockFootballMultipleRoundResultsResource')
+        response = self.client.get('/rounds?numbers=1,2')
+        self.assert200(response, 'HTTP 200 should have been returned for the rounds endpoint')
+        self.assertDictEqual(expected_dict, response.json, 'The retrieved dictionary does not match with what was expected')
+
+    def test_team_endpoint_returns_expected_data_with_team_name(self):
+        get_server()
+        expected_dict = dict(className='MockFootballTeamResultsResource', teamName='bentleigh-greens')
+        response = self.client.get('/team/bentleigh-greens')
+        self.assert200(response, 'HTTP 200 should have been returned for the team endpoint')
+        self.assertDictEqual(expected_dict, response.json, 'The retrieved dictionary does not match with what was expected')
+
+    def test_venue_endpoint_returns_expected_data_with_venue_name(self):
+        get_server()
+        expected_dict = dict(className='MockFootballVenueResultsResource', venueName='Kingston Heath Soccer Complex')
+        response = self.client.get('/venue/Kingston%20Heath%20Soccer%20Complex')
+        self.assert200(response, 'HTTP 200 should have been returned for the venue endpoint')
+        self.assertDictEqual(expected_dict, response.json, 'The retrieved dictionary does not match with what was expected')
+
+    def test_table_endpoint_returns_expected_data(self):
+        get_server()
+        expected_dict = dict(className='MockFootballLeagueTableResource')
+        response = self.client.get('/table')
+        self.assert200(response, 'HTTP 200 should have been returned for the table endpoint')
+        self.assertDictEqual(expected_dict, response.json, 'The retrieved dictionary does not match with what was expected')
+
+    def test_refresh_scheduler_started_by_server(self):
+        get_server()
+        self.assertIsNotNone(_injected_refresh_scheduler, 'A refresh scheduler should have been injected into FootballResultsServer')
+        self.assertTrue(_injected_refresh_scheduler.start_count >= 1, 'The refresh scheduler should have been started')
+
+    def test_refresh_scheduler_started_before_each_request(self):
+        get_server()
+        start_count = _injected_refresh_scheduler.start_count
+        self.client.get('/season')
+        self.assertEqual(start_count + 1, _injected_refresh_scheduler.start_count, 'The refresh scheduler should have been started before the request')
+
+    def test_results_are_not_marked_with_age_while_circuit_is_closed(self):
+        get_server()
+        response = self.client.get('/season')
+        self.assertNotIn('Age', response.headers, 'No age should have been given while sportstg is being contacted')
+
+    def test_results_are_marked_with_age_while_circuit_is_open(self):
+        get_server()
+        _circuit_breaker.state = 'open'
+
+        for url in '/season', '/round/1', '/table':
+            response = self.client.get(url)
+            self.assert200(response, 'The cached results should have been served from {0}'.format(url))
+            self.assertEqual('125', response.headers.get('Age'), 'The age of the results should have been given for {0}'.format(url))
+
+        self.assertNotIn('Age', self.client.get('/').headers, 'No age should have been given for the root document')
+
+    def test_rounds_cached_on_their_own_are_marked_with_their_own_age(self):
+        get_server()
+        _circuit_breaker.state = 'open'
+
+        for url, expected_age in ('/round/9999', '40'), ('/rounds?numbers=1,10000', '3600'), ('/rounds?from=1&to=2', '125'):
+            response = self.client.get(url)
+            self.assertEqual(expected_age, response.headers.get('Age'), 'The age of the oldest round served should have been given for {0}'.format(url))
+
+    def test_request_scope_begins_and_ends_with_each_request(self):
+        get_server()
+        requests_begun = _feature_broker.requests_begun
+        requests_ended = _feature_broker.requests_ended
+        self.client.get('/season')
+        self.assertEqual(requests_begun + 1, _feature_broker.requests_begun, 'A request scope should have begun for the request')
+        self.assertEqual(requests_ended + 1, _feature_broker.requests_ended, 'The request scope should have ended with the request')
+
+    def test_metrics_endpoint_returns_expected_data(self):
+        get_server()
+        expected_dict = dict(className='MockMetricsResource')
+        response = self.client.get('/metrics')
+        self.assert200(response, 'HTTP 200 should have been returned for the metrics endpoint')
+        self.assertDictEqual(expected_dict, response.json, 'The retrieved dictionary does not match with what was expected')
+
+    def test_requests_are_observed_by_url_rule(self):
+        get_server()
+        self.client.get('/round/1')
+        self.client.get('/round/2')
+        self.client.get('/unknown')
+        self.assertListEqual([('/round/<round_number>', 'GET', 200), ('/round/<round_number>', 'GET', 200), ('unmatched', 'GET', 404)], \
+            _metrics.requests_observed, 'Each request should have been observed against its URL rule')
+        self.assertEqual(0, _metrics.requests_in_progress['/round/<round_number>'], 'No requests should remain in progress once answered')
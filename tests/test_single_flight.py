@@ -0,0 +1,102 @@
+import threading
+import unittest
+
+from app.single_flight import SingleFlight, SingleFlightTimeoutError
+
+class BlockingFunction():
+    def __init__(self, result=None, error=None):
+        self._result = result
+        self._error = error
+        self.invocation_count = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.invocation_count += 1
+        self.started.set()
+        self.release.wait(5)
+
+        if self._error is not None:
+            raise self._error
+
+        return self._result
+
+class TestSingleFlight(unittest.TestCase):
+    def _call_concurrently(self, single_flight, function, number_of_waiters):
+        outcomes = []
+        leader = threading.Thread(target=self._record_outcome, args=(single_flight, function, outcomes))
+        leader.start()
+        function.started.wait(5)
+
+        waiters = [threading.Thread(target=self._record_outcome, args=(single_flight, function, outcomes)) for _ in range(number_of_waiters)]
+
+        for waiter in waiters:
+            waiter.start()
+
+        # Wait until every waiter has joined the call before letting it complete
+        for _ in range(500):
+            if single_flight.get_statistics()['currentWaiters'] == number_of_waiters:
+                break
+
+            threading.Event().wait(0.01)
+
+        function.release.set()
+
+        for thread in [leader] + waiters:
+            thread.join(5)
+
+        return outcomes
+
+    def _record_outcome(self, single_flight, function, outcomes):
+        try:
+            outcomes.append(single_flight.do('http://getresults.com?round=1', function))
+        except Exception as error:
+            outcomes.append(error)
+
+    def test_concurrent_callers_share_a_single_call(self):
+        single_flight = SingleFlight()
+        result = {'round': 1}
+        function = BlockingFunction(result=result)
+        outcomes = self._call_concurrently(single_flight, function, number_of_waiters=4)
+
+        self.assertEqual(1, function.invocation_count, 'The function should only have been invoked once')
+        self.assertEqual(5, len(outcomes), 'Every caller should have received an outcome')
+
+        for outcome in outcomes:
+            self.assertIs(result, outcome, 'Every caller should have received the same result')
+
+        statistics = single_flight.get_statistics()
+        self.assertEqual(1, statistics['executedCalls'], 'One call should have been executed')
+        self.assertEqual(4, statistics['coalescedCalls'], 'Four calls should have been coalesced')
+        self.assertEqual(4, statistics['maxWaiters'], 'Four callers should have waited at once')
+        self.assertEqual(0, statistics['inFlight'], 'No calls should remain in flight')
+
+    def test_concurrent_callers_share_an_error(self):
+        single_flight = SingleFlight()
+        error = IOError('Upstream unavailable')
+        outcomes = self._call_concurrently(single_flight, BlockingFunction(error=error), number_of_waiters=2)
+
+        self.assertEqual(3, len(outcomes), 'Every caller should have received an outcome')
+
+        for outcome in outcomes:
+            self.assertIs(error, outcome, 'Every caller should have received the same error')
+
+    def test_sequential_calls_are_not_coalesced(self):
+        single_flight = SingleFlight()
+        self.assertEqual(1, single_flight.do('key', lambda: 1), 'The result of the first call should have been returned')
+        self.assertEqual(2, single_flight.do('key', lambda: 2), 'The second call should have been executed')
+        self.assertEqual(0, single_flight.get_statistics()['coalescedCalls'], 'No calls should have been coalesced')
+
+    def test_waiter_times_out(self):
+        single_flight = SingleFlight(wait_timeout_seconds=0.01)
+        function = BlockingFunction(result=1)
+        leader = threading.Thread(target=single_flight.do, args=('key', function))
+        leader.start()
+        function.started.wait(5)
+
+        with self.assertRaises(SingleFlightTimeoutError):
+            single_flight.do('key', function)
+
+        function.release.set()
+        leader.join(5)
+        self.assertEqual(1, single_flight.get_statistics()['waitTimeouts'], 'A wait timeout should have been counted')
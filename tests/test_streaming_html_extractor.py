@@ -0,0 +1,57 @@
+import glob
+import os
+import unittest
+
+from lxml import html
+
+from app.streaming_html_extractor import StreamingHtmlExtractor
+
+_test_path = os.path.join(os.path.dirname(__file__), 'test_data/test_football_results_parser')
+_xpaths = [
+    '//div[@class="teamname"]/text()',
+    '//div[@class="score"]/text()',
+    '//div[@class="matchtime"]/text()',
+    '//div[@class="venuename"]/text()',
+    '//div[@class="roundname"]/text()'
+]
+
+class TestStreamingHtmlExtractor(unittest.TestCase):
+    def _assert_same_values_as_xpath(self, chunk_size):
+        extractor = StreamingHtmlExtractor(*_xpaths, chunk_size=chunk_size)
+
+        for html_file in glob.glob(os.path.join(_test_path, '*.html')):
+            # Using the with statement to open the file, otherwise the tests
+            # will report 'ResurceWarning: unclosed file'
+            with open(file=html_file, mode='r') as f:
+                content = f.read()
+
+            tree = html.fromstring(content)
+            extracted_page = extractor.extract(content)
+
+            for xpath, actual_values in zip(_xpaths, extracted_page[:4]):
+                self.assertListEqual(tree.xpath(xpath), actual_values, \
+                    'The values extracted for {0} from {1} do not match the XPath expression'.format(xpath, os.path.basename(html_file)))
+
+    def test_values_match_xpath_for_every_test_page(self):
+        self._assert_same_values_as_xpath(chunk_size=65536)
+
+    def test_values_match_xpath_when_elements_span_chunks(self):
+        self._assert_same_values_as_xpath(chunk_size=7)
+
+    def test_match_round_names_follow_round_names_in_document_order(self):
+        extractor = StreamingHtmlExtractor(*_xpaths)
+
+        with open(file=os.path.join(_test_path, 'test_football_results_for_season_with_round_names.html'), mode='r') as f:
+            extracted_page = extractor.extract(f.read(), include_match_round_names=True)
+
+        expected_round_names = ['Round 1', 'Round 1', 'Round 1', 'Round 2', 'Round 2', 'Round 2']
+        self.assertListEqual(expected_round_names, extracted_page.match_round_names, 'Each match should belong to the preceding round name')
+
+    def test_match_round_names_not_extracted_unless_requested(self):
+        extractor = StreamingHtmlExtractor(*_xpaths)
+        self.assertIsNone(extractor.extract('<html><body/></html>').match_round_names, 'Round names should not have been extracted')
+
+    def test_supports_only_simple_xpath_expressions(self):
+        self.assertTrue(StreamingHtmlExtractor.supports('//a[@class="teamnames"]/text()'), 'Expecting a simple expression to be supported')
+        self.assertFalse(StreamingHtmlExtractor.supports('//div[@class="match"]//a/text()'), 'Expecting a descendant expression to be unsupported')
+        self.assertFalse(StreamingHtmlExtractor.supports('//a[contains(@class, "team")]/text()'), 'Expecting a function to be unsupported')
@@ -7,23 +7,20 @@ from app.inversion_of_control import features
 from app.system_status import SystemStatus
 
 # Global variables and static methods for validating behaviours
-_health_check_method = None
-_section_name = None
-_section_method = None
+_health_check_methods = []
+_sections = {}
 _application_for_health_check = None
 _path_for_health_check = None
 _application_for_environment_dump = None
 _path_for_environment_dump = None
 
-def set_global_health_check_method(health_check_method):
-    global _health_check_method
-    _health_check_method = health_check_method
+def add_global_health_check_method(health_check_method):
+    # SystemStatus adds more than one health check, so each health check is recorded
+    _health_check_methods.append(health_check_method)
 
 def set_global_section_properties(section_name, section_method):
-    global _section_name
-    global _section_method
-    _section_name = section_name
-    _section_method = section_method
+    # SystemStatus adds more than one section, so each section is recorded against its name
+    _sections[section_name] = section_method
 
 def set_global_application_and_path_for_health_check(application, path):
     global _application_for_health_check
@@ -38,24 +35,53 @@ def set_global_application_and_path_for_environment_dump(application, path):
     _path_for_environment_dump = path
 
 class MockHttpRequests():
+    request_listeners = []
+
+    def get_statistics(self):
+        return {
+            'calls': 3,
+            'retries': 1
+        }
+
+    def add_request_listener(self, listener):
+        MockHttpRequests.request_listeners.append(listener)
+
+class MockUpstreamHealthProbe():
+    def __init__(self):
+        self.status = (True, 'URL http://unittesting.com OK')
+
+    def get_status(self):
+        return self.status
+
+    def get_statistics(self):
+        return {
+            'probes': 6,
+            'evidenceResponses': 40
+        }
+
+_upstream_health_probe = MockUpstreamHealthProbe()
+
+class MockCircuitBreaker():
     def __init__(self):
-        self.status_code = 0
+        self.state = 'closed'
+
+    def get_state(self):
+        return self.state
+
+    def get_statistics(self):
+        return {
+            'state': self.state,
+            'timesOpened': 2
+        }
 
-    def get(self, url_to_check):
-        if url_to_check == 'http://unittesting.com':
-            self.status_code = 200
-        else:
-            self.status_code = 404
-        
-        # Caller is expecting an object to be returned that contains the attribute status_code
-        return self
+_circuit_breaker = MockCircuitBreaker()
 
 class MockHealthCheck():
     def __init__(self, app, path):
         set_global_application_and_path_for_health_check(app, path)
 
     def add_check(self, health_check_method):
-        set_global_health_check_method(health_check_method)
+        add_global_health_check_method(health_check_method)
 
 class MockEnvironmentDump():
     def __init__(self, app, path):
@@ -64,6 +90,66 @@ class MockEnvironmentDump():
     def add_section(self, section_name, section_method):
         set_global_section_properties(section_name, section_method)
 
+class MockResultsCache():
+    def get_statistics(self):
+        return {
+            'hits': 5,
+            'staleHits': 1,
+            'misses': 2
+        }
+
+class MockSingleFlight():
+    def get_statistics(self):
+        return {
+            'executedCalls': 4,
+            'coalescedCalls': 9
+        }
+
+class MockResultsStore():
+    def get_statistics(self):
+        return {
+            'pagesRestored': 2,
+            'writes': 7
+        }
+
+class MockJsonRenderer():
+    def __call__(self, data):
+        return data
+
+    def get_statistics(self):
+        return {
+            'renders': 3,
+            'reuses': 8,
+            'notModifiedResponses': 11
+        }
+
+_json_renderer = MockJsonRenderer()
+
+class MockLeagueTable():
+    def get_statistics(self):
+        return {
+            'teams': 14,
+            'rowsUpdated': 5
+        }
+
+class MockFeatureBroker():
+    def GetResolutionReport(self):
+        return {
+            'SystemStatus': {'lifetime': 'singleton', 'builds': 1}
+        }
+
+class MockMetrics():
+    def __init__(self):
+        self.collectors = []
+
+    def observe_upstream_request(self, method, status_code, elapsed_milliseconds):
+        pass
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+_metrics = MockMetrics()
+
 class MockApplicationInformation():
     def get_information(self):
         return {
@@ -76,6 +162,15 @@ class MockApplicationInformation():
 
 class TestSystemHealthcheck(unittest.TestCase):
     _application_section_name = 'Application'
+    _results_cache_section_name = 'Cache'
+    _upstream_section_name = 'Upstream'
+    _upstream_health_section_name = 'UpstreamHealth'
+    _circuit_breaker_section_name = 'CircuitBreaker'
+    _single_flight_section_name = 'SingleFlight'
+    _results_store_section_name = 'Store'
+    _rendered_responses_section_name = 'Responses'
+    _league_table_section_name = 'Table'
+    _feature_resolution_section_name = 'Features'
     _application = MockApplication('TestSystemHealthcheck')
 
     def setUp(self):
@@ -86,77 +181,212 @@ class TestSystemHealthcheck(unittest.TestCase):
         features.Provide('HealthCheck', MockHealthCheck, app=self._application, path='/testHealthCheck')
         features.Provide('EnvironmentDump', MockEnvironmentDump, app=self._application, path='/testEnvironmentDump')
         features.Provide('ApplicationSectionName', self._application_section_name)
+        features.Provide('ResultsCache', MockResultsCache())
+        features.Provide('ResultsCacheSectionName', self._results_cache_section_name)
+        features.Provide('UpstreamSectionName', self._upstream_section_name)
+        features.Provide('UpstreamHealthProbe', _upstream_health_probe)
+        features.Provide('UpstreamHealthSectionName', self._upstream_health_section_name)
+        _upstream_health_probe.status = (True, 'URL http://unittesting.com OK')
+        features.Provide('UpstreamCircuitBreaker', _circuit_breaker)
+        features.Provide('CircuitBreakerSectionName', self._circuit_breaker_section_name)
+        _circuit_breaker.state = 'closed'
+        del _health_check_methods[:]
+        features.Provide('SingleFlight', MockSingleFlight())
+        features.Provide('SingleFlightSectionName', self._single_flight_section_name)
+        features.Provide('ResultsStore', MockResultsStore())
+        features.Provide('ResultsStoreSectionName', self._results_store_section_name)
+        features.Provide('PrettyJson', lambda: _json_renderer)
+        features.Provide('RenderedResponsesSectionName', self._rendered_responses_section_name)
+        features.Provide('LeagueTable', MockLeagueTable())
+        features.Provide('LeagueTableSectionName', self._league_table_section_name)
+        features.Provide('FeatureBroker', MockFeatureBroker())
+        features.Provide('FeatureResolutionSectionName', self._feature_resolution_section_name)
+        features.Provide('Metrics', _metrics)
+        del _metrics.collectors[:]
+        del MockHttpRequests.request_listeners[:]
 
-    def test_check_url_returns_200_for_valid_page(self):
-        url_to_check = 'http://unittesting.com'
-        expected_message = 'URL %s OK' % url_to_check
-        system_status = SystemStatus(url_to_check)
+    def test_check_url_returns_healthy_status_observed_by_probe(self):
+        system_status = SystemStatus()
         result = system_status.check_url()
-        self.assertEqual(True, result[0], 'Expecting True to be returned for %s' % url_to_check)
-        self.assertEqual(expected_message, result[1], 'Incorrect message returned')
+        self.assertEqual(True, result[0], 'Expecting True to be returned when the probe observed a healthy upstream')
+        self.assertEqual('URL http://unittesting.com OK', result[1], 'Incorrect message returned')
 
-    def test_check_url_does_not_return_200_for_invalid_page(self):
-        url_to_check = 'http://invalidpage.com'
-        expected_message = 'URL %s did not return HTTP OK' % url_to_check
-        system_status = SystemStatus(url_to_check)
+    def test_check_url_returns_unhealthy_status_observed_by_probe(self):
+        _upstream_health_probe.status = (False, 'URL http://invalidpage.com did not return HTTP OK')
+        system_status = SystemStatus()
         result = system_status.check_url()
-        self.assertEqual(False, result[0], 'Expecting False to be returned for %s' % url_to_check)
-        self.assertEqual(expected_message, result[1], 'Incorrect message returned')
+        self.assertEqual(False, result[0], 'Expecting False to be returned when the probe observed an unhealthy upstream')
+        self.assertEqual('URL http://invalidpage.com did not return HTTP OK', result[1], 'Incorrect message returned')
+
+    def test_check_circuit_breaker_returns_healthy_status_while_closed(self):
+        result = SystemStatus().check_circuit_breaker()
+        self.assertEqual(True, result[0], 'Expecting True to be returned while the circuit breaker is closed')
+        self.assertEqual('Circuit breaker for sportstg is closed', result[1], 'Incorrect message returned')
+
+    def test_check_circuit_breaker_returns_unhealthy_status_while_open(self):
+        _circuit_breaker.state = 'open'
+        result = SystemStatus().check_circuit_breaker()
+        self.assertEqual(False, result[0], 'Expecting False to be returned while the circuit breaker is open')
+        self.assertEqual('Circuit breaker for sportstg is open', result[1], 'Incorrect message returned')
+
+    def test_circuit_breaker_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._circuit_breaker_section_name in _sections, 'Expecting the circuit breaker section to have been added')
+        self.assertEqual(system_status.get_circuit_breaker_data, _sections[self._circuit_breaker_section_name], 'Incorrect circuit breaker section method')
+        self.assertEqual(2, system_status.get_circuit_breaker_data()['timesOpened'], 'Expecting the circuit breaker statistics to have been returned')
+
+    def test_upstream_health_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._upstream_health_section_name in _sections, 'Expecting the upstream health section to have been added')
+        self.assertEqual(system_status.get_upstream_health_data, _sections[self._upstream_health_section_name], 'Incorrect upstream health section method')
+
+    def test_get_upstream_health_data_returns_probe_statistics(self):
+        json_data = SystemStatus().get_upstream_health_data()
+        self.assertEqual(6, json_data['probes'], 'Expecting the number of probes to have been returned')
+        self.assertEqual(40, json_data['evidenceResponses'], 'Expecting the number of evidence responses to have been returned')
 
     def test_get_application_data_contains_app_key(self):
         key = 'app'
-        system_status = SystemStatus('http://someurl.com')
+        system_status = SystemStatus()
         json_data = system_status.get_application_data()
         self.assertEqual(True, key in json_data, 'Expecting %s to have been in json_data' % key)
 
     def test_get_application_data_does_not_contain_yada_key(self):
         key = 'yada'
-        system_status = SystemStatus('http://someurl.com')
+        system_status = SystemStatus()
         json_data = system_status.get_application_data()
         self.assertEqual(False, key in json_data, 'Expecting %s to not have been in json_data' % key)
 
     def test_get_application_data_contains_name_key_within_app(self):
         key = 'name'
-        system_status = SystemStatus('http://someurl.com')
+        system_status = SystemStatus()
         json_data = system_status.get_application_data()
         self.assertEqual(True, key in json_data['app'], 'Expecting %s to have been in json_data[\'app\']' % key)
         self.assertEqual('Unit Testing', json_data['app'][key], 'Expecting \'Unit Testing\' to have been the value set to %s' % key)
 
     def test_get_application_data_contains_most_recent_commit_key_within_app(self):
         key = 'mostRecentCommit'
-        system_status = SystemStatus('http://someurl.com')
+        system_status = SystemStatus()
         json_data = system_status.get_application_data()
         self.assertEqual(True, key in json_data['app'], 'Expecting %s to have been in json_data[\'app\']' % key)
         self.assertEqual('sha12345', json_data['app'][key], 'Expecting \'sha12345\' to have been the value set to %s' % key)
 
     def test_get_application_data_contains_tag_key_within_app(self):
         key = 'tag'
-        system_status = SystemStatus('http://someurl.com')
+        system_status = SystemStatus()
         json_data = system_status.get_application_data()
         self.assertEqual(True, key in json_data['app'], 'Expecting %s to have been in json_data[\'app\']' % key)
         self.assertEqual('tag-v1', json_data['app'][key], 'Expecting \'tag-v1\' to have been the value set to %s' % key)
 
     def test_get_application_data_does_not_contain_bla_key_within_app(self):
         key = 'bla'
-        system_status = SystemStatus('http://someurl.com')
+        system_status = SystemStatus()
         json_data = system_status.get_application_data()
         self.assertEqual(False, key in json_data['app'], 'Expecting %s to not have been in json_data[\'app\']' % key)
 
     def test_health_check_method_added(self):
-        system_status = SystemStatus('http://someurl.com')
-        self.assertEqual(system_status.check_url, _health_check_method, 'Incorrect health check method')
+        system_status = SystemStatus()
+        self.assertListEqual([system_status.check_url, system_status.check_circuit_breaker], _health_check_methods, 'Incorrect health check methods')
 
     def test_environment_dump_method_added(self):
-        system_status = SystemStatus('http://someurl.com')
-        self.assertEqual(system_status.get_application_data, _section_method, 'Incorrect environment dump method')
-        self.assertEqual(self._application_section_name, _section_name, 'Incorrect section name')
+        system_status = SystemStatus()
+        self.assertEqual(True, self._application_section_name in _sections, 'Incorrect section name')
+        self.assertEqual(system_status.get_application_data, _sections[self._application_section_name], 'Incorrect environment dump method')
+
+    def test_results_cache_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._results_cache_section_name in _sections, 'Expecting the results cache section to have been added')
+        self.assertEqual(system_status.get_results_cache_data, _sections[self._results_cache_section_name], 'Incorrect results cache section method')
+
+    def test_get_results_cache_data_returns_cache_statistics(self):
+        system_status = SystemStatus()
+        json_data = system_status.get_results_cache_data()
+        self.assertEqual(5, json_data['hits'], 'Expecting the number of cache hits to have been returned')
+        self.assertEqual(2, json_data['misses'], 'Expecting the number of cache misses to have been returned')
+
+    def test_upstream_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._upstream_section_name in _sections, 'Expecting the upstream section to have been added')
+        self.assertEqual(system_status.get_upstream_data, _sections[self._upstream_section_name], 'Incorrect upstream section method')
+
+    def test_get_upstream_data_returns_http_client_statistics(self):
+        system_status = SystemStatus()
+        json_data = system_status.get_upstream_data()
+        self.assertEqual(3, json_data['calls'], 'Expecting the number of upstream calls to have been returned')
+        self.assertEqual(1, json_data['retries'], 'Expecting the number of upstream retries to have been returned')
+
+    def test_single_flight_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._single_flight_section_name in _sections, 'Expecting the single flight section to have been added')
+        self.assertEqual(system_status.get_single_flight_data, _sections[self._single_flight_section_name], 'Incorrect single flight section method')
+
+    def test_get_single_flight_data_returns_coalescing_statistics(self):
+        system_status = SystemStatus()
+        json_data = system_status.get_single_flight_data()
+        self.assertEqual(4, json_data['executedCalls'], 'Expecting the number of executed calls to have been returned')
+        self.assertEqual(9, json_data['coalescedCalls'], 'Expecting the number of coalesced calls to have been returned')
+
+    def test_results_store_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._results_store_section_name in _sections, 'Expecting the results store section to have been added')
+        self.assertEqual(system_status.get_results_store_data, _sections[self._results_store_section_name], 'Incorrect results store section method')
+
+    def test_get_results_store_data_returns_store_statistics(self):
+        system_status = SystemStatus()
+        json_data = system_status.get_results_store_data()
+        self.assertEqual(2, json_data['pagesRestored'], 'Expecting the number of pages restored to have been returned')
+        self.assertEqual(7, json_data['writes'], 'Expecting the number of writes to have been returned')
+
+    def test_rendered_responses_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._rendered_responses_section_name in _sections, 'Expecting the rendered responses section to have been added')
+        self.assertEqual(system_status.get_rendered_responses_data, _sections[self._rendered_responses_section_name], \
+            'Incorrect rendered responses section method')
+
+    def test_get_rendered_responses_data_returns_renderer_statistics(self):
+        system_status = SystemStatus()
+        json_data = system_status.get_rendered_responses_data()
+        self.assertEqual(3, json_data['renders'], 'Expecting the number of renders to have been returned')
+        self.assertEqual(11, json_data['notModifiedResponses'], 'Expecting the number of HTTP 304 responses to have been returned')
+
+    def test_league_table_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._league_table_section_name in _sections, 'Expecting the league table section to have been added')
+        self.assertEqual(system_status.get_league_table_data, _sections[self._league_table_section_name], 'Incorrect league table section method')
+
+    def test_get_league_table_data_returns_table_statistics(self):
+        system_status = SystemStatus()
+        json_data = system_status.get_league_table_data()
+        self.assertEqual(14, json_data['teams'], 'Expecting the number of teams to have been returned')
+        self.assertEqual(5, json_data['rowsUpdated'], 'Expecting the number of rows updated to have been returned')
 
     def test_health_check_application_and_path_are_injected(self):
-        SystemStatus('http://someurl.com')
+        SystemStatus()
         self.assertEqual(self._application, _application_for_health_check, 'The wrong application was injected')
         self.assertEqual('/testHealthCheck', _path_for_health_check, 'The wrong path was injected')
 
     def test_environment_dump_application_and_path_are_injected(self):
-        SystemStatus('http://someurl.com')
+        SystemStatus()
         self.assertEqual(self._application, _application_for_environment_dump, 'The wrong application was injected')
         self.assertEqual('/testEnvironmentDump', _path_for_environment_dump, 'The wrong path was injected')
+
+    def test_feature_resolution_section_added(self):
+        system_status = SystemStatus()
+        self.assertEqual(True, self._feature_resolution_section_name in _sections, 'Expecting the feature resolution section to have been added')
+        self.assertEqual(system_status.get_feature_resolution_data, _sections[self._feature_resolution_section_name], 'Incorrect feature resolution section method')
+        self.assertEqual(1, system_status.get_feature_resolution_data()['SystemStatus']['builds'], 'Expecting the resolution report to have been returned')
+
+    def test_upstream_requests_are_observed_by_metrics(self):
+        SystemStatus()
+        self.assertListEqual([_metrics.observe_upstream_request], MockHttpRequests.request_listeners, \
+            'Expecting the metrics to have been told of each request to sportstg')
+
+    def test_cache_metrics_collector_added(self):
+        system_status = SystemStatus()
+        self.assertListEqual([system_status.get_cache_metrics], _metrics.collectors, 'Incorrect metrics collector')
+
+    def test_get_cache_metrics_returns_lookups_by_cache_and_outcome(self):
+        lookups = {(labels['cache'], labels['outcome']): value for name, labels, value in SystemStatus().get_cache_metrics()}
+        expected_lookups = {('results', 'hit'): 5, ('results', 'stale'): 1, ('results', 'miss'): 2, ('renderedResponses', 'hit'): 8,
+                            ('renderedResponses', 'miss'): 3}
+        self.assertDictEqual(expected_lookups, lookups, 'Expecting the lookups of the results cache and rendered responses to have been returned')
@@ -0,0 +1,156 @@
+import unittest
+
+import requests
+
+from app.inversion_of_control import features
+from app.upstream_health_probe import UpstreamHealthProbe
+
+_url_to_check = 'http://upstream.com/comp_info.cgi?round=-1'
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 0
+
+    def __call__(self):
+        return self.current_time
+
+class MockResponse():
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class MockHttpRequest():
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Each outcome is either a HTTP status code to respond with, or an exception to be raised
+        self.head_outcomes = []
+        self.get_outcomes = []
+        self.requests_made = []
+        self.response_listeners = []
+
+    def head(self, url, **kwargs):
+        self.requests_made.append(('HEAD', url))
+        return self._respond(self.head_outcomes.pop(0))
+
+    def get(self, url, **kwargs):
+        self.requests_made.append(('GET', url))
+        return self._respond(self.get_outcomes.pop(0))
+
+    def add_response_listener(self, listener):
+        self.response_listeners.append(listener)
+
+    def _respond(self, outcome):
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        return MockResponse(outcome)
+
+class DeferredThreadStarter():
+    # Keeps the probes that would have been started, so that tests control when they run
+    def __init__(self):
+        self.targets = []
+
+    def __call__(self, target):
+        self.targets.append(target)
+
+    def run_all(self):
+        targets, self.targets = self.targets, []
+
+        for target in targets:
+            target()
+
+# A single instance is used, as the probe keeps the instance injected into it
+_http_request = MockHttpRequest()
+
+class TestUpstreamHealthProbe(unittest.TestCase):
+    def setUp(self):
+        # Allow the dependencies to be replaced so as not to affect unit tests in other test classes
+        features.allowReplace = True
+        features.Provide('HttpRequest', _http_request)
+        _http_request.reset()
+        self._clock = MockClock()
+        self._thread_starter = DeferredThreadStarter()
+        self._probe = UpstreamHealthProbe(_url_to_check, ttl_seconds=30, clock=self._clock, start_thread=self._thread_starter)
+
+    def test_first_check_reports_healthy_and_starts_probe(self):
+        healthy, message = self._probe.get_status()
+        self.assertTrue(healthy, 'Upstream should have been assumed to be healthy before the first probe')
+        self.assertIn('has not been checked yet', message, 'The message should have said that upstream has not been checked')
+        self.assertEqual(1, len(self._thread_starter.targets), 'A probe should have been started')
+
+    def test_check_reports_result_of_probe_without_requesting_upstream(self):
+        _http_request.head_outcomes = [200]
+        self._probe.get_status()
+        self._thread_starter.run_all()
+        self._clock.current_time = 10
+
+        healthy, message = self._probe.get_status()
+        self.assertTrue(healthy, 'The healthy result of the probe should have been reported')
+        self.assertEqual('URL %s OK (observed 10 seconds ago)' % _url_to_check, message, 'Incorrect message returned')
+        self.assertListEqual([('HEAD', _url_to_check)], _http_request.requests_made, 'Only the probe should have requested upstream')
+        self.assertEqual(0, len(self._thread_starter.targets), 'No probe should have been started within the time to live')
+
+    def test_only_one_probe_runs_at_a_time(self):
+        self._probe.get_status()
+        self._probe.get_status()
+        self.assertEqual(1, len(self._thread_starter.targets), 'Only one probe should have been started')
+
+    def test_probe_started_once_result_is_older_than_ttl(self):
+        _http_request.head_outcomes = [200, 503]
+        self._probe.get_status()
+        self._thread_starter.run_all()
+        self._clock.current_time = 30
+
+        self.assertTrue(self._probe.get_status()[0], 'The last result should have been reported while the next probe runs')
+        self._thread_starter.run_all()
+
+        healthy, message = self._probe.get_status()
+        self.assertFalse(healthy, 'The unhealthy result of the second probe should have been reported')
+        self.assertTrue(message.startswith('URL %s did not return HTTP OK' % _url_to_check), 'Incorrect message returned')
+
+    def test_unreachable_upstream_is_reported_as_unhealthy(self):
+        _http_request.head_outcomes = [requests.ConnectionError('Connection refused')]
+        self._probe.get_status()
+        self._thread_starter.run_all()
+        healthy, message = self._probe.get_status()
+        self.assertFalse(healthy, 'An unreachable upstream should have been reported as unhealthy')
+        self.assertIn('could not be reached: Connection refused', message, 'The error should have been reported')
+        self.assertEqual(1, self._probe.get_statistics()['probeFailures'], 'A probe failure should have been counted')
+
+    def test_page_requested_without_body_when_head_not_supported(self):
+        _http_request.head_outcomes = [405]
+        _http_request.get_outcomes = [200]
+        self._probe.get_status()
+        self._thread_starter.run_all()
+        self.assertTrue(self._probe.get_status()[0], 'The response to the GET request should have been reported')
+        self.assertListEqual([('HEAD', _url_to_check), ('GET', _url_to_check)], _http_request.requests_made, 'The page should have been requested')
+
+    def test_responses_to_fetches_from_upstream_are_used_as_evidence(self):
+        round_url = 'http://upstream.com/comp_info.cgi?round=1'
+        _http_request.response_listeners[0](round_url, 304, 120.5)
+        self._clock.current_time = 5
+
+        healthy, message = self._probe.get_status()
+        self.assertTrue(healthy, 'The response to the fetch should have been evidence of a healthy upstream')
+        self.assertEqual('URL %s OK (observed 5 seconds ago)' % round_url, message, 'Incorrect message returned')
+        self.assertEqual(0, len(self._thread_starter.targets), 'No probe should have been needed')
+        self.assertEqual(1, self._probe.get_statistics()['evidenceResponses'], 'The evidence should have been counted')
+
+    def test_failed_responses_and_other_hosts_are_not_evidence(self):
+        _http_request.response_listeners[0]('http://upstream.com/comp_info.cgi?round=1', 503, 10)
+        _http_request.response_listeners[0]('http://api.github.com/repos', 200, 10)
+        self.assertEqual(0, self._probe.get_statistics()['evidenceResponses'], 'No evidence should have been counted')
+
+    def test_statistics_record_probe_timings(self):
+        _http_request.head_outcomes = [200]
+        self._probe.get_status()
+        self._thread_starter.run_all()
+        statistics = self._probe.get_statistics()
+        self.assertEqual(1, statistics['probes'], 'A probe should have been counted')
+        self.assertTrue(statistics['healthy'], 'The last observation should have been healthy')
+        self.assertIsNotNone(statistics['p50ProbeMilliseconds'], 'The median probe timing should have been calculated')
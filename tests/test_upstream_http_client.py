@@ -0,0 +1,199 @@
+import unittest
+
+import requests
+
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.upstream_http_client import UpstreamHttpClient
+
+class MockResponse():
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class MockSession():
+    def __init__(self, outcomes):
+        # Each outcome is either a HTTP status code to respond with, or an exception to be raised
+        self._outcomes = list(outcomes)
+        self.mounted_adapters = {}
+        self.requests_made = []
+
+    def mount(self, prefix, adapter):
+        self.mounted_adapters[prefix] = adapter
+
+    def get(self, url, **kwargs):
+        self.requests_made.append((url, kwargs))
+        outcome = self._outcomes.pop(0)
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        return MockResponse(outcome)
+
+    def head(self, url, **kwargs):
+        outcome = self._outcomes.pop(0)
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        self.requests_made.append(('HEAD ' + url, kwargs))
+        return MockResponse(outcome)
+
+class MockSleep():
+    def __init__(self):
+        self.delays = []
+
+    def __call__(self, seconds):
+        self.delays.append(seconds)
+
+class MockClock():
+    def __init__(self):
+        self.current_time = 1000.0
+
+    def __call__(self):
+        return self.current_time
+
+class TestUpstreamHttpClient(unittest.TestCase):
+    def _create_client(self, outcomes, **kwargs):
+        self._session = MockSession(outcomes)
+        self._sleep = MockSleep()
+        return UpstreamHttpClient(session=self._session, sleep=self._sleep, **kwargs)
+
+    def test_pooled_adapter_is_mounted_for_http_and_https(self):
+        self._create_client([], pool_size=4)
+
+        for prefix in 'http://', 'https://':
+            adapter = self._session.mounted_adapters[prefix]
+            self.assertEqual(4, adapter._pool_maxsize, 'The pool size should have been applied to the adapter for %s' % prefix)
+            self.assertEqual(True, adapter._pool_block, 'The pool should block once all connections are in use')
+
+    def test_default_timeouts_are_applied(self):
+        client = self._create_client([200], connect_timeout_seconds=1, read_timeout_seconds=5)
+        response = client.get('http://upstream.com')
+        self.assertEqual(200, response.status_code, 'The response from the session should have been returned')
+        self.assertEqual((1, 5), self._session.requests_made[0][1]['timeout'], 'The connect and read timeouts should have been supplied')
+
+    def test_caller_supplied_arguments_are_passed_to_session(self):
+        client = self._create_client([304])
+        client.get('http://upstream.com', timeout=2, headers={'If-None-Match': '"abc"'})
+        self.assertEqual(2, self._session.requests_made[0][1]['timeout'], 'The timeout supplied by the caller should have been used')
+        self.assertDictEqual({'If-None-Match': '"abc"'}, self._session.requests_made[0][1]['headers'], 'The headers should have been supplied')
+
+    def test_connection_errors_are_retried_with_backoff(self):
+        client = self._create_client([requests.ConnectionError(), requests.Timeout(), 200], max_retries=2, backoff_seconds=0.5)
+        response = client.get('http://upstream.com')
+        self.assertEqual(200, response.status_code, 'The successful response should have been returned')
+        self.assertEqual(2, len(self._sleep.delays), 'Two backoff delays should have occurred')
+        self.assertTrue(0 <= self._sleep.delays[0] <= 0.5, 'The first backoff delay should be at most the backoff')
+        self.assertTrue(0 <= self._sleep.delays[1] <= 1, 'The second backoff delay should be at most double the backoff')
+        self.assertEqual(2, client.get_statistics()['retries'], 'Two retries should have been counted')
+
+    def test_error_is_raised_once_retries_are_exhausted(self):
+        client = self._create_client([requests.ConnectionError(), requests.ConnectionError()], max_retries=1)
+
+        with self.assertRaises(requests.ConnectionError):
+            client.get('http://upstream.com')
+
+        self.assertEqual(1, client.get_statistics()['failures'], 'A failure should have been counted')
+
+    def test_gateway_errors_are_retried_and_last_response_returned(self):
+        client = self._create_client([503, 503], max_retries=1)
+        response = client.get('http://upstream.com')
+        self.assertEqual(503, response.status_code, 'The last response should have been returned once retries are exhausted')
+        self.assertEqual(2, len(self._session.requests_made), 'The request should have been retried once')
+
+    def test_not_found_is_not_retried(self):
+        client = self._create_client([404])
+        self.assertEqual(404, client.get('http://upstream.com').status_code, 'The not found response should have been returned')
+        self.assertEqual(1, len(self._session.requests_made), 'The request should not have been retried')
+
+    def test_retry_budget_limits_retries_across_calls(self):
+        client = self._create_client([503] * 4, max_retries=5, retry_budget_ratio=0, minimum_retry_budget=2)
+        client.get('http://upstream.com')
+        self.assertEqual(3, len(self._session.requests_made), 'Retries should have stopped once the retry budget was spent')
+
+        client.get('http://upstream.com')
+        self.assertEqual(4, len(self._session.requests_made), 'No retries should remain in the retry budget')
+
+    def test_statistics_record_status_codes_and_timings(self):
+        client = self._create_client([200, 200, 404])
+
+        for _ in range(3):
+            client.get('http://upstream.com')
+
+        statistics = client.get_statistics()
+        self.assertEqual(3, statistics['calls'], 'Three calls should have been counted')
+        self.assertDictEqual({'200': 2, '404': 1}, statistics['statusCodes'], 'The status codes should have been counted')
+        self.assertEqual(3, statistics['timingsSampled'], 'A timing should have been recorded for each call')
+        self.assertIsNotNone(statistics['p50Milliseconds'], 'The median timing should have been calculated')
+
+    def test_response_listeners_are_told_of_each_response(self):
+        client = self._create_client([503, 200], max_retries=1)
+        responses = []
+        client.add_response_listener(lambda url, status_code, elapsed_milliseconds: responses.append((url, status_code)))
+        client.get('http://upstream.com')
+        self.assertListEqual([('http://upstream.com', 503), ('http://upstream.com', 200)], responses, 'The listener should have been told of both responses')
+
+    def test_request_listeners_are_told_of_each_request_including_failures(self):
+        client = self._create_client([requests.ConnectionError('refused'), 200, 404], max_retries=1)
+        requests_sent = []
+        client.add_request_listener(lambda method, status_code, elapsed_milliseconds: requests_sent.append((method, status_code)))
+        client.get('http://upstream.com')
+        client.head('http://upstream.com')
+        self.assertListEqual([('GET', None), ('GET', 200), ('HEAD', 404)], requests_sent, 'The listener should have been told of every request')
+
+    def test_head_request_is_not_retried(self):
+        client = self._create_client([503], max_retries=2)
+        response = client.head('http://upstream.com')
+        self.assertEqual(503, response.status_code, 'The response should have been returned without retrying')
+        self.assertEqual('HEAD http://upstream.com', self._session.requests_made[0][0], 'A HEAD request should have been made')
+        self.assertEqual(1, client.get_statistics()['calls'], 'The HEAD request should have been counted')
+
+    def test_request_is_not_sent_while_circuit_is_open(self):
+        circuit_breaker = CircuitBreaker(failure_rate_threshold=0.5, window_size=2, minimum_calls=2, clock=MockClock())
+        client = self._create_client([500, 503], max_retries=0, circuit_breaker=circuit_breaker)
+        client.get('http://upstream.com')
+        client.get('http://upstream.com')
+
+        with self.assertRaises(CircuitOpenError):
+            client.get('http://upstream.com')
+
+        self.assertEqual(2, len(self._session.requests_made), 'No request should have been sent once the circuit breaker opened')
+        self.assertEqual(CircuitBreaker.open_state, circuit_breaker.get_state(), 'The server errors should have opened the circuit breaker')
+
+    def test_not_found_is_recorded_as_success_with_circuit_breaker(self):
+        circuit_breaker = CircuitBreaker(failure_rate_threshold=0.75, window_size=2, minimum_calls=2, clock=MockClock())
+        client = self._create_client([404, requests.ConnectionError()], max_retries=0, circuit_breaker=circuit_breaker)
+        client.get('http://upstream.com')
+
+        with self.assertRaises(requests.ConnectionError):
+            client.get('http://upstream.com')
+
+        self.assertEqual(0.5, circuit_breaker.get_statistics()['failureRate'], 'Only the connection failure should have counted as a failure')
+
+    def test_other_request_errors_are_recorded_and_circuit_recovers_from_half_open(self):
+        clock = MockClock()
+        circuit_breaker = CircuitBreaker(failure_rate_threshold=0.5, window_size=2, minimum_calls=2, open_seconds=30, clock=clock)
+        client = self._create_client([500, 500, requests.exceptions.ChunkedEncodingError(), 200], max_retries=2, circuit_breaker=circuit_breaker)
+        client.get('http://upstream.com')
+        client.get('http://upstream.com')
+        clock.current_time += 30
+
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            client.get('http://upstream.com')
+
+        self.assertEqual(3, len(self._session.requests_made), 'The trial request should not have been retried')
+        self.assertEqual(CircuitBreaker.open_state, circuit_breaker.get_state(), 'The failed trial request should have opened the circuit breaker again')
+
+        clock.current_time += 30
+        self.assertEqual(200, client.get('http://upstream.com').status_code, 'Another trial request should have been sent')
+        self.assertEqual(CircuitBreaker.closed_state, circuit_breaker.get_state(), 'The successful trial request should have closed the circuit breaker')
+
+    def test_deadline_shortens_timeouts_and_stops_retries(self):
+        client = self._create_client([requests.Timeout(), 200], max_retries=2, connect_timeout_seconds=3, read_timeout_seconds=10,
+                                     deadline_seconds=0)
+
+        with self.assertRaises(requests.Timeout):
+            client.get('http://upstream.com')
+
+        self.assertEqual(1, len(self._session.requests_made), 'The request should not have been retried once the deadline had passed')
+        self.assertTrue(all(timeout <= 0.001 for timeout in self._session.requests_made[0][1]['timeout']), \
+            'The timeouts should have been shortened to the time remaining before the deadline')